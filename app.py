@@ -5,16 +5,31 @@ from tkinter import filedialog
 import threading
 import time
 from datetime import datetime
+from fnmatch import fnmatch
 
 from file_manager import FileManager
+from lag_watchdog import LagWatchdog
+from metrics import Metrics, MetricsServer
+from notifications import NotificationLog
+from persistence import PersistenceService
+from project_index import ProjectIndex
+from selection_model import SelectionModel
+from ui_scheduler import UIScheduler
 from cache_manager import CacheManager
+from thumbnail_manager import ThumbnailManager
 from ui_components import UIComponents
 
+# Thumbnails of clips that are no longer cached are cleared out this long after
+# startup, or as soon after as nothing is being scanned, transferred or decoded
+THUMBNAIL_GC_DELAY_MS = 60000
+THUMBNAIL_GC_RETRY_MS = 30000
+
 class RushesTransferApp:
     def __init__(self, root):
+        self.startup_time = time.perf_counter()
         self.root = root
         self.root.title("Rushes Transfer Tool")
-        self.root.geometry("850x680")
+        self.root.geometry("1020x680")
         self.root.resizable(True, True)
         
         # Default settings
@@ -27,22 +42,47 @@ class RushesTransferApp:
         self.transfer_start_time = 0
         self.config_file = "rushes_transfer_config.json"
         self.metadata_cache_file = "rushes_transfer_metadata_cache.json"
+        self.metadata_db_file = "rushes_transfer_metadata_cache.db"
+        self.metadata_backend_type = "sqlite"  # Options: "sqlite", "json"
         self.thumbnails_dir = "thumbnails"
+        self.notification_log_file = "rushes_transfer.log"
+        self.filmstrip_frames = 8  # Frames in the hover preview strip (0 turns it off)
         self.config_loaded = False
+        self.last_project = ""
+        self.cached_projects = []
+        self.show_project_stats = True  # Count clips and size of the selected project's rushes
+        self.save_transfer_reports = True  # Write transfer_report_*.json/.csv beside copied clips
+        self.metrics_port = 0  # Serve Prometheus metrics on this port (0 turns the exporter off)
+        self.metrics_host = "127.0.0.1"  # "0.0.0.0" to let other machines scrape them
+        self.metrics_server = None
         self.files_to_transfer = []
-        self.selected_files = []
         
-        # UI rate limiting to reduce CPU usage
-        self.last_ui_update_time = 0
-        self.ui_update_interval = 1000 // 120     # Target 120 fps (8.33ms)
+        # Selected clips; changes resync the visible rows and post one debounced status update
+        self.selection = SelectionModel(on_change=self.on_selection_changed)
+        self.selection_status_id = None
         
         # Ensure thumbnails directory exists
         os.makedirs(self.thumbnails_dir, exist_ok=True)
         
+        # UI work from background threads runs on the main thread within a frame budget
+        self.scheduler = UIScheduler(self.root)
+        
+        # Config and cache files are written on a background thread
+        self.persistence = PersistenceService()
+        
+        # Counters and gauges for the optional metrics exporter
+        self.metrics = Metrics()
+        
+        # Notifications are batched into the UI and kept in full in a rotating log file
+        self.notifications = NotificationLog(self, self.notification_log_file)
+        
         # Initialize managers
         self.cache_manager = CacheManager(self)
+        self.thumbnail_manager = ThumbnailManager(self)
         self.file_manager = FileManager(self)
         self.ui = UIComponents(self)
+        self.watchdog = LagWatchdog(self)
+        self.project_index = ProjectIndex(self, self.apply_project_list, self.on_project_stats)
         
         # Define colors
         self.accent_color = "#1f538d"
@@ -50,9 +90,9 @@ class RushesTransferApp:
         self.warning_color = "#ff9900"
         self.error_color = "#e74c3c"
         
-        # Load configuration before setting up UI
+        # Load configuration before setting up UI - it is small and gives us
+        # the last-known state (paths, project list) to show straight away
         self.cache_manager.load_config()
-        self.cache_manager.load_metadata_cache()
         
         # Setup UI
         self.setup_ui()
@@ -60,8 +100,17 @@ class RushesTransferApp:
         # Set up event handler for when window closes
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
         
-        # Rate limit UI updates to reduce CPU usage
-        self.setup_update_rate_limiting()
+        # Measure event loop lag and record what the UI thread was doing when it stalls
+        self.watchdog.start()
+        
+        # Expose transfer, scan and thumbnail metrics over HTTP if a port is configured
+        self.setup_metrics()
+        
+        # Report time to first paint once the window has been drawn
+        self.root.after_idle(self.on_first_paint)
+        
+        # Heavy imports, metadata cache and project listing load in the background
+        self.start_background_loading()
         
         # Automatically scan source path if available, with a delay to ensure UI is ready
         if self.source_path and os.path.exists(self.source_path):
@@ -72,24 +121,80 @@ class RushesTransferApp:
         self.ui.setup_main_ui()
         self.ui.setup_transfer_tab()
         self.ui.setup_file_selection_tab()
+        self.ui.setup_diagnostics_tab()
         
         # Add configure event handler to limit refresh rate during dragging
         self.root.bind("<Configure>", self.on_configure)
         
-        # Initialize projects list
-        self.refresh_projects()
+        # Show the last-known projects list until the background listing completes
+        if self.cached_projects:
+            self.project_combo.configure(values=self.cached_projects)
         
         # Apply last selected project if we have it from config
-        if hasattr(self, 'last_project') and self.last_project and self.project_combo_var.get() != self.last_project:
-            try:
-                projects = self.project_combo._values
-                if self.last_project in projects:
-                    print(f"Setting project to saved value: {self.last_project}")
-                    self.project_combo.set(self.last_project)
-                    self.project_combo_var.set(self.last_project)
-                    self.update_destination_preview()
-            except Exception as e:
-                print(f"Error setting last project: {str(e)}")
+        if self.last_project:
+            print(f"Setting project to saved value: {self.last_project}")
+            self.project_combo.set(self.last_project)
+            self.project_combo_var.set(self.last_project)
+            self.destination_label.configure(
+                text=os.path.join(self.destination_base_path, self.last_project, "Rushes", "Camera")
+            )
+    
+    def start_background_loading(self):
+        """Finish the slow parts of startup on a background thread"""
+        def load():
+            # Open the metadata cache first; scans wait for this to finish
+            self.cache_manager.load_metadata_cache()
+            
+            # Import PIL now so the first thumbnail doesn't pay for it
+            self.thumbnail_manager.preload_codecs()
+            
+        threading.Thread(target=load, daemon=True).start()
+        
+        # Reclaim space from thumbnails of clips that are no longer cached, off the startup path
+        self.root.after(THUMBNAIL_GC_DELAY_MS, self.collect_thumbnail_garbage)
+        
+        # Enumerate the projects root on its own thread - it is often a network share
+        self.refresh_projects()
+    
+    def collect_thumbnail_garbage(self):
+        """Clear thumbnails of uncached clips out of the store once the app is idle"""
+        busy = (self.transfer_in_progress or self.file_manager.scanning_in_progress
+                or self.thumbnail_manager.engine.backlog()
+                or not self.cache_manager.metadata_ready.is_set())
+        if busy:
+            self.root.after(THUMBNAIL_GC_RETRY_MS, self.collect_thumbnail_garbage)
+            return
+        threading.Thread(
+            target=lambda: self.thumbnail_manager.collect_garbage(self.cache_manager.iter_cached_identities()),
+            daemon=True
+        ).start()
+    
+    def setup_metrics(self):
+        """Register the gauges read at scrape time and start the metrics exporter"""
+        self.metrics.register("rushes_transfer_in_progress", lambda: self.transfer_in_progress)
+        self.metrics.register(
+            "rushes_transfer_current_file_bytes",
+            lambda: self.current_file_transferred if self.transfer_in_progress else 0
+        )
+        self.metrics.register("rushes_scanning", lambda: self.file_manager.scanning_in_progress)
+        self.metrics.register("rushes_files_listed", lambda: len(self.files_to_transfer))
+        self.metrics.register("rushes_files_selected", lambda: len(self.selection))
+        self.metrics.register("rushes_thumbnail_backlog", self.thumbnail_manager.engine.backlog)
+        self.metrics.register("rushes_ui_queue_depth", self.scheduler.pending)
+        
+        if not self.metrics_port:
+            return
+        self.metrics_server = MetricsServer(self.metrics, self.metrics_host, self.metrics_port)
+        try:
+            self.metrics_server.start()
+        except OSError as e:
+            self.metrics_server = None
+            self.ui.show_notification(f"Could not start the metrics exporter on port {self.metrics_port}: {str(e)}", "error")
+    
+    def on_first_paint(self):
+        """Log how long it took for the window to appear"""
+        elapsed_ms = (time.perf_counter() - self.startup_time) * 1000
+        print(f"Window ready in {elapsed_ms:.0f} ms")
                 
     def initial_scan(self):
         """Scan the source path on initial load"""
@@ -141,31 +246,29 @@ class RushesTransferApp:
         self.ui.show_notification("Memory card not detected. Please connect it or browse manually.", "warning")
     
     def refresh_projects(self):
-        """Refresh the list of available projects"""
-        try:
-            if os.path.exists(self.destination_base_path):
-                projects = [d for d in os.listdir(self.destination_base_path) 
-                            if os.path.isdir(os.path.join(self.destination_base_path, d))]
-                
-                # Store the currently selected project before updating
-                current_selection = self.project_combo_var.get() if hasattr(self, 'project_combo_var') else ""
-                
-                self.project_combo.configure(values=projects)
-                
-                # If we had a selection and it's still valid, restore it
-                if current_selection and current_selection in projects:
-                    self.project_combo.set(current_selection)
-                    self.project_combo_var.set(current_selection)
-                    self.update_destination_preview()
-                # Otherwise, select first project if available and we don't have a saved last project
-                elif projects and not (hasattr(self, 'last_project') and self.last_project):
-                    self.project_combo.set(projects[0])
-                    self.project_combo_var.set(projects[0])
-                    self.update_destination_preview()
-                
-                self.ui.show_notification(f"Found {len(projects)} projects", "info")
-        except Exception as e:
-            self.ui.show_notification(f"Failed to load projects: {str(e)}", "error")
+        """Refresh the list of available projects in the background"""
+        self.project_index.refresh(self.destination_base_path)
+    
+    def apply_project_list(self, projects):
+        """Show a freshly listed set of projects (runs on the UI thread)"""
+        # Store the currently selected project before updating
+        current_selection = self.project_combo_var.get()
+        
+        self.cached_projects = projects
+        self.project_combo.configure(values=projects)
+        
+        # If we had a selection and it's still valid, restore it
+        if current_selection and current_selection in projects:
+            self.project_combo.set(current_selection)
+            self.project_combo_var.set(current_selection)
+            self.update_destination_preview()
+        # Otherwise, select first project if available and we don't have a saved last project
+        elif projects and not self.last_project:
+            self.project_combo.set(projects[0])
+            self.project_combo_var.set(projects[0])
+            self.update_destination_preview()
+        
+        self.ui.show_notification(f"Found {len(projects)} projects", "info")
     
     def create_project(self):
         """Create a new project folder"""
@@ -181,6 +284,10 @@ class RushesTransferApp:
             if not os.path.exists(rushes_path):
                 os.makedirs(rushes_path, exist_ok=True)
                 self.ui.show_notification(f"Project '{project_name}' created successfully", "success")
+                # Show the new project right away; the refreshed listing follows in the background
+                if project_name not in self.cached_projects:
+                    self.cached_projects = self.cached_projects + [project_name]
+                    self.project_combo.configure(values=self.cached_projects)
                 self.refresh_projects()
                 # Select the newly created project
                 self.project_combo.set(project_name)
@@ -205,66 +312,128 @@ class RushesTransferApp:
         if selected_project:
             destination = os.path.join(self.destination_base_path, selected_project, "Rushes", "Camera")
             self.destination_label.configure(text=destination)
+            self.update_project_stats()
             # Save configuration after changing project
             self.cache_manager.save_config()
         else:
             self.destination_label.configure(text="")
+            self.project_stats_label.configure(text="")
+    
+    def update_project_stats(self):
+        """Show the selected project's last known clip count and size, and count them again"""
+        project = self.project_combo_var.get()
+        if not self.show_project_stats or not project:
+            return
+        cached = self.project_index.cached_stats(project)
+        if cached:
+            self.on_project_stats(project, cached, updating=True)
+        else:
+            self.project_stats_label.configure(text="Counting rushes...")
+        rushes_path = os.path.join(self.destination_base_path, project, "Rushes", "Camera")
+        self.project_index.request_stats(project, rushes_path)
+    
+    def on_project_stats(self, project, stats, updating=False):
+        """Show a project's rushes stats if it is still the selected one"""
+        if project != self.project_combo_var.get():
+            return
+        clips, size = stats
+        text = f"{clips} clips, {self.ui.format_size(size)} already in Rushes/Camera"
+        if updating:
+            text += " (updating...)"
+        self.project_stats_label.configure(text=text)
     
     def toggle_select_all(self):
         """Toggle all file selections"""
-        select_all = self.select_all_var.get()
-        
-        # Update all checkboxes
-        for entry in self.file_entries:
-            entry["var"].set(select_all)
-        
-        # Update selected files list
-        if select_all:
-            self.selected_files = [file[0] for file in self.files_to_transfer]
+        if self.select_all_var.get():
+            self.selection.select_all()
         else:
-            self.selected_files = []
-            
-        # Update UI
-        self.update_selection_status()
+            self.selection.clear()
+    
+    def toggle_file_selection(self, file_path, var):
+        """Handle toggling file selection"""
+        self.selection.set(file_path, var.get())
+    
+    def extend_file_selection(self, file_path):
+        """Handle a shift-click: select (or deselect) every file from the last one clicked"""
+        self.selection.extend_to(file_path)
+    
+    def on_selection_changed(self):
+        """Sync the UI after the selection changed"""
+        # Only the rows on screen have checkboxes to update
+        self.file_list.refresh_selection()
+        self.select_all_var.set(self.selection.all_selected())
+        
+        # Clicking through clips posts one status message once the clicking stops
+        if self.selection_status_id is not None:
+            self.root.after_cancel(self.selection_status_id)
+        self.selection_status_id = self.root.after(300, self.update_selection_status)
     
     def update_selection_status(self):
         """Update UI to show how many files are selected"""
+        self.selection_status_id = None
         total = len(self.files_to_transfer)
-        selected = len(self.selected_files)
+        selected = len(self.selection)
         self.ui.show_notification(f"{selected} of {total} files selected for transfer", "info")
     
-    def toggle_file_selection(self, file_path, var):
-        """Handle toggling file selection"""
-        is_selected = var.get()
-        
-        if is_selected and file_path not in self.selected_files:
-            self.selected_files.append(file_path)
-        elif not is_selected and file_path in self.selected_files:
-            self.selected_files.remove(file_path)
-            
-        # Update Select All checkbox
-        if len(self.selected_files) == len(self.files_to_transfer):
-            self.select_all_var.set(True)
-        else:
-            self.select_all_var.set(False)
-            
-        # Update status
-        self.update_selection_status()
+    def invert_selection(self):
+        self.selection.invert()
+    
+    def select_day(self, day):
+        """Select every clip shot on a day"""
+        self.selection.select_day(day)
+    
+    def select_matching_name(self):
+        """Select clips whose name matches a pattern entered by the user"""
+        dialog = ctk.CTkInputDialog(text="Select files whose name contains or matches (e.g. C00*):", title="Select Matching")
+        pattern = (dialog.get_input() or "").strip().lower()
+        if not pattern:
+            return
+        if not any(c in pattern for c in "*?["):
+            pattern = f"*{pattern}*"
+        matches = self.selection.select_where(lambda record: fnmatch(os.path.basename(record.file_path).lower(), pattern))
+        if not matches:
+            self.ui.show_notification(f"No files match '{pattern}'", "warning")
+    
+    def save_selection(self):
+        """Save the current selection under a name"""
+        if not self.selection:
+            self.ui.show_notification("No files selected to save", "warning")
+            return
+        dialog = ctk.CTkInputDialog(text="Name for this selection:", title="Save Selection")
+        name = (dialog.get_input() or "").strip()
+        if not name:
+            return
+        self.selection.save(name)
+        self.ui.update_selection_menu()
+        self.cache_manager.save_config()
+        self.ui.show_notification(f"Saved selection '{name}' ({len(self.selection)} files)", "success")
+    
+    def restore_selection(self, name):
+        """Select the files of a saved selection"""
+        restored = self.selection.restore(name)
+        missing = len(self.selection.saved.get(name, ())) - restored
+        if missing:
+            self.ui.show_notification(f"{missing} files from '{name}' are not in the current list", "warning")
+    
+    def delete_saved_selection(self, name):
+        """Forget a saved selection"""
+        self.selection.delete_saved(name)
+        self.ui.update_selection_menu()
+        self.cache_manager.save_config()
+        self.ui.show_notification(f"Deleted saved selection '{name}'", "info")
     
     def clear_file_list(self):
         """Clear the file list UI"""
-        for entry in self.file_entries:
-            for widget in entry["frame"].winfo_children():
-                widget.destroy()
-            entry["frame"].destroy()
-        
-        self.file_entries = []
-        self.selected_files = []
+        # Thumbnails for the old rows are no longer needed
+        self.thumbnail_manager.cancel_all_requests()
+        self.file_list.clear()
+        self.file_manager.index.set_records([])
+        self.selection.set_records([])
     
     def start_transfer_with_selection(self):
         """Start transfer with the selected files"""
         # Use selected files instead of scanning everything
-        if not self.selected_files:
+        if not self.selection:
             self.ui.show_notification("No files selected for transfer", "warning")
             return
             
@@ -294,6 +463,7 @@ class RushesTransferApp:
         
         # Start transfer in a separate thread
         self.transfer_in_progress = True
+        self.thumbnail_manager.engine.wake()
         self.transfer_button.configure(state="disabled")
         self.cancel_button.configure(state="normal")
         self.ui.show_notification(f"Starting transfer to {destination}", "info")
@@ -341,41 +511,23 @@ class RushesTransferApp:
             self.ui.show_notification("A transfer is in progress. Click Cancel first before closing.", "warning")
             return
         
-        # Save current configuration and metadata cache
+        # Save current configuration and metadata cache, and wait for them to reach disk
         self.cache_manager.save_config()
         self.cache_manager.save_metadata_cache()
+        self.persistence.stop()
+        self.cache_manager.close_metadata_cache()
+        self.thumbnail_manager.close()
+        self.watchdog.stop()
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+        self.notifications.close()
         
         # Close the window
         self.root.destroy()
 
-    def setup_update_rate_limiting(self):
-        """Set up rate limiting for UI updates to reduce CPU usage"""
-        # Override update_idletasks to prevent excessive updates
-        original_update_idletasks = self.root.update_idletasks
-        
-        def rate_limited_update_idletasks():
-            current_time = time.time() * 1000  # Convert to ms
-            if current_time - self.last_ui_update_time >= self.ui_update_interval:
-                self.last_ui_update_time = current_time
-                original_update_idletasks()
-                
-        self.root.update_idletasks = rate_limited_update_idletasks
-        
-        # Override update to prevent excessive updates
-        original_update = self.root.update
-        
-        def rate_limited_update():
-            current_time = time.time() * 1000  # Convert to ms
-            if current_time - self.last_ui_update_time >= self.ui_update_interval:
-                self.last_ui_update_time = current_time
-                original_update()
-                
-        self.root.update = rate_limited_update 
-
     def on_configure(self, event):
         """Handle window configure events (resizing, moving)"""
         # Only process events for the main window
         if event.widget == self.root:
-            # Small sleep to limit refresh rate during window movement
-            # This mitigates issues with high polling rate mice
-            time.sleep(0.015)  # 15ms delay helps with 1000Hz mice 
\ No newline at end of file
+            # Queued UI work yields more often while the window is dragged or resized
+            self.scheduler.note_interaction() 
\ No newline at end of file
@@ -0,0 +1,8 @@
+"""Benchmarks for the Rushes Transfer Tool.
+
+Run a benchmark from the repository root, e.g.::
+
+    python -m benchmarks.startup
+    python -m benchmarks.ingest --clips 300 --output results.json
+    python -m benchmarks.list_view --scaling 1.5
+"""
@@ -0,0 +1,105 @@
+"""A RushesTransferApp without a window, for benchmarks.
+
+The managers (cache, thumbnails, files, selection, index) are the real ones;
+only the Tk widgets they update are replaced by inert objects, and UI jobs
+run straight away on the calling thread instead of on the Tk event loop.
+"""
+import os
+
+from cache_manager import CacheManager
+from file_manager import FileManager
+from metrics import Metrics
+from persistence import PersistenceService
+from selection_model import SelectionModel
+from thumbnail_manager import ThumbnailManager
+
+
+class Inert:
+    """Stands in for a widget or Tk variable: every method call does nothing"""
+
+    def __getattr__(self, name):
+        return self._ignore
+
+    def _ignore(self, *args, **kwargs):
+        return None
+
+
+class ImmediateScheduler:
+    """UIScheduler replacement that runs jobs on the posting thread"""
+
+    def post(self, fn, key=None):
+        fn()
+
+    def pending(self):
+        return 0
+
+
+class HeadlessUI(Inert):
+    """UIComponents replacement that keeps notifications instead of showing them"""
+
+    def __init__(self):
+        self.notifications = []
+
+    def show_notification(self, message, message_type="info"):
+        self.notifications.append((message_type, message))
+
+
+class HeadlessRoot(Inert):
+    """Tk root replacement: after() callbacks run straight away"""
+
+    def after(self, ms, fn=None, *args):
+        if fn is not None:
+            fn(*args)
+
+
+class HeadlessApp:
+    """The app's managers with their state kept under workdir"""
+
+    def __init__(self, workdir):
+        os.makedirs(workdir, exist_ok=True)
+        self.root = HeadlessRoot()
+        self.scheduler = ImmediateScheduler()
+        self.ui = HeadlessUI()
+
+        self.source_path = None
+        self.transfer_in_progress = False
+        self.current_file_size = 0
+        self.current_file_transferred = 0
+        self.transfer_start_time = 0
+        self.config_file = os.path.join(workdir, "config.json")
+        self.metadata_cache_file = os.path.join(workdir, "metadata_cache.json")
+        self.metadata_db_file = os.path.join(workdir, "metadata_cache.db")
+        self.metadata_backend_type = "sqlite"
+        self.thumbnails_dir = os.path.join(workdir, "thumbnails")
+        self.filmstrip_frames = 8
+        self.save_transfer_reports = False
+        self.files_to_transfer = []
+        os.makedirs(self.thumbnails_dir, exist_ok=True)
+
+        self.selection = SelectionModel()
+        self.metrics = Metrics()
+        self.persistence = PersistenceService()
+        self.cache_manager = CacheManager(self)
+        self.thumbnail_manager = ThumbnailManager(self)
+        self.file_manager = FileManager(self)
+
+        # Widgets and variables the managers update
+        self.file_list = Inert()
+        for name in ("status_label", "files_title", "select_all_var", "current_file_label",
+                     "file_progress_bar", "file_size_label", "speed_label", "transfer_button",
+                     "cancel_button", "tab_view", "project_combo_var"):
+            setattr(self, name, Inert())
+
+    def clear_file_list(self):
+        self.thumbnail_manager.cancel_all_requests()
+        self.file_manager.index.set_records([])
+        self.selection.set_records([])
+
+    def update_project_stats(self):
+        pass
+
+    def close(self):
+        self.persistence.stop()
+        self.cache_manager.close_metadata_cache()
+        # Wait for the workers, so none is still decoding when the next scenario is timed
+        self.thumbnail_manager.close(wait=True)
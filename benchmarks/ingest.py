@@ -0,0 +1,329 @@
+"""Ingest benchmark suite.
+
+Generates a synthetic card (see benchmarks.synthetic_card) and times the
+ingest pipeline headlessly, using the app's own managers:
+
+    scan_cold        first scan of the card with an empty metadata cache
+    scan_warm        rescan with every clip already cached
+    cache_save       writing the scanned records to the SQLite cache
+    cache_load       opening the cache and loading the card's records
+    cached_list      showing the card from the cache without a rescan
+    list_population  indexing, sorting, searching and selecting the file list
+    thumbnails_cold  generating every thumbnail (decoded or from sidecars)
+    thumbnails_warm  loading every thumbnail back from the store
+    transfer         copying clips to a destination, end to end
+
+    python -m benchmarks.ingest [--clips N] [--output results.json]
+                                [--baseline baseline.json] [--save-baseline baseline.json]
+
+Results are written as JSON. With --baseline, each timing is compared
+against a stored run and the suite exits with status 1 if any got slower
+than --tolerance allows. Baselines are machine-specific: save one on the
+machine you compare on.
+
+"Cold" refers to the app's caches; the OS page cache is not dropped (that
+needs root), so generate a fresh card with --workdir on a new directory, or
+use --real-data on a card larger than RAM, for cold-disk numbers.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.headless import HeadlessApp
+from benchmarks.synthetic_card import generate_card
+
+# Timings that may grow by this fraction over the baseline before counting as a regression
+DEFAULT_TOLERANCE = 0.2
+
+# Slowdowns smaller than this are timer noise, whatever the fraction
+NOISE_FLOOR_S = 0.005
+
+
+def timed(fn):
+    """Run fn and return (seconds, result)"""
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+class Suite:
+    """Runs the scenarios against one synthetic card"""
+
+    def __init__(self, args, workdir):
+        self.args = args
+        self.workdir = workdir
+        self.card = os.path.join(workdir, "card")
+        self.source = generate_card(
+            self.card, clips=args.clips, min_mb=args.min_mb, max_mb=args.max_mb,
+            sparse=not args.real_data, real_video=args.real_video, folders=args.folders
+        )
+        self.clips = args.clips
+        self.card_bytes = sum(
+            os.path.getsize(os.path.join(root, name))
+            for root, _, names in os.walk(self.source) for name in names
+            if name.upper().endswith(".MP4")
+        )
+        self.state = 0
+
+    def new_app(self):
+        """An app with empty caches"""
+        self.state += 1
+        app = HeadlessApp(os.path.join(self.workdir, f"state{self.state}"))
+        app.cache_manager.load_metadata_cache()
+        return app
+
+    def reopen_app(self, app):
+        """A fresh app on the caches another app left behind"""
+        workdir = os.path.dirname(app.config_file)
+        app.close()
+        reopened = HeadlessApp(workdir)
+        return reopened
+
+    def scan(self, app, force_scan=True):
+        app.file_manager.scan_files_thread(self.source, force_scan=force_scan)
+        return len(app.files_to_transfer)
+
+    # ----- scenarios -----
+
+    def scan_cold(self):
+        app = self.new_app()
+        seconds, found = timed(lambda: self.scan(app))
+        app.close()
+        return {"seconds": seconds, "clips": found, "per_clip_ms": seconds * 1000 / max(1, found)}
+
+    def scan_warm(self):
+        app = self.new_app()
+        self.scan(app)
+        seconds, found = timed(lambda: self.scan(app))
+        app.close()
+        return {"seconds": seconds, "clips": found, "per_clip_ms": seconds * 1000 / max(1, found)}
+
+    def cache_save(self):
+        app = self.new_app()
+        self.scan(app)
+        seconds, _ = timed(app.persistence.flush)
+        app.close()
+        return {"seconds": seconds, "per_clip_ms": seconds * 1000 / self.clips}
+
+    def cache_load(self):
+        app = self.new_app()
+        self.scan(app)
+        app = self.reopen_app(app)
+
+        def load():
+            app.cache_manager.load_metadata_cache()
+            app.cache_manager.ensure_source_loaded(self.source)
+            return len(app.cache_manager.metadata_store)
+
+        seconds, loaded = timed(load)
+        app.close()
+        return {"seconds": seconds, "records": loaded}
+
+    def cached_list(self):
+        app = self.new_app()
+        self.scan(app)
+        app = self.reopen_app(app)
+        app.cache_manager.load_metadata_cache()
+        seconds, found = timed(lambda: self.scan(app, force_scan=False))
+        app.close()
+        return {"seconds": seconds, "clips": found}
+
+    def list_population(self):
+        app = self.new_app()
+        self.scan(app)
+        file_manager = app.file_manager
+        records = list(app.files_to_transfer)
+
+        def populate():
+            # What showing, re-sorting, searching and selecting the list costs
+            # apart from the widgets (a fixed screenful, whatever the card size)
+            file_manager.index.set_records(records)
+            file_manager.apply_view()
+            for column in ("name", "size", "date"):
+                file_manager.sort_file_list(column)
+            for text in ("c", "c0", "c00", ""):
+                file_manager.set_name_filter(text)
+            app.selection.select_all()
+            app.selection.invert()
+
+        seconds, _ = timed(populate)
+        app.close()
+        return {"seconds": seconds, "records": len(records)}
+
+    def request_all_thumbnails(self, app):
+        """Request every clip's thumbnail and wait for them all"""
+        records = list(app.files_to_transfer)
+        done = threading.Event()
+        remaining = [len(records)]
+        lock = threading.Lock()
+
+        def on_image(image):
+            with lock:
+                remaining[0] -= 1
+                if remaining[0] == 0:
+                    done.set()
+
+        for row, record in enumerate(records):
+            app.thumbnail_manager.request_thumbnail(record.file_path, on_image, row)
+        if records and not done.wait(self.args.thumbnail_timeout):
+            raise RuntimeError(f"{remaining[0]} thumbnails not delivered")
+        return len(records)
+
+    def thumbnails_cold(self):
+        app = self.new_app()
+        self.scan(app)
+        seconds, count = timed(lambda: self.request_all_thumbnails(app))
+        app.close()
+        return {"seconds": seconds, "clips": count, "per_clip_ms": seconds * 1000 / max(1, count)}
+
+    def thumbnails_warm(self):
+        app = self.new_app()
+        self.scan(app)
+        self.request_all_thumbnails(app)
+        app.thumbnail_manager.clear_memory_cache()
+        seconds, count = timed(lambda: self.request_all_thumbnails(app))
+        app.close()
+        return {"seconds": seconds, "clips": count, "per_clip_ms": seconds * 1000 / max(1, count)}
+
+    def transfer(self):
+        app = self.new_app()
+        self.scan(app)
+        records = app.files_to_transfer[:self.args.transfer_clips]
+        for record in records:
+            app.selection.selected.add(record.file_path)
+        transfer_bytes = sum(record.file_size for record in records)
+        destination = os.path.join(self.workdir, f"destination{self.state}")
+
+        def run():
+            app.transfer_in_progress = True
+            app.file_manager.transfer_selected_files(self.source, destination)
+
+        seconds, _ = timed(run)
+        summary = app.file_manager.last_transfer.summary()
+        app.close()
+        shutil.rmtree(destination, ignore_errors=True)
+        return {
+            "seconds": seconds,
+            "clips": len(records),
+            "bytes": transfer_bytes,
+            "mb_per_s": transfer_bytes / (1024 * 1024) / seconds if seconds > 0 else 0.0,
+            "read_s": summary["read_s"],
+            "write_s": summary["write_s"],
+            "other_s": summary["other_s"] + summary["between_files_s"],
+        }
+
+
+SCENARIOS = (
+    "scan_cold", "scan_warm", "cache_save", "cache_load", "cached_list",
+    "list_population", "thumbnails_cold", "thumbnails_warm", "transfer",
+)
+
+
+def run_scenario(suite, name, repeat, verbose):
+    """Run a scenario repeat times and keep the run with the median time"""
+    runs = []
+    for _ in range(repeat):
+        output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+        with output:
+            runs.append(getattr(suite, name)())
+    runs.sort(key=lambda result: result["seconds"])
+    result = dict(runs[len(runs) // 2])
+    if repeat > 1:
+        result["runs"] = [run["seconds"] for run in runs]
+        result["stdev"] = statistics.stdev(result["runs"])
+    return result
+
+
+def compare(results, baseline, tolerance):
+    """Return (name, baseline seconds, seconds, ratio, regressed) for scenarios in both runs"""
+    rows = []
+    for name, result in results.items():
+        base = baseline.get("results", {}).get(name)
+        if not base or not base.get("seconds"):
+            continue
+        ratio = result["seconds"] / base["seconds"]
+        regressed = ratio > 1 + tolerance and result["seconds"] - base["seconds"] > NOISE_FLOOR_S
+        rows.append((name, base["seconds"], result["seconds"], ratio, regressed))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clips", type=int, default=300, help="clips on the synthetic card")
+    parser.add_argument("--min-mb", type=float, default=2)
+    parser.add_argument("--max-mb", type=float, default=20)
+    parser.add_argument("--real-data", action="store_true", help="write clip bytes instead of sparse files")
+    parser.add_argument("--real-video", type=int, default=10, help="decodable clips for the thumbnail scenarios")
+    parser.add_argument("--folders", type=int, default=2, help="folders to spread the clips over")
+    parser.add_argument("--transfer-clips", type=int, default=20, help="clips copied by the transfer scenario")
+    parser.add_argument("--thumbnail-timeout", type=float, default=300)
+    parser.add_argument("--repeat", type=int, default=1, help="runs per scenario (the median is reported)")
+    parser.add_argument("--only", help="comma-separated scenarios to run")
+    parser.add_argument("--workdir", help="where to build the card and caches (default: a temp dir)")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="results file to compare against")
+    parser.add_argument("--save-baseline", help="also write the results here")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--verbose", action="store_true", help="show the app's console output")
+    args = parser.parse_args()
+
+    names = args.only.split(",") if args.only else SCENARIOS
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="rushes-bench-")
+    try:
+        print(f"Generating a card with {args.clips} clips in {workdir}")
+        suite = Suite(args, workdir)
+
+        results = {}
+        print(f"{'scenario':<20}{'seconds':>10}")
+        for name in names:
+            results[name] = run_scenario(suite, name, args.repeat, args.verbose)
+            print(f"{name:<20}{results[name]['seconds']:>10.3f}")
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "clips": args.clips,
+            "card_bytes": suite.card_bytes,
+            "sparse": not args.real_data,
+            "real_video": args.real_video,
+        },
+        "results": results,
+    }
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        rows = compare(results, baseline, args.tolerance)
+        print(f"\n{'scenario':<20}{'baseline':>10}{'now':>10}{'change':>10}")
+        for name, before, now, ratio, regressed in rows:
+            flag = "  SLOWER" if regressed else ""
+            print(f"{name:<20}{before:>10.3f}{now:>10.3f}{(ratio - 1) * 100:>+9.0f}%{flag}")
+        if any(row[4] for row in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
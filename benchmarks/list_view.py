@@ -0,0 +1,99 @@
+"""File list smoke check and scroll benchmark.
+
+benchmarks.headless replaces every widget, so the ingest suite never builds
+the virtualized file list. This builds the real one in a window, fills it
+with synthetic records, checks that its rows are laid out and that scrolling
+reaches the last clip (at the given DPI scaling too), and times scrolling
+from top to bottom. It needs a display.
+
+    python -m benchmarks.list_view [--records N] [--scaling 1.5]
+
+Exits with status 1 if a check fails.
+"""
+import argparse
+import sys
+import tempfile
+import time
+
+from benchmarks.headless import HeadlessApp
+from file_record import FileRecord
+
+
+def make_records(count):
+    start = int(time.time()) - count * 60
+    return [
+        FileRecord(f"/card/CLIP/C{index:05d}.MP4", f"C{index:05d}.MP4", start + index * 60, 50 * 1024 * 1024)
+        for index in range(1, count + 1)
+    ]
+
+
+def check(failures, condition, message):
+    if not condition:
+        failures.append(message)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=5000)
+    parser.add_argument("--scaling", type=float, default=1.0, help="widget scaling (Windows DPI / 96)")
+    args = parser.parse_args()
+
+    import customtkinter as ctk
+    from file_list_view import FileListView
+    from ui_components import UIComponents
+
+    ctk.set_widget_scaling(args.scaling)
+    try:
+        root = ctk.CTk()
+    except Exception as e:
+        print(f"No display to build the file list on: {str(e)}")
+        sys.exit(2)
+    root.geometry("900x600")
+
+    app = HeadlessApp(tempfile.mkdtemp(prefix="rushes-list-"))
+    app.root = root
+    app.ui = UIComponents(app)
+
+    view = FileListView(app, root)
+    view.pack(fill="both", expand=True)
+    root.update()
+
+    records = make_records(args.records)
+    view.set_records(records)
+    root.update()
+
+    failures = []
+    body_height = view.body.winfo_height()
+    shown = [row for row in view.rows if row.file_path is not None]
+    check(failures, view.visible_rows > 0, "no visible rows after the first layout")
+    check(failures, shown and all(row.frame.winfo_ismapped() for row in shown), "bound rows are not laid out")
+
+    start = time.perf_counter()
+    steps = 0
+    while view.top < view.max_top():
+        view.scroll_to(view.top + view.visible_rows)
+        root.update_idletasks()
+        steps += 1
+    seconds = time.perf_counter() - start
+    root.update()
+
+    last = [row for row in view.rows if row.index == len(records) - 1]
+    check(failures, bool(last), "scrolling to the end does not show the last clip")
+    if last:
+        check(failures, last[0].frame.winfo_y() < body_height,
+              f"the last clip's row is below the list ({last[0].frame.winfo_y()} >= {body_height} px)")
+
+    print(f"{len(records)} records, {view.visible_rows} rows visible, {len(view.rows)} row widgets")
+    print(f"Scrolled to the end in {steps} pages: {seconds * 1000:.0f} ms ({seconds * 1000 / max(1, steps):.1f} ms a page)")
+
+    app.close()
+    root.destroy()
+    if failures:
+        for message in failures:
+            print(f"FAILED: {message}")
+        sys.exit(1)
+    print("File list OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Startup import benchmark.
+
+Measures, in fresh interpreters, how long it takes to import the modules the
+app needs before the window can be shown, and whether OpenCV gets pulled in
+along the way. The cost of importing OpenCV on its own is shown for comparison.
+
+    python -m benchmarks.startup [--runs N]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Each scenario is a snippet timed in a fresh interpreter
+SCENARIOS = {
+    "metadata cache (headless)": "import cache_manager",
+    "thumbnail manager (lazy)": "import thumbnail_manager",
+    "opencv + PIL (thumbnail worker process)": "import cv2; from PIL import Image",
+}
+
+TIMER = """
+import sys, time
+start = time.perf_counter()
+{snippet}
+elapsed = time.perf_counter() - start
+print(elapsed, 'cv2' in sys.modules)
+"""
+
+
+def time_snippet(snippet):
+    """Run a snippet in a fresh interpreter and return (seconds, cv2_loaded)"""
+    result = subprocess.run(
+        [sys.executable, "-c", TIMER.format(snippet=snippet)],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True
+    )
+    elapsed, cv2_loaded = result.stdout.split()
+    return float(elapsed), cv2_loaded == "True"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per scenario")
+    args = parser.parse_args()
+
+    print(f"{'scenario':<36}{'median ms':>10}{'cv2 loaded':>12}")
+    for name, snippet in SCENARIOS.items():
+        try:
+            timings = [time_snippet(snippet) for _ in range(args.runs)]
+        except subprocess.CalledProcessError as e:
+            print(f"{name:<36}{'failed':>10}  {e.stderr.strip().splitlines()[-1]}")
+            continue
+        median_ms = statistics.median(t for t, _ in timings) * 1000
+        print(f"{name:<36}{median_ms:>10.1f}{str(timings[0][1]):>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""Synthetic memory card generator.
+
+Builds a Sony-style card layout (PRIVATE/M4ROOT/CLIP/C0001.MP4 with
+THMBNL/C0001T01.JPG sidecars) for benchmarks, without needing a camera:
+
+    python -m benchmarks.synthetic_card OUT_DIR [--clips N] [--min-mb 5] [--max-mb 50]
+
+Each clip starts with a tiny valid MP4, so it opens and probes like a
+camera's clip instead of failing in the demuxer; the rest of the file is
+sparse by default, so a card of any size costs almost no disk space (reads
+return zeros). --real-data fills the rest with bytes instead, and
+--real-video makes the first N clips short, decodable videos (without
+sidecars) so thumbnail generation has something to decode. --folders spreads clips over nested
+folders, whose sidecars sit beside the clip (<clip>.THM) rather than in
+THMBNL.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+CLIP_DIR = os.path.join("PRIVATE", "M4ROOT", "CLIP")
+THUMBNAIL_DIR = os.path.join("PRIVATE", "M4ROOT", "THMBNL")
+
+# Block repeated to fill real-data clips (random, so it doesn't compress)
+FILL_BLOCK = 1024 * 1024
+
+# Frame size and length of generated real videos
+VIDEO_SIZE = (640, 360)
+VIDEO_SECONDS = 2
+VIDEO_FPS = 25
+
+# Frame size of the small video that every clip other than the real videos starts with
+HEADER_SIZE = (160, 90)
+
+
+def clip_sizes(count, min_mb, max_mb, distribution, rng):
+    """Return clip sizes in bytes, uniform or log-normal (mostly short clips, a few long ones)"""
+    sizes = []
+    for _ in range(count):
+        if distribution == "lognormal":
+            # Median a quarter of the way into the range, clamped to it
+            median = min_mb + (max_mb - min_mb) / 4
+            mb = min(max_mb, max(min_mb, rng.lognormvariate(0, 0.75) * median))
+        else:
+            mb = rng.uniform(min_mb, max_mb)
+        sizes.append(int(mb * 1024 * 1024))
+    return sizes
+
+
+def write_sparse(path, size, header=b""):
+    with open(path, "wb") as f:
+        f.write(header)
+        f.truncate(max(size, len(header)))
+
+
+def write_filled(path, size, block, header=b""):
+    with open(path, "wb") as f:
+        f.write(header)
+        remaining = size - len(header)
+        while remaining > 0:
+            chunk = block[:min(remaining, len(block))]
+            f.write(chunk)
+            remaining -= len(chunk)
+
+
+def write_video(cv2, np, path, index):
+    """Write a short MPEG-4 clip whose frames differ from clip to clip"""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), VIDEO_FPS, VIDEO_SIZE)
+    width, height = VIDEO_SIZE
+    for frame_number in range(VIDEO_SECONDS * VIDEO_FPS):
+        frame = np.zeros((height, width, 3), dtype=np.uint8)
+        frame[:, :] = ((index * 37) % 256, (frame_number * 5) % 256, 128)
+        cv2.putText(frame, f"C{index:04d}", (40, height // 2), cv2.FONT_HERSHEY_SIMPLEX, 2, (255, 255, 255), 3)
+        writer.write(frame)
+    writer.release()
+
+
+def clip_header(cv2, np):
+    """Return the bytes of a one-second MP4 that clips start with, so they can be opened and probed
+
+    Demuxers stop at the end of the video's boxes, so whatever follows it
+    (zeros or filler) is never read.
+    """
+    handle, path = tempfile.mkstemp(suffix=".mp4")
+    os.close(handle)
+    try:
+        width, height = HEADER_SIZE
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), VIDEO_FPS, HEADER_SIZE)
+        for _ in range(VIDEO_FPS):
+            writer.write(np.full((height, width, 3), 64, dtype=np.uint8))
+        writer.release()
+        with open(path, "rb") as f:
+            return f.read()
+    finally:
+        os.remove(path)
+
+
+def write_sidecar(cv2, np, path, index):
+    """Write a small JPEG thumbnail like the ones cameras store next to clips"""
+    image = np.full((90, 160, 3), ((index * 53) % 256, 90, 160), dtype=np.uint8)
+    ok, encoded = cv2.imencode(".jpg", image)
+    if ok:
+        encoded.tofile(path)
+
+
+def generate_card(root, clips=200, min_mb=5, max_mb=50, distribution="lognormal", sparse=True,
+                  real_video=0, folders=1, sidecars=True, days=3, seed=1):
+    """Create a synthetic card under root and return its clip folder (the scan source)
+
+    Clip modification times are spread over the given number of shooting days.
+    """
+    rng = random.Random(seed)
+    clip_root = os.path.join(root, CLIP_DIR)
+    thumbnail_root = os.path.join(root, THUMBNAIL_DIR)
+    os.makedirs(clip_root, exist_ok=True)
+
+    try:
+        import cv2
+        import numpy as np
+    except ImportError:
+        cv2 = np = None
+        if real_video or sidecars:
+            print("OpenCV is not installed: generating clips without real video or sidecars")
+        real_video = 0
+        sidecars = False
+    if sidecars:
+        os.makedirs(thumbnail_root, exist_ok=True)
+
+    block = None if sparse else os.urandom(FILL_BLOCK)
+    header = clip_header(cv2, np) if cv2 is not None else b""
+    sizes = clip_sizes(clips, min_mb, max_mb, distribution, rng)
+
+    # Clips are shot in order, evenly spread across the days
+    start = time.time() - days * 86400
+    day_length = 86400 / max(1, clips // max(1, days))
+
+    for index, size in enumerate(sizes, start=1):
+        folder = (index - 1) % max(1, folders)
+        directory = clip_root if folder == 0 else os.path.join(clip_root, f"EXTRA{folder:02d}")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"C{index:04d}.MP4")
+
+        if index <= real_video:
+            write_video(cv2, np, path, index)
+        elif sparse:
+            write_sparse(path, size, header)
+        else:
+            write_filled(path, size, block, header)
+
+        # Real videos get no sidecar so that thumbnailing them exercises the decoder
+        if sidecars and index > real_video:
+            if folder == 0:
+                write_sidecar(cv2, np, os.path.join(thumbnail_root, f"C{index:04d}T01.JPG"), index)
+            else:
+                # Outside the CLIP folder the sidecar sits beside the clip
+                write_sidecar(cv2, np, os.path.join(directory, f"C{index:04d}.THM"), index)
+
+        shot = start + index * day_length
+        os.utime(path, (shot, shot))
+
+    return clip_root
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("output", help="directory to create the card in")
+    parser.add_argument("--clips", type=int, default=200)
+    parser.add_argument("--min-mb", type=float, default=5)
+    parser.add_argument("--max-mb", type=float, default=50)
+    parser.add_argument("--distribution", choices=("lognormal", "uniform"), default="lognormal")
+    parser.add_argument("--real-data", action="store_true", help="write bytes instead of sparse files")
+    parser.add_argument("--real-video", type=int, default=0, help="make the first N clips decodable videos")
+    parser.add_argument("--folders", type=int, default=1, help="spread clips over this many folders")
+    parser.add_argument("--no-sidecars", action="store_true")
+    parser.add_argument("--days", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    source = generate_card(
+        args.output, clips=args.clips, min_mb=args.min_mb, max_mb=args.max_mb,
+        distribution=args.distribution, sparse=not args.real_data, real_video=args.real_video,
+        folders=args.folders, sidecars=not args.no_sidecars, days=args.days, seed=args.seed
+    )
+    print(f"Card with {args.clips} clips written to {source}")
+
+
+if __name__ == "__main__":
+    main()
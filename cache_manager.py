@@ -1,242 +1,171 @@
 import os
 import json
-import hashlib
 import threading
 import time
-import queue
-from datetime import datetime
-from PIL import Image
-import cv2
-import customtkinter as ctk
+
+import profiling
+from file_record import FileRecord
+from metadata_backend import JsonMetadataBackend, SQLiteMetadataBackend
+from metadata_store import MetadataStore
+from persistence import write_json_atomic
 
 class CacheManager:
     def __init__(self, app):
         self.app = app
         
-        # Initialize caches
-        self.thumbnail_cache = {}
-        self.file_metadata_cache = {}
-        
-        # Thumbnail processing setup
-        self.thumbnail_queue = queue.Queue()
-        self.thumbnail_processing = False
+        # Thread-safe store of FileRecords, shared by the scan, thumbnail and UI threads
+        self.metadata_store = MetadataStore()
         
-        # Maximum concurrent thumbnail generation threads
-        self.max_thumbnail_threads = 4
-        self.active_thumbnail_threads = 0
-        self.thumbnail_thread_lock = threading.Lock()
+        # Metadata cache backend and lazily loaded sources
+        self.metadata_backend = None
+        self.loaded_sources = set()
+        self.load_lock = threading.Lock()
+        self.card_ids = {}
         
-        # Create a placeholder thumbnail for use while loading
-        self.placeholder_img = self.create_placeholder_thumbnail()
-        self.error_img = self.create_error_thumbnail()
-    
-    def create_placeholder_thumbnail(self):
-        """Create a placeholder thumbnail"""
-        # Create a blank image with a "Loading..." text
-        img = Image.new('RGB', (70, 40), color=(50, 50, 50))
+        # Set once the metadata cache has been opened by the startup loader
+        self.metadata_ready = threading.Event()
         
-        # Convert to CTkImage for proper scaling
-        return ctk.CTkImage(light_image=img, dark_image=img, size=(70, 40))
+        # Clips probed since the UI last picked up their clip info
+        self.probed_paths = set()
+        self.probed_lock = threading.Lock()
     
-    def create_error_thumbnail(self):
-        """Create an error thumbnail"""
-        # Create a red blank image
-        img = Image.new('RGB', (70, 40), color=(100, 30, 30))
-        
-        # Convert to CTkImage for proper scaling
-        return ctk.CTkImage(light_image=img, dark_image=img, size=(70, 40))
+    def create_file_record(self, file_path, rel_path, mod_time, file_size, source_dir=None):
+        """Build a fresh record for a file (not yet added to the cache)"""
+        thumbnail_manager = getattr(self.app, 'thumbnail_manager', None)
+        return FileRecord(
+            file_path,
+            rel_path,
+            int(mod_time),
+            file_size,
+            source_dir=source_dir,
+            card_id=self.get_card_id(source_dir) if source_dir else None,
+            last_checked=int(time.time()),
+            has_thumbnail=(thumbnail_manager.has_disk_thumbnail(file_path, file_size, mod_time)
+                           if thumbnail_manager else False)
+        )
     
-    def start_thumbnail_worker(self):
-        """Start the thumbnail generation worker thread"""
-        if not self.thumbnail_processing:
-            self.thumbnail_processing = True
-            # Reduce from 4 to 2 worker threads to lower CPU usage
-            self.max_thumbnail_threads = 2
-            for _ in range(self.max_thumbnail_threads):
-                thread = threading.Thread(target=self.thumbnail_worker, daemon=True)
-                thread.start()
+    def add_file_to_metadata_cache(self, file_path, rel_path, mod_time, file_size, source_dir=None):
+        """Add or update a file in the metadata cache and return its record"""
+        record = self.create_file_record(file_path, rel_path, mod_time, file_size, source_dir)
+        self.metadata_store.put(record)
+        return record
     
-    def thumbnail_worker(self):
-        """Worker thread to process thumbnails in background"""
-        try:
-            with self.thumbnail_thread_lock:
-                self.active_thumbnail_threads += 1
-                
-            while self.thumbnail_processing:
-                try:
-                    # Get file path and label widget from queue with timeout
-                    file_path, label_widget = self.thumbnail_queue.get(timeout=1.0)
-                    
-                    # Generate thumbnail (will check disk cache first)
-                    thumbnail = self.generate_thumbnail(file_path)
-                    
-                    # Update label in main thread
-                    self.app.root.after(0, lambda w=label_widget, t=thumbnail: w.configure(image=t))
-                    
-                    # Mark task as done
-                    self.thumbnail_queue.task_done()
-                    
-                    # Add small delay between processing thumbnails to reduce CPU load
-                    time.sleep(0.05)
-                except queue.Empty:
-                    # No more thumbnails to process
-                    if not self.thumbnail_queue.unfinished_tasks:
-                        # If queue is empty and we're done with all tasks
-                        time.sleep(0.2)  # Increased from 0.1 to 0.2 seconds
-                except Exception as e:
-                    print(f"Error in thumbnail worker: {str(e)}")
-                    time.sleep(0.2)  # Increased from 0.1 to 0.2 seconds
-        finally:
-            with self.thumbnail_thread_lock:
-                self.active_thumbnail_threads -= 1
-                if self.active_thumbnail_threads == 0:
-                    self.thumbnail_processing = False
+    def get_cached_record(self, file_path):
+        """Return the cached record for a file, looking it up in the backend if needed"""
+        record = self.metadata_store.get(file_path)
+        if record is None and self.metadata_backend is not None:
+            record = self.metadata_backend.get(file_path)
+            if record is not None:
+                self.metadata_store.load([record])
+                record = self.metadata_store.get(file_path)
+        return record
     
-    def generate_thumbnail(self, file_path):
-        """Generate a thumbnail for the given video file"""
-        if file_path in self.thumbnail_cache:
-            return self.thumbnail_cache[file_path]
+    def is_file_in_cache(self, file_path):
+        """Check if a file is in the metadata cache and if its metadata is still valid"""
+        record = self.get_cached_record(file_path)
+        if record is None:
+            return False
         
-        # Check if we have a saved thumbnail on disk
-        disk_thumbnail = self.load_thumbnail_from_disk(file_path)
-        if disk_thumbnail:
-            return disk_thumbnail
-            
+        # Check size and modified time with a single stat (this also fails if the file is gone)
         try:
-            # Use OpenCV to capture a frame
-            cap = cv2.VideoCapture(file_path)
-            
-            # Set frame position to 20% of the video to get a meaningful frame
-            if cap.isOpened():
-                # Get total frames
-                total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-                # Set position to 20% through
-                if total_frames > 0:
-                    cap.set(cv2.CAP_PROP_POS_FRAMES, int(total_frames * 0.2))
-            
-            success, frame = cap.read()
-            cap.release()  # Release the video capture resource immediately
-            
-            if success:
-                # Convert from BGR to RGB
-                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                
-                # Resize to thumbnail size - use a more efficient method
-                frame = cv2.resize(frame, (70, 40), interpolation=cv2.INTER_NEAREST)
-                
-                # Convert to PIL Image
-                image = Image.fromarray(frame)
-                
-                # Save the thumbnail to disk for future use
-                self.save_thumbnail_to_disk(file_path, image)
-                
-                # Convert to CTkImage for proper scaling
-                ctk_image = ctk.CTkImage(light_image=image, dark_image=image, size=(70, 40))
-                
-                # Store in cache
-                self.thumbnail_cache[file_path] = ctk_image
-                
-                # Update metadata to indicate thumbnail exists
-                if file_path in self.file_metadata_cache:
-                    self.file_metadata_cache[file_path]['has_thumbnail'] = True
-                
-                # Return the image
-                return ctk_image
-            else:
-                # Return an error thumbnail
-                self.thumbnail_cache[file_path] = self.error_img
-                return self.error_img
-                
-        except Exception as e:
-            print(f"Error creating thumbnail: {str(e)}")
-            # Return an error thumbnail
-            self.thumbnail_cache[file_path] = self.error_img
-            return self.error_img
+            file_stat = os.stat(file_path)
+        except OSError:
+            return False
+        
+        if file_stat.st_size != record.file_size:
+            return False
+        
+        # Allow for the 2 second timestamp resolution of FAT/exFAT cards
+        if abs(int(file_stat.st_mtime) - record.mod_time) > 2:
+            return False
+        
+        return True
     
-    def get_thumbnail_path(self, file_path):
-        """Generate a unique path for the thumbnail file based on the source file path"""
-        # Create a hash of the file path to use as the filename
-        file_hash = hashlib.md5(file_path.encode()).hexdigest()
-        return os.path.join(self.app.thumbnails_dir, f"{file_hash}.png")
+    def update_metadata_cache(self, records, removed_paths=()):
+        """Apply a scan's new/changed records and removals as one batch"""
+        with self.metadata_store.batch():
+            self.metadata_store.put_many(records)
+            self.metadata_store.remove_many(removed_paths)
     
-    def save_thumbnail_to_disk(self, file_path, image):
-        """Save a thumbnail to disk"""
-        try:
-            thumbnail_path = self.get_thumbnail_path(file_path)
-            image.save(thumbnail_path, "PNG")
-            return True
-        except Exception as e:
-            print(f"Error saving thumbnail to disk: {str(e)}")
-            return False
+    def remove_file_from_metadata_cache(self, file_path):
+        """Remove a file from the metadata cache"""
+        self.metadata_store.remove(file_path)
     
-    def load_thumbnail_from_disk(self, file_path):
-        """Load a thumbnail from disk if it exists"""
-        thumbnail_path = self.get_thumbnail_path(file_path)
-        if os.path.exists(thumbnail_path):
-            try:
-                # Load the image from disk
-                pil_image = Image.open(thumbnail_path)
-                # Convert to CTkImage
-                ctk_image = ctk.CTkImage(light_image=pil_image, dark_image=pil_image, size=(70, 40))
-                # Store in cache and return
-                self.thumbnail_cache[file_path] = ctk_image
-                return ctk_image
-            except Exception as e:
-                print(f"Error loading thumbnail from disk: {str(e)}")
-        return None
+    def set_has_thumbnail(self, file_path):
+        """Record that a thumbnail has been generated for a cached file"""
+        record = self.metadata_store.get(file_path)
+        if record is not None and not record.has_thumbnail:
+            self.metadata_store.update(file_path, has_thumbnail=True)
     
-    def clear_thumbnails(self):
-        """Clear all thumbnails from disk"""
-        try:
-            for file in os.listdir(self.app.thumbnails_dir):
-                file_path = os.path.join(self.app.thumbnails_dir, file)
-                if os.path.isfile(file_path) and file.endswith('.png'):
-                    os.remove(file_path)
-            self.app.ui.show_notification("All thumbnails cleared from disk", "info")
-        except Exception as e:
-            self.app.ui.show_notification(f"Error clearing thumbnails: {str(e)}", "error")
+    def set_clip_info(self, file_path, clip_info):
+        """Store probed clip metadata (duration, fps, resolution, codec) and refresh its row"""
+        updated = self.metadata_store.update(
+            file_path,
+            duration=clip_info.get('duration'),
+            fps=clip_info.get('fps'),
+            width=clip_info.get('width'),
+            height=clip_info.get('height'),
+            codec=clip_info.get('codec') or ""
+        )
+        if updated:
+            with self.probed_lock:
+                self.probed_paths.add(file_path)
+            # One keyed job picks up every clip probed since it last ran
+            self.app.scheduler.post(self.apply_probed_clips, key="probed_clips")
     
-    def add_file_to_metadata_cache(self, file_path, rel_path, mod_time, file_size):
-        """Add or update a file in the metadata cache"""
-        self.file_metadata_cache[file_path] = {
-            'rel_path': rel_path,
-            'mod_time': mod_time,
-            'file_size': file_size,
-            'last_checked': datetime.now(),
-            'has_thumbnail': os.path.exists(self.get_thumbnail_path(file_path))
-        }
+    def apply_probed_clips(self):
+        """Show newly probed clip info and save it with a single metadata write (UI thread)"""
+        with self.probed_lock:
+            file_paths, self.probed_paths = self.probed_paths, set()
+        if not file_paths:
+            return
+        self.save_metadata_cache()
+        self.app.file_manager.refresh_records(file_paths)
     
-    def is_file_in_cache(self, file_path):
-        """Check if a file is in the metadata cache and if its metadata is still valid"""
-        if file_path in self.file_metadata_cache:
-            cached_data = self.file_metadata_cache[file_path]
-            
-            # Check if the file still exists
-            if not os.path.exists(file_path):
-                return False
-                
-            # Check if the file size has changed
+    def get_card_id(self, source_dir):
+        """Identify the memory card (volume) a source directory lives on"""
+        if source_dir in self.card_ids:
+            return self.card_ids[source_dir]
+        
+        card_id = None
+        try:
+            if os.name == 'nt':
+                # Use the volume serial number, which survives drive letter changes
+                import ctypes
+                drive = os.path.splitdrive(os.path.abspath(source_dir))[0] + "\\"
+                serial = ctypes.c_uint32()
+                if ctypes.windll.kernel32.GetVolumeInformationW(
+                        drive, None, 0, ctypes.byref(serial), None, None, None, 0):
+                    card_id = f"{serial.value:08X}"
+            if card_id is None:
+                card_id = str(os.stat(source_dir).st_dev)
+        except Exception:
+            card_id = None
+        
+        self.card_ids[source_dir] = card_id
+        return card_id
+    
+    @profiling.timed("ensure_source_loaded")
+    def ensure_source_loaded(self, source_dir):
+        """Lazily load the cached metadata for one source directory"""
+        with self.load_lock:
+            if source_dir in self.loaded_sources or self.metadata_backend is None:
+                return
             try:
-                current_size = os.path.getsize(file_path)
-                if current_size != cached_data.get('file_size', 0):
-                    return False
-                    
-                # Check if modified time has changed
-                current_mod_time = datetime.fromtimestamp(os.path.getmtime(file_path))
-                cached_mod_time = cached_data.get('mod_time')
-                
-                if cached_mod_time and abs((current_mod_time - cached_mod_time).total_seconds()) > 2:
-                    return False
-                    
-                return True
-            except:
-                return False
-        return False
+                records = self.metadata_backend.load_source(source_dir)
+                # The store keeps entries updated in memory since the last save
+                self.metadata_store.load(records.values())
+                self.loaded_sources.add(source_dir)
+                print(f"Loaded metadata for {len(records)} files from {source_dir}")
+            except Exception as e:
+                print(f"Error loading metadata for {source_dir}: {str(e)}")
     
     def refresh_file_cache(self):
         """Clear the file metadata cache and rescan"""
-        self.file_metadata_cache = {}  # Clear the metadata cache
-        self.thumbnail_cache = {}      # Clear the thumbnail cache
+        self.metadata_store.clear()    # Clear the metadata cache
+        with self.load_lock:
+            self.loaded_sources = set()  # Reload cached entries from the backend on demand
+        self.app.thumbnail_manager.clear_memory_cache()
         
         # Show notification
         self.app.ui.show_notification("Clearing cache and rescanning files...", "info")
@@ -271,6 +200,26 @@ class CacheManager:
                 else:
                     self.app.last_project = ""
                 
+                # Last-known project list, shown until the projects root has been listed
+                self.app.cached_projects = config.get('projects', [])
+                
+                # Hover filmstrip length (0 disables filmstrips)
+                self.app.filmstrip_frames = int(config.get('filmstrip_frames', self.app.filmstrip_frames))
+                
+                # Metrics exporter address (port 0 turns it off)
+                self.app.metrics_port = int(config.get('metrics_port', self.app.metrics_port))
+                self.app.metrics_host = config.get('metrics_host', self.app.metrics_host)
+                
+                # Timing reports written beside transferred clips
+                self.app.save_transfer_reports = bool(config.get('save_transfer_reports', self.app.save_transfer_reports))
+                
+                # Per-project rushes stats from earlier runs, shown until recounted
+                self.app.show_project_stats = bool(config.get('show_project_stats', self.app.show_project_stats))
+                self.app.project_index.load_stats(config.get('project_stats', {}))
+                
+                # Named selections of files
+                self.app.selection.saved = dict(config.get('saved_selections', {}))
+                
                 self.app.config_loaded = True
             else:
                 print(f"Configuration file {self.app.config_file} not found")
@@ -278,7 +227,7 @@ class CacheManager:
             print(f"Error loading configuration: {str(e)}")
     
     def save_config(self):
-        """Save current configuration to JSON file"""
+        """Save current configuration to JSON file (written in the background)"""
         try:
             # Get source path from entry in case it was manually edited
             entered_source = self.app.source_entry.get().strip()
@@ -291,73 +240,81 @@ class CacheManager:
             config = {
                 'source_path': self.app.source_path if self.app.source_path else "",
                 'destination_base_path': self.app.destination_base_path,
-                'last_project': current_project
+                'last_project': current_project,
+                'projects': list(self.app.cached_projects),
+                'filmstrip_frames': self.app.filmstrip_frames,
+                'saved_selections': dict(self.app.selection.saved),
+                'show_project_stats': self.app.show_project_stats,
+                'save_transfer_reports': self.app.save_transfer_reports,
+                'metrics_port': self.app.metrics_port,
+                'metrics_host': self.app.metrics_host,
+                'project_stats': self.app.project_index.stats_snapshot()
             }
             
-            print(f"Saving configuration: {config}")
-            
-            with open(self.app.config_file, 'w') as f:
-                json.dump(config, f, indent=4)
-                
-            print(f"Configuration saved to {self.app.config_file}")
+            # Hand the snapshot to the persistence service; repeated saves are coalesced
+            self.app.persistence.schedule(
+                'config', lambda: write_json_atomic(self.app.config_file, config)
+            )
             
             # Also update our last_project attribute
             self.app.last_project = current_project
         except Exception as e:
             print(f"Error saving configuration: {str(e)}")
     
+    def create_metadata_backend(self):
+        """Create the configured metadata cache backend"""
+        if self.app.metadata_backend_type == "json":
+            return JsonMetadataBackend(self.app.metadata_cache_file)
+        # The SQLite backend imports the legacy JSON cache on first use
+        return SQLiteMetadataBackend(self.app.metadata_db_file, legacy_json_path=self.app.metadata_cache_file)
+    
+    @profiling.timed("load_metadata_cache")
     def load_metadata_cache(self):
-        """Load file metadata cache from disk"""
+        """Open the metadata cache backend; entries are loaded lazily per source"""
         try:
-            if os.path.exists(self.app.metadata_cache_file):
-                print(f"Loading metadata cache from {self.app.metadata_cache_file}")
-                with open(self.app.metadata_cache_file, 'r') as f:
-                    cached_data = json.load(f)
-                    
-                # Process the loaded data
-                self.file_metadata_cache = {}
-                for file_path, data in cached_data.items():
-                    # Convert string dates back to datetime objects
-                    if 'mod_time' in data:
-                        try:
-                            data['mod_time'] = datetime.fromisoformat(data['mod_time'])
-                        except Exception as e:
-                            print(f"Error converting date: {e}")
-                            # If conversion fails, use current time
-                            data['mod_time'] = datetime.now()
-                            
-                    if 'last_checked' in data:
-                        try:
-                            data['last_checked'] = datetime.fromisoformat(data['last_checked'])
-                        except Exception as e:
-                            print(f"Error converting last_checked date: {e}")
-                            # If conversion fails, use current time
-                            data['last_checked'] = datetime.now()
-                            
-                    self.file_metadata_cache[file_path] = data
-                    
-                print(f"Loaded metadata for {len(self.file_metadata_cache)} files")
+            self.metadata_backend = self.create_metadata_backend()
+            print(f"Metadata cache opened with {self.metadata_backend.count()} files")
         except Exception as e:
             print(f"Error loading metadata cache: {str(e)}")
-            self.file_metadata_cache = {}
+            self.metadata_backend = None
+        finally:
+            self.metadata_ready.set()
     
     def save_metadata_cache(self):
-        """Save file metadata cache to disk"""
+        """Schedule changed and deleted entries to be written in the background"""
+        self.app.persistence.schedule('metadata', self.write_metadata_changes)
+    
+    @profiling.timed("write_metadata_changes")
+    def write_metadata_changes(self):
+        """Write changed and deleted entries to the metadata cache backend"""
+        if self.metadata_backend is None:
+            return
         try:
-            # Convert the cache to a serializable format
-            serializable_cache = {}
-            for file_path, data in self.file_metadata_cache.items():
-                serializable_data = data.copy()
-                # Convert datetime objects manually
-                if 'mod_time' in serializable_data and isinstance(serializable_data['mod_time'], datetime):
-                    serializable_data['mod_time'] = serializable_data['mod_time'].isoformat()
-                if 'last_checked' in serializable_data and isinstance(serializable_data['last_checked'], datetime):
-                    serializable_data['last_checked'] = serializable_data['last_checked'].isoformat()
-                serializable_cache[file_path] = serializable_data
-                
-            with open(self.app.metadata_cache_file, 'w') as f:
-                json.dump(serializable_cache, f, indent=4)
-                
-            print(f"Saved metadata for {len(self.file_metadata_cache)} files")
+            # Tracking is only reset once the write has succeeded, so a failed
+            # write is retried on the next save
+            dirty, deleted = self.metadata_store.unsaved_changes()
+            
+            if deleted:
+                self.metadata_backend.delete(deleted)
+            if dirty:
+                self.metadata_backend.upsert(dirty)
+            self.metadata_store.mark_saved(dirty, deleted)
         except Exception as e:
-            print(f"Error saving metadata cache: {str(e)}") 
\ No newline at end of file
+            print(f"Error saving metadata cache: {str(e)}")
+    
+    def iter_cached_identities(self):
+        """Yield (file_path, file_size, mod_time) for every cached file, unsaved changes taking precedence"""
+        dirty, deleted = self.metadata_store.unsaved_changes()
+        changed = {record.file_path for record in dirty} | deleted
+        if self.metadata_backend is not None:
+            for identity in self.metadata_backend.iter_identities():
+                if identity[0] not in changed:
+                    yield identity
+        for record in dirty:
+            yield record.file_path, record.file_size, record.mod_time
+    
+    def close_metadata_cache(self):
+        """Close the metadata cache backend"""
+        if self.metadata_backend is not None:
+            self.metadata_backend.close()
+            self.metadata_backend = None
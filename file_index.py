@@ -0,0 +1,112 @@
+import os
+
+# Sortable file list columns: column -> (sort key, newest/largest first by default)
+SORT_COLUMNS = {
+    "name": (lambda record: os.path.basename(record.file_path).lower(), False),
+    "date": (lambda record: record.mod_time, True),
+    "size": (lambda record: record.file_size, True),
+    "duration": (lambda record: record.duration or 0, True),
+    "format": (lambda record: ((record.width or 0) * (record.height or 0), record.fps or 0), True),
+}
+
+# Columns whose values arrive later, when clips are probed
+PROBED_COLUMNS = ("duration", "format")
+
+
+class FileIndex:
+    """In-memory index over the scanned file list
+
+    Holds each sort column's order (built the first time it is used), the
+    lower-cased file names for searching and the clips of each shooting
+    day. view() combines them into the list to show without touching the
+    disk, so changing the sort, search or day filter takes milliseconds
+    even on cards with thousands of clips.
+    """
+
+    def __init__(self):
+        self.records = []
+        self.positions = {}
+        self.names = []
+        self.by_day = {}
+
+        # column -> record indexes in ascending order
+        self.orders = {}
+
+        # The last name search and its matches; a longer search only needs to
+        # look through the clips the shorter one matched
+        self.last_query = None
+        self.last_matches = None
+
+    def set_records(self, records):
+        """Index a new file list"""
+        self.records = list(records)
+        self.positions = {record.file_path: index for index, record in enumerate(self.records)}
+        self.names = [os.path.basename(record.file_path).lower() for record in self.records]
+        self.by_day = {}
+        for index, record in enumerate(self.records):
+            self.by_day.setdefault(record.mod_datetime.date(), []).append(index)
+        self.orders = {}
+        self.last_query = None
+        self.last_matches = None
+
+    def replace(self, record):
+        """Swap in a newer record for a listed clip (e.g. once it has been probed)
+
+        Returns the clip's position in the list, or None if it isn't listed.
+        """
+        index = self.positions.get(record.file_path)
+        if index is not None:
+            self.records[index] = record
+        return index
+
+    def invalidate(self, columns=PROBED_COLUMNS):
+        """Forget the order of columns whose values changed"""
+        for column in columns:
+            self.orders.pop(column, None)
+
+    def order(self, column):
+        """Return record indexes sorted ascending by a column"""
+        order = self.orders.get(column)
+        if order is None:
+            key, _ = SORT_COLUMNS[column]
+            records = self.records
+            order = sorted(range(len(records)), key=lambda index: key(records[index]))
+            self.orders[column] = order
+        return order
+
+    def name_matches(self, query):
+        """Return the indexes of clips whose name contains query"""
+        query = query.lower()
+        if query == self.last_query:
+            return self.last_matches
+        if self.last_query and self.last_query in query:
+            candidates = self.last_matches
+        else:
+            candidates = range(len(self.names))
+        names = self.names
+        matches = {index for index in candidates if query in names[index]}
+        self.last_query = query
+        self.last_matches = matches
+        return matches
+
+    def days(self):
+        """Return (date, clip count) for every shooting day, newest first"""
+        return sorted(((day, len(indexes)) for day, indexes in self.by_day.items()), reverse=True)
+
+    def view(self, column, reverse=False, query="", day=None):
+        """Return the records to show, sorted by column and filtered by name and day"""
+        order = self.order(column)
+        if reverse:
+            order = order[::-1]
+
+        keep = None
+        if query:
+            keep = self.name_matches(query)
+        if day is not None:
+            on_day = set(self.by_day.get(day, ()))
+            keep = on_day if keep is None else keep & on_day
+        if keep is not None:
+            order = [index for index in order if index in keep]
+
+        records = self.records
+        return [records[index] for index in order]
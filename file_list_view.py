@@ -0,0 +1,257 @@
+import os
+import tkinter as tk
+import customtkinter as ctk
+
+# Height of one row in pixels (70x40 thumbnail plus padding)
+ROW_HEIGHT = 50
+
+# Rows beyond the visible ones whose thumbnails are fetched ahead of scrolling
+PREFETCH_ROWS = 20
+
+
+class FileListRow:
+    """One pooled row of widgets, rebound to whichever record scrolls into its slot"""
+
+    def __init__(self, view, master):
+        self.view = view
+        self.app = view.app
+        self.index = None
+        self.file_path = None
+
+        # CTk widgets take their size in the constructor, not in place(); the
+        # frame keeps it rather than shrinking to fit its labels
+        self.frame = ctk.CTkFrame(master, height=ROW_HEIGHT - 4)
+        self.frame.pack_propagate(False)
+
+        self.var = tk.BooleanVar(value=False)
+        self.checkbox = ctk.CTkCheckBox(
+            self.frame,
+            text="",
+            variable=self.var,
+            onvalue=True,
+            offvalue=False,
+            width=30,
+            command=self.on_toggled
+        )
+        # Shift-click selects a range; being more specific, it replaces the plain click
+        self.checkbox.bind("<Shift-Button-1>", self.on_shift_click, add=True)
+        self.thumb_label = ctk.CTkLabel(self.frame, text="", image=self.app.thumbnail_manager.placeholder_img)
+        self.name_label = ctk.CTkLabel(self.frame, text="", width=200, anchor="w", justify="left")
+        self.date_label = ctk.CTkLabel(self.frame, text="", width=150, anchor="w")
+        self.size_label = ctk.CTkLabel(self.frame, text="", width=80, anchor="w")
+        self.duration_label = ctk.CTkLabel(self.frame, text="", width=70, anchor="w")
+        self.format_label = ctk.CTkLabel(self.frame, text="", width=170, anchor="w")
+
+        self.checkbox.pack(side=tk.LEFT)
+        self.thumb_label.pack(side=tk.LEFT, padx=4)
+        for label in (self.name_label, self.date_label, self.size_label, self.duration_label, self.format_label):
+            label.pack(side=tk.LEFT, padx=4)
+
+        # Hovering scrubs through a filmstrip of the clip
+        thumbnails = self.app.thumbnail_manager
+        self.thumb_label.bind("<Enter>", lambda e: self.file_path and thumbnails.start_filmstrip(self.file_path, self.thumb_label))
+        self.thumb_label.bind("<Motion>", lambda e: thumbnails.scrub_filmstrip(self.thumb_label, e.x / max(1, e.widget.winfo_width())))
+        self.thumb_label.bind("<Leave>", lambda e: self.file_path and thumbnails.stop_filmstrip(self.file_path, self.thumb_label))
+
+    def bind(self, index, record):
+        """Show a record in this row"""
+        self.index = index
+        if record.file_path != self.file_path:
+            if self.file_path is not None:
+                # The previous clip's thumbnail may still arrive - it must not land here
+                self.app.thumbnail_manager.stop_filmstrip(self.file_path, self.thumb_label)
+                self.app.thumbnail_manager.detach_request(self.file_path)
+            self.file_path = record.file_path
+
+            self.thumb_label.configure(image=self.app.thumbnail_manager.placeholder_img)
+            self.app.thumbnail_manager.request_thumbnail(
+                record.file_path, lambda image, p=record.file_path: self.show_thumbnail(p, image), index
+            )
+            self.name_label.configure(text=os.path.basename(record.file_path))
+            self.date_label.configure(text=record.mod_datetime.strftime("%Y-%m-%d %H:%M"))
+            self.size_label.configure(text=self.app.ui.format_size(record.file_size))
+        self.show_clip_info(record)
+        self.show_selection()
+
+    def unbind(self):
+        """Hide this row"""
+        if self.file_path is not None:
+            self.app.thumbnail_manager.detach_request(self.file_path)
+        self.index = None
+        self.file_path = None
+        self.frame.place_forget()
+
+    def show_thumbnail(self, file_path, image):
+        """Put a finished thumbnail on the row, if it still shows that clip"""
+        if file_path == self.file_path:
+            self.thumb_label.configure(image=image)
+
+    def show_clip_info(self, record):
+        self.duration_label.configure(text=self.app.ui.format_duration(record))
+        self.format_label.configure(text=self.app.ui.format_clip_format(record))
+
+    def show_selection(self):
+        selected = self.file_path in self.app.selection
+        if self.var.get() != selected:
+            self.var.set(selected)
+
+    def on_toggled(self):
+        if self.file_path is not None:
+            self.app.toggle_file_selection(self.file_path, self.var)
+
+    def on_shift_click(self, event):
+        if self.file_path is not None:
+            self.app.extend_file_selection(self.file_path)
+        return "break"
+
+
+class FileListView:
+    """Virtualized file list
+
+    Only enough row widgets to fill the visible area are created. Scrolling
+    moves a window over the record list and rebinds the pooled rows to the
+    records in it, so a card with thousands of clips costs the same widgets
+    (and the same time to show) as one with a screenful.
+    """
+
+    def __init__(self, app, master):
+        self.app = app
+        self.records = []
+        # file path -> position in records, built the first time a record is replaced
+        self.positions = None
+        self.top = 0
+        self.rows = []
+        self.visible_rows = 0
+
+        self.frame = ctk.CTkFrame(master)
+        self.body = ctk.CTkFrame(self.frame, fg_color="transparent")
+        self.scrollbar = ctk.CTkScrollbar(self.frame, command=self.on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.body.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.body.bind("<Configure>", self.on_resize)
+
+        # The wheel is bound application-wide and filtered to pointers over the list
+        self.body.bind_all("<MouseWheel>", self.on_mouse_wheel, add=True)
+        self.body.bind_all("<Button-4>", self.on_mouse_wheel, add=True)
+        self.body.bind_all("<Button-5>", self.on_mouse_wheel, add=True)
+
+        self.viewport_update_id = None
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    # ----- data -----
+
+    def set_records(self, records):
+        """Show a new list of records, scrolled to the top"""
+        self.records = records
+        self.positions = None
+        self.top = 0
+        # Rebind every row from scratch; pending requests have been dropped
+        for row in self.rows:
+            row.unbind()
+        self.refresh()
+
+    def clear(self):
+        """Remove every record from the list"""
+        self.set_records([])
+
+    def refresh_record(self, record):
+        """Show a newer copy of a listed record, redrawing its row if it is on screen"""
+        if self.positions is None:
+            self.positions = {listed.file_path: index for index, listed in enumerate(self.records)}
+        index = self.positions.get(record.file_path)
+        if index is not None:
+            self.records[index] = record
+        for row in self.rows:
+            if row.file_path == record.file_path:
+                row.show_clip_info(record)
+
+    def refresh_selection(self):
+        """Sync the visible checkboxes with the selection"""
+        for row in self.rows:
+            if row.file_path is not None:
+                row.show_selection()
+
+    # ----- layout and scrolling -----
+
+    def on_resize(self, event):
+        # place() scales row positions by the DPI scaling, but event sizes are real pixels
+        row_height = self.body._apply_widget_scaling(ROW_HEIGHT)
+        visible_rows = max(1, event.height // row_height)
+        if visible_rows == self.visible_rows:
+            return
+        self.visible_rows = visible_rows
+        # One extra row covers the partly visible one at the bottom
+        while len(self.rows) < visible_rows + 1:
+            self.rows.append(FileListRow(self, self.body))
+        self.refresh()
+
+    def max_top(self):
+        return max(0, len(self.records) - self.visible_rows)
+
+    def scroll_to(self, top):
+        top = min(max(0, int(top)), self.max_top())
+        if top != self.top:
+            self.top = top
+            self.refresh()
+
+    def on_scrollbar(self, action, *args):
+        if action == "moveto":
+            self.scroll_to(float(args[0]) * len(self.records))
+        elif action == "scroll":
+            amount, unit = int(args[0]), args[1]
+            step = self.visible_rows if unit == "pages" else 1
+            self.scroll_to(self.top + amount * step)
+
+    def on_mouse_wheel(self, event):
+        # Ignore wheel events over other widgets; the trailing dot keeps a
+        # sibling such as .!ctkframe25 from matching .!ctkframe2
+        widget_path = str(event.widget)
+        frame_path = str(self.frame)
+        if widget_path != frame_path and not widget_path.startswith(frame_path + "."):
+            return
+        if event.num == 4:
+            delta = -1
+        elif event.num == 5:
+            delta = 1
+        else:
+            delta = -1 if event.delta > 0 else 1
+        self.scroll_to(self.top + delta * 3)
+
+    def refresh(self):
+        """Bind the pooled rows to the records in the visible window"""
+        for slot, row in enumerate(self.rows):
+            index = self.top + slot
+            if slot <= self.visible_rows and index < len(self.records):
+                row.bind(index, self.records[index])
+                row.frame.place(x=0, y=slot * ROW_HEIGHT, relwidth=1)
+            else:
+                row.unbind()
+
+        total = len(self.records)
+        if total:
+            self.scrollbar.set(self.top / total, min(1.0, (self.top + self.visible_rows) / total))
+        else:
+            self.scrollbar.set(0, 1)
+        self.schedule_viewport_update()
+
+    def schedule_viewport_update(self):
+        """Tell the thumbnail manager what is on screen, shortly after scrolling stops"""
+        if self.viewport_update_id is None:
+            self.viewport_update_id = self.app.root.after(50, self.update_viewport)
+
+    def update_viewport(self):
+        self.viewport_update_id = None
+        if not self.records:
+            return
+        first = self.top
+        last = min(len(self.records), self.top + self.visible_rows) - 1
+        thumbnails = self.app.thumbnail_manager
+        thumbnails.set_viewport(first, last)
+
+        # Fetch thumbnails just beyond the screen so they are ready when scrolled to
+        for index in range(max(0, first - PREFETCH_ROWS), min(len(self.records), last + 1 + PREFETCH_ROWS)):
+            if not first <= index <= last:
+                thumbnails.prefetch(self.records[index].file_path, index)
@@ -2,13 +2,29 @@ import os
 import shutil
 import threading
 import time
-from datetime import datetime
+
+import profiling
+from file_index import FileIndex, SORT_COLUMNS
+from transfer_telemetry import FileTiming, TransferTelemetry
 
 class FileManager:
     def __init__(self, app):
         self.app = app
         self.scanning_in_progress = False
         
+        # Current file list order (newest first until a column header is clicked)
+        self.sort_column = "date"
+        self.sort_reverse = True
+        
+        # Sorted views, name search and shooting days over the scanned list,
+        # and the current filters (name substring, shooting day or None)
+        self.index = FileIndex()
+        self.name_filter = ""
+        self.day_filter = None
+        
+        # Timings of the last transfer, shown in the diagnostics tab
+        self.last_transfer = None
+        
     def scan_files(self, force_scan=False):
         """Scan the source directory for video files and populate the list
         
@@ -55,9 +71,16 @@ class FileManager:
             
         self.app.root.after(50, delayed_scan)
     
+    @profiling.profiled("scan_files_thread")
     def scan_files_thread(self, source_path, force_scan=False):
         """Background thread for scanning files"""
         try:
+            # Wait for the startup loader to open the metadata cache
+            self.app.cache_manager.metadata_ready.wait()
+            
+            # Load cached entries for this source from the metadata backend
+            self.app.cache_manager.ensure_source_loaded(source_path)
+            
             # Check if we already have a good cache for this directory and not forcing a scan
             if not force_scan and self.has_valid_cache_for_directory(source_path):
                 self.app.ui.show_notification("Using cached file information for faster loading", "info")
@@ -96,14 +119,15 @@ class FileManager:
             
             # If forcing a scan with existing cache, prepare to check for deleted files
             existing_files_in_cache = set()
-            if force_scan and self.app.cache_manager.file_metadata_cache:
-                for file_path, data in self.app.cache_manager.file_metadata_cache.items():
-                    if data.get('source_dir') == source_path:
-                        existing_files_in_cache.add(file_path)
+            if force_scan:
+                existing_files_in_cache = self.app.cache_manager.metadata_store.paths_for_source(source_path)
             
             # Set of files found in current scan
             current_files = set()
             
+            # New or changed records, written to the metadata store in one batch after the walk
+            updated_records = []
+            
             # Update progress indicator - throttle updates
             def update_scan_progress(current, message):
                 nonlocal last_ui_update_time
@@ -112,7 +136,7 @@ class FileManager:
                     last_ui_update_time = current_time
                     if total_files > 0:
                         percentage = min(0.95, current / total_files)  # Cap at 95% until done
-                        self.app.root.after(0, lambda: self.app.ui.update_ui(percentage, total_files, 0, f"Scanning: {message}", "--:--"))
+                        self.app.ui.update_ui(percentage, total_files, 0, f"Scanning: {message}", "--:--")
             
             # Track progress
             processed_files = 0
@@ -138,44 +162,46 @@ class FileManager:
                             try:
                                 # Get file info without opening the file
                                 file_stat = os.stat(file_path)
-                                mod_time = datetime.fromtimestamp(file_stat.st_mtime)
-                                file_size = file_stat.st_size
                                 
-                                # Add to cache
-                                self.app.cache_manager.add_file_to_metadata_cache(file_path, rel_path, mod_time, file_size)
+                                record = self.app.cache_manager.create_file_record(
+                                    file_path, rel_path, file_stat.st_mtime, file_stat.st_size, source_path
+                                )
+                                updated_records.append(record)
                                 new_files += 1
                             except Exception as e:
                                 print(f"Error getting stats for {file_path}: {str(e)}")
                                 continue
                         else:
                             # Use cached metadata
-                            cached_data = self.app.cache_manager.file_metadata_cache[file_path]
-                            mod_time = cached_data['mod_time']
-                            file_size = cached_data['file_size']
+                            record = self.app.cache_manager.metadata_store.get(file_path)
                             cache_hits += 1
+                            
+                            # Track the source directory in the metadata
+                            if record.source_dir != source_path:
+                                record = record.copy()
+                                record.source_dir = source_path
+                                record.card_id = self.app.cache_manager.get_card_id(source_path)
+                                updated_records.append(record)
                         
-                        # Track the source directory in the metadata
-                        if file_path in self.app.cache_manager.file_metadata_cache:
-                            self.app.cache_manager.file_metadata_cache[file_path]['source_dir'] = source_path
-                        
-                        # Add to list
-                        file_list.append((file_path, rel_path, mod_time, file_size))
+                        # Add to list - the list shares the cached record
+                        file_list.append(record)
             
             # Check for deleted files
+            removed_paths = set()
             if force_scan and existing_files_in_cache:
-                deleted_files = existing_files_in_cache - current_files
-                for file_path in deleted_files:
-                    if file_path in self.app.cache_manager.file_metadata_cache:
-                        del self.app.cache_manager.file_metadata_cache[file_path]
-                deleted_files = len(deleted_files)
+                removed_paths = existing_files_in_cache - current_files
+                deleted_files = len(removed_paths)
+            
+            # Apply this scan's changes to the metadata store as one batch
+            self.app.cache_manager.update_metadata_cache(updated_records, removed_paths)
             
-            # Sort by modification time (newest first)
-            file_list.sort(key=lambda x: x[2], reverse=True)
+            # Sort by the current list column (newest first by default)
+            self.sort_records(file_list)
             
             # Save the updated metadata cache
             self.app.cache_manager.save_metadata_cache()
             
-            # Update UI in main thread - process in batches for better performance
+            # Show the list in the main thread
             message = None
             if force_scan:
                 message = f"Found {len(file_list)} video files ({new_files} new, {deleted_files} removed)"
@@ -187,18 +213,14 @@ class FileManager:
                 self.app.ui.show_notification(f"Error scanning files: {str(e)}", "error")
                 self.scanning_in_progress = False
                 self.app.status_label.configure(text="Error scanning files")
-            self.app.root.after(0, show_error)
+            self.app.scheduler.post(show_error)
     
     def has_valid_cache_for_directory(self, source_path):
         """Check if we have a valid cached file list for this directory"""
-        # If cache is empty, definitely not valid
-        if not self.app.cache_manager.file_metadata_cache:
-            return False
-            
         # Check for files from this source directory
         source_dir_files = [
-            path for path, data in self.app.cache_manager.file_metadata_cache.items() 
-            if data.get('source_dir') == source_path and os.path.exists(path)
+            path for path in self.app.cache_manager.metadata_store.paths_for_source(source_path)
+            if os.path.exists(path)
         ]
         
         # If we have a good number of files from this directory
@@ -208,22 +230,14 @@ class FileManager:
         """Use the cached file list for faster loading"""
         try:
             # Get all files from this source directory
-            cached_files = []
-            for file_path, data in self.app.cache_manager.file_metadata_cache.items():
-                if data.get('source_dir') == source_path and os.path.exists(file_path):
-                    try:
-                        rel_path = data.get('rel_path', '')
-                        mod_time = data.get('mod_time')
-                        file_size = data.get('file_size', 0)
-                        cached_files.append((file_path, rel_path, mod_time, file_size))
-                    except Exception as e:
-                        print(f"Error processing cached file {file_path}: {str(e)}")
-            
-            # Skip files that no longer exist
-            valid_files = [(path, rel, mod, size) for path, rel, mod, size in cached_files if os.path.exists(path)]
-            
-            # Sort by modification time (newest first)
-            valid_files.sort(key=lambda x: x[2], reverse=True)
+            # (skipping files that no longer exist)
+            valid_files = [
+                record for record in self.app.cache_manager.metadata_store.records_for_source(source_path)
+                if os.path.exists(record.file_path)
+            ]
+            
+            # Sort by the current list column (newest first by default)
+            self.sort_records(valid_files)
             
             # Update UI with this list - much faster than scanning
             self.update_ui_with_file_list(valid_files, len(valid_files), 0, "Using cached file list")
@@ -234,68 +248,127 @@ class FileManager:
             # Start a full scan
             self.scan_files_thread(source_path)
     
+    def sort_records(self, records):
+        """Sort records in place by the current sort column"""
+        key, _ = SORT_COLUMNS[self.sort_column]
+        records.sort(key=key, reverse=self.sort_reverse)
+    
+    def sort_file_list(self, column):
+        """Re-order the file list by a column; clicking the same column again reverses it"""
+        if self.scanning_in_progress or not self.app.files_to_transfer:
+            return
+        if column == self.sort_column:
+            self.sort_reverse = not self.sort_reverse
+        else:
+            self.sort_column = column
+            self.sort_reverse = SORT_COLUMNS[column][1]
+        self.app.ui.update_sort_headers()
+        self.apply_view()
+    
+    def set_name_filter(self, text):
+        """Show only files whose name contains text"""
+        self.name_filter = text.strip()
+        self.apply_view()
+    
+    def set_day_filter(self, day):
+        """Show only files shot on a day (None shows every day)"""
+        self.day_filter = day
+        self.apply_view()
+    
+    @profiling.timed("apply_view")
+    def apply_view(self):
+        """Show the indexed files in the current order and filters
+        
+        Only the visible rows are rebound, so this takes milliseconds; the
+        selection and queued thumbnails are unchanged.
+        """
+        view = self.index.view(self.sort_column, self.sort_reverse, self.name_filter, self.day_filter)
+        self.app.selection.set_records(view, keep=True, listed=self.index.positions)
+        self.app.file_list.set_records(view)
+        self.app.select_all_var.set(self.app.selection.all_selected())
+        self.app.ui.update_selection_menu()
+        
+        total = len(self.index.records)
+        if len(view) < total:
+            self.app.files_title.configure(text=f"Files to Transfer ({len(view)} of {total} shown)")
+        else:
+            self.app.files_title.configure(text="Files to Transfer")
+    
+    def refresh_records(self, file_paths):
+        """Pick up probed clip info for some files"""
+        # Stored records are replaced rather than changed, so swap the new ones into the lists
+        files = self.app.files_to_transfer
+        changed = False
+        for file_path in file_paths:
+            record = self.app.cache_manager.metadata_store.get(file_path)
+            if record is None:
+                continue
+            index = self.index.replace(record)
+            if index is None:
+                continue
+            if index < len(files) and files[index].file_path == file_path:
+                files[index] = record
+            self.app.file_list.refresh_record(record)
+            changed = True
+        if changed:
+            self.index.invalidate()
+    
     def update_ui_with_file_list(self, file_list, cache_hits=0, new_files=0, message=None):
-        """Update the UI with a list of files, using batching for performance"""
-        batch_size = 10  # Smaller batch size (was 20) for more responsive UI
+        """Show a list of files in the file list"""
+        self.app.metrics.inc("rushes_scans_total")
+        self.app.metrics.inc("rushes_metadata_cache_hits_total", cache_hits)
+        self.app.metrics.inc("rushes_metadata_cache_misses_total", new_files)
         
-        def update_ui_batch(batch_start, files_added=0):
-            # No need to check for dragging anymore - the Configure event handler takes care of this
-            end_index = min(batch_start + batch_size, len(file_list))
-            current_batch = file_list[batch_start:end_index]
-            
+        # Profiled under this method's name: showing the list is the work it hands to the UI thread
+        @profiling.profiled("update_ui_with_file_list")
+        def show():
             # Files are not selected by default
-            if batch_start == 0:  # Only on first batch
-                self.app.files_to_transfer = file_list
-                self.app.selected_files = []
-                self.app.select_all_var.set(False)
-            
-            # Add batch to UI
-            for i, (file_path, rel_path, mod_time, file_size) in enumerate(current_batch):
-                self.app.ui.add_file_entry(batch_start + i, file_path, rel_path, mod_time, file_size)
-                files_added += 1
-                
-                # Update progress less frequently while adding files
-                if files_added % 5 == 0:
-                    percentage = 1.0 if len(file_list) == 0 else files_added / len(file_list)
-                    self.app.ui.update_ui(percentage, len(file_list), 0, f"Loading files: {files_added}/{len(file_list)}", "--:--")
-                
-                # Small delay between files for more responsive UI
-                self.app.root.update_idletasks()
-            
-            # Schedule next batch if needed - longer pause between batches
-            if end_index < len(file_list):
-                self.app.root.after(10, lambda: update_ui_batch(end_index, files_added))
+            self.app.files_to_transfer = file_list
+            self.index.set_records(file_list)
+            self.app.selection.set_records([])
+            if self.day_filter not in self.index.by_day:
+                self.day_filter = None
+            self.app.ui.update_day_menu()
+            
+            # The list only has a screenful of rows, so this is instant even for huge cards
+            self.apply_view()
+            
+            if message:
+                self.app.ui.show_notification(message, "success")
             else:
-                # All batches done
-                if message:
-                    self.app.ui.show_notification(message, "success")
-                else:
-                    self.app.ui.show_notification(f"Found {len(file_list)} video files", "success")
-                
-                # Update UI with final state
-                self.app.ui.update_ui(1.0, len(file_list), 0, "Ready", "--:--")
-                self.app.status_label.configure(text="Ready")
-                self.scanning_in_progress = False
+                self.app.ui.show_notification(f"Found {len(file_list)} video files", "success")
+            
+            # Update UI with final state
+            self.app.ui.update_ui(1.0, len(file_list), 0, "Ready", "--:--")
+            self.app.status_label.configure(text="Ready")
+            self.scanning_in_progress = False
         
-        # Start the batch update process with shorter delay
-        self.app.root.after(0, lambda: update_ui_batch(0))
+        self.app.scheduler.post(show)
     
+    @profiling.timed("transfer_selected_files")
     def transfer_selected_files(self, source, destination):
         """Transfer only the selected files"""
+        telemetry = TransferTelemetry(source, destination)
+        status = "failed"
         try:
             # Get information about the selected files
             files_to_transfer = []
-            for file_path, rel_path, mod_time, file_size in self.app.files_to_transfer:
-                if file_path in self.app.selected_files:
+            for record in self.app.files_to_transfer:
+                if record.file_path in self.app.selection:
                     # Create corresponding destination path
-                    dest_path = os.path.join(destination, rel_path)
-                    files_to_transfer.append((file_path, dest_path))
+                    dest_path = os.path.join(destination, record.rel_path)
+                    files_to_transfer.append((record.file_path, dest_path))
             
             total_files = len(files_to_transfer)
             completed_files = 0
             total_size = sum(os.path.getsize(src) for src, _ in files_to_transfer)
             transferred_size = 0
             start_time = time.time()
+            self.app.metrics.set("rushes_transfer_files_pending", total_files)
+            self.app.metrics.set("rushes_transfer_bytes_pending", total_size)
+            
+            # Keep thumbnail decoding off the card while it is being read sequentially
+            self.app.thumbnail_manager.engine.pause(source)
             
             self.app.ui.update_ui(0, total_files, completed_files, "Starting transfer...", "--:--")
             self.app.ui.show_notification(f"Found {total_files} video files to transfer ({self.format_size(total_size)} total)", "info")
@@ -304,16 +377,17 @@ class FileManager:
                 if not self.app.transfer_in_progress:
                     self.app.ui.update_ui(0, total_files, completed_files, "Transfer cancelled", "--:--")
                     # Reset UI elements
-                    self.app.root.after(0, lambda: self.app.current_file_label.configure(text="None"))
-                    self.app.root.after(0, lambda: self.app.file_progress_bar.set(0))
-                    self.app.root.after(0, lambda: self.app.file_size_label.configure(text="0 MB"))
-                    self.app.root.after(0, lambda: self.app.speed_label.configure(text="0 MB/s"))
+                    self.app.scheduler.post(lambda: self.app.current_file_label.configure(text="None"))
+                    self.app.scheduler.post(lambda: self.app.file_progress_bar.set(0))
+                    self.app.scheduler.post(lambda: self.app.file_size_label.configure(text="0 MB"))
+                    self.app.scheduler.post(lambda: self.app.speed_label.configure(text="0 MB/s"))
                     self.app.ui.show_notification(f"Transfer cancelled. {completed_files} of {total_files} files were transferred.", "warning")
+                    status = "cancelled"
                     return
                 
                 # Update current file info
                 filename = os.path.basename(src)
-                self.app.root.after(0, lambda: self.app.current_file_label.configure(text=filename))
+                self.app.scheduler.post(lambda: self.app.current_file_label.configure(text=filename))
                 
                 file_size = os.path.getsize(src)
                 self.app.ui.update_ui(
@@ -325,11 +399,18 @@ class FileManager:
                 )
                 
                 # Copy the file with progress tracking
-                success = self.copy_with_progress(src, dest)
+                timing = telemetry.start_file(src, dest, file_size)
+                success = self.copy_with_progress(src, dest, timing)
+                self.app.metrics.inc("rushes_transfer_files_total", result=timing.status)
+                self.app.metrics.inc("rushes_transfer_bytes_total", timing.bytes)
                 
                 if success:
                     transferred_size += file_size
                     completed_files += 1
+                    self.app.metrics.set("rushes_transfer_files_pending", total_files - completed_files)
+                    self.app.metrics.set("rushes_transfer_bytes_pending", total_size - transferred_size)
+                    # Thumbnails come from the fresh copy rather than the card
+                    self.app.thumbnail_manager.generate_from_copy(src, dest)
                 
                 self.app.ui.update_ui(
                     transferred_size / total_size if total_size > 0 else 0, 
@@ -340,32 +421,60 @@ class FileManager:
                 )
             
             self.app.ui.update_ui(1.0, total_files, completed_files, "Transfer complete!", "--:--")
-            self.app.root.after(0, lambda: self.app.current_file_label.configure(text="None"))
-            self.app.root.after(0, lambda: self.app.file_progress_bar.set(0))
-            self.app.root.after(0, lambda: self.app.file_size_label.configure(text="0 MB"))
-            self.app.root.after(0, lambda: self.app.speed_label.configure(text="0 MB/s"))
+            self.app.scheduler.post(lambda: self.app.current_file_label.configure(text="None"))
+            self.app.scheduler.post(lambda: self.app.file_progress_bar.set(0))
+            self.app.scheduler.post(lambda: self.app.file_size_label.configure(text="0 MB"))
+            self.app.scheduler.post(lambda: self.app.speed_label.configure(text="0 MB/s"))
             
             self.app.ui.show_notification(f"Transfer completed successfully! {completed_files} files transferred ({self.format_size(transferred_size)}).", "success")
+            status = "complete"
             
         except Exception as e:
             self.app.ui.show_notification(f"Transfer failed: {str(e)}", "error")
             self.app.ui.update_ui(0, 0, 0, f"Error: {str(e)}", "--:--")
         finally:
             self.app.transfer_in_progress = False
-            self.app.root.after(0, lambda: self.app.transfer_button.configure(state="normal"))
-            self.app.root.after(0, lambda: self.app.cancel_button.configure(state="disabled"))
+            self.save_transfer_report(telemetry, status)
+            self.app.metrics.inc("rushes_transfers_total", status=status)
+            self.app.metrics.set("rushes_transfer_files_pending", 0)
+            self.app.metrics.set("rushes_transfer_bytes_pending", 0)
+            self.app.metrics.set("rushes_transfer_speed_bytes_per_second", 0)
+            # Let thumbnail generation read the card and use every worker again
+            self.app.thumbnail_manager.engine.resume(source)
+            # Recount the project's rushes now that they include this card
+            self.app.scheduler.post(self.app.update_project_stats)
+            self.app.scheduler.post(lambda: self.app.transfer_button.configure(state="normal"))
+            self.app.scheduler.post(lambda: self.app.cancel_button.configure(state="disabled"))
     
-    def copy_with_progress(self, src, dst):
-        """Copy a file with progress updates"""
+    def save_transfer_report(self, telemetry, status):
+        """Summarise where the transfer's time went and save the report beside the clips"""
+        telemetry.finish(status)
+        self.last_transfer = telemetry
+        if not telemetry.files:
+            return
+        self.app.ui.show_notification(telemetry.describe(), "info")
+        if not self.app.save_transfer_reports:
+            return
+        try:
+            json_path, _ = telemetry.save(telemetry.destination)
+            self.app.ui.show_notification(f"Transfer report saved to {os.path.basename(json_path)} (and .csv)", "info")
+        except OSError as e:
+            self.app.ui.show_notification(f"Could not save transfer report: {str(e)}", "warning")
+    
+    @profiling.profiled("copy_with_progress")
+    def copy_with_progress(self, src, dst, timing=None):
+        """Copy a file with progress updates, recording read and write times in timing"""
         self.app.current_file_size = os.path.getsize(src)
+        if timing is None:
+            timing = FileTiming(src, dst, self.app.current_file_size)
         self.app.current_file_transferred = 0
         self.app.transfer_start_time = time.time()
         
         # Update UI with file size
-        self.app.root.after(0, lambda: self.app.file_size_label.configure(
+        self.app.scheduler.post(lambda: self.app.file_size_label.configure(
             text=f"{self.format_size(self.app.current_file_size)}"
         ))
-        self.app.root.after(0, lambda: self.app.file_progress_bar.set(0))
+        self.app.scheduler.post(lambda: self.app.file_progress_bar.set(0))
         
         # Create destination directory if it doesn't exist
         os.makedirs(os.path.dirname(dst), exist_ok=True)
@@ -373,6 +482,7 @@ class FileManager:
         # If destination exists and has same size, skip it
         if os.path.exists(dst) and os.path.getsize(dst) == self.app.current_file_size:
             self.app.ui.show_notification(f"Skipping duplicate file: {os.path.basename(src)}", "info")
+            timing.finish("skipped")
             return True  # Skip file
         
         buffer_size = 1024 * 1024  # 1MB buffer
@@ -380,7 +490,9 @@ class FileManager:
         last_bytes = 0
         
         try:
+            opened = time.perf_counter()
             with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+                timing.open_s = time.perf_counter() - opened
                 while True:
                     if not self.app.transfer_in_progress:
                         # Transfer was canceled - close file handles and delete the partial file
@@ -393,13 +505,17 @@ class FileManager:
                             except Exception as e:
                                 print(f"Error deleting partial file {dst}: {str(e)}")
                                 self.app.ui.show_notification(f"Error deleting partial file: {str(e)}", "error")
+                        timing.finish("cancelled")
                         return False  # Cancelled
                     
+                    read_started = time.perf_counter()
                     buf = fsrc.read(buffer_size)
+                    read_done = time.perf_counter()
                     if not buf:
                         break
                     
                     fdst.write(buf)
+                    timing.add_chunk(len(buf), read_done - read_started, time.perf_counter() - read_done)
                     self.app.current_file_transferred += len(buf)
                     
                     # Update progress every 0.2 seconds to avoid UI freeze
@@ -416,17 +532,30 @@ class FileManager:
                             self.app.file_progress_bar.set(progress)
                             self.app.speed_label.configure(text=f"{self.format_size(speed)}/s")
                         
-                        self.app.root.after(0, update_ui)
+                        self.app.scheduler.post(update_ui, key="file_progress")
+                        self.app.metrics.set("rushes_transfer_speed_bytes_per_second", speed)
                         
                         last_update_time = current_time
                         last_bytes = self.app.current_file_transferred
+                
+                # Closing the destination flushes what is left of it
+                closing = time.perf_counter()
+            timing.close_s = time.perf_counter() - closing
+            
+            # A short copy (e.g. the destination filled up) must not count as transferred
+            copied_size = os.path.getsize(dst)
+            if copied_size != self.app.current_file_size:
+                self.app.metrics.inc("rushes_verification_failures_total")
+                raise IOError(f"copy of {os.path.basename(src)} is {copied_size} bytes, expected {self.app.current_file_size}")
+            timing.finish("copied")
             
             # Ensure progress is 100% at the end
-            self.app.root.after(0, lambda: self.app.file_progress_bar.set(1.0))
+            self.app.scheduler.post(lambda: self.app.file_progress_bar.set(1.0))
             return True  # Successfully copied
         except Exception as e:
             # Error during copy - clean up the partial file
             print(f"Error during file copy: {str(e)}")
+            timing.finish("failed")
             self.app.ui.show_notification(f"Error copying file: {str(e)}", "error")
             if os.path.exists(dst):
                 try:
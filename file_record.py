@@ -0,0 +1,126 @@
+from datetime import datetime
+
+
+def _to_epoch(value):
+    """Convert a datetime, ISO string or number to integer epoch seconds"""
+    if value is None:
+        return 0
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    if isinstance(value, str):
+        try:
+            return int(datetime.fromisoformat(value).timestamp())
+        except ValueError:
+            return 0
+    return int(value)
+
+
+class FileRecord:
+    """Metadata for a single clip
+
+    One record per clip is shared by the scanner, the metadata cache, the file
+    list and the transfer planner. Times are stored as integer epoch seconds and
+    __slots__ keeps the per-record overhead small when the cache holds metadata
+    for a very large number of historical clips.
+    """
+
+    __slots__ = (
+        'file_path', 'rel_path', 'source_dir', 'card_id',
+        'mod_time', 'file_size', 'last_checked', 'has_thumbnail',
+        'duration', 'fps', 'width', 'height', 'codec',
+    )
+
+    # Fields persisted by the metadata cache backends, in storage order
+    FIELDS = __slots__
+
+    def __init__(self, file_path, rel_path, mod_time, file_size, source_dir=None,
+                 card_id=None, last_checked=0, has_thumbnail=False,
+                 duration=None, fps=None, width=None, height=None, codec=None):
+        self.file_path = file_path
+        self.rel_path = rel_path
+        self.source_dir = source_dir
+        self.card_id = card_id
+        self.mod_time = mod_time
+        self.file_size = file_size
+        self.last_checked = last_checked
+        self.has_thumbnail = has_thumbnail
+
+        # Clip technical metadata, filled in by the thumbnail workers.
+        # codec is None until the clip has been probed ("" if that failed).
+        self.duration = duration
+        self.fps = fps
+        self.width = width
+        self.height = height
+        self.codec = codec
+
+    def __repr__(self):
+        return f"FileRecord({self.file_path!r}, size={self.file_size}, mod_time={self.mod_time})"
+
+    @property
+    def mod_datetime(self):
+        """Modification time as a local datetime, for display"""
+        return datetime.fromtimestamp(self.mod_time)
+
+    @property
+    def probed(self):
+        """Whether clip metadata has been read (successfully or not)"""
+        return self.codec is not None
+
+    def copy(self):
+        """Return a shallow copy of this record"""
+        return FileRecord.from_row(self.to_row())
+
+    def to_row(self):
+        """Serialise to a tuple in FIELDS order (used by the SQLite backend)"""
+        return (
+            self.file_path, self.rel_path, self.source_dir, self.card_id,
+            self.mod_time, self.file_size, self.last_checked, 1 if self.has_thumbnail else 0,
+            self.duration, self.fps, self.width, self.height, self.codec,
+        )
+
+    @classmethod
+    def from_row(cls, row):
+        """Build a record from a tuple in FIELDS order"""
+        (file_path, rel_path, source_dir, card_id, mod_time, file_size, last_checked, has_thumbnail,
+         duration, fps, width, height, codec) = row
+        return cls(
+            file_path, rel_path, int(mod_time or 0), file_size or 0, source_dir,
+            card_id, int(last_checked or 0), bool(has_thumbnail),
+            duration, fps, width, height, codec,
+        )
+
+    def to_dict(self):
+        """Serialise to a JSON-friendly dict (used by the legacy JSON backend)"""
+        return {
+            'rel_path': self.rel_path,
+            'source_dir': self.source_dir,
+            'card_id': self.card_id,
+            'mod_time': datetime.fromtimestamp(self.mod_time).isoformat(),
+            'file_size': self.file_size,
+            'last_checked': datetime.fromtimestamp(self.last_checked).isoformat(),
+            'has_thumbnail': self.has_thumbnail,
+            'duration': self.duration,
+            'fps': self.fps,
+            'width': self.width,
+            'height': self.height,
+            'codec': self.codec,
+        }
+
+    @classmethod
+    def from_dict(cls, file_path, data):
+        """Build a record from a legacy JSON cache entry"""
+        return cls(
+            file_path,
+            data.get('rel_path', ''),
+            _to_epoch(data.get('mod_time')),
+            data.get('file_size', 0),
+            data.get('source_dir'),
+            data.get('card_id'),
+            _to_epoch(data.get('last_checked')),
+            bool(data.get('has_thumbnail', False)),
+            data.get('duration'),
+            data.get('fps'),
+            data.get('width'),
+            data.get('height'),
+            data.get('codec'),
+        )
@@ -0,0 +1,146 @@
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+from percentiles import percentile
+
+# Heartbeat period, and how late a heartbeat must be to count as a stall
+HEARTBEAT_MS = 100
+STALL_MS = 250
+
+# Lag samples kept for percentiles (one minute of heartbeats) and stalls kept for display
+LAG_SAMPLES = 600
+STALLS_KEPT = 20
+
+# How often lag percentiles are written to the log
+LOG_INTERVAL_S = 60
+
+# Stalls are attributed to the innermost frame in the app's own code
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class Stall:
+    """One period in which the Tk event loop did not run"""
+
+    def __init__(self, started, stack):
+        # started is when the missed heartbeat was due
+        self.started = started
+        self.stack = stack
+        self.duration_ms = None
+        self.wall_time = time.strftime("%H:%M:%S")
+
+    def culprit(self):
+        """The innermost app frame of the captured stack, e.g. 'file_manager.py:412 in copy_file'"""
+        app_frames = [frame for frame in self.stack if os.path.dirname(os.path.abspath(frame.filename)) == APP_DIR]
+        frames = app_frames or self.stack
+        if not frames:
+            return "unknown"
+        frame = frames[-1]
+        return f"{os.path.basename(frame.filename)}:{frame.lineno} in {frame.name}"
+
+
+class LagWatchdog:
+    """Measures Tk event-loop lag and records main-thread stalls
+
+    A heartbeat is scheduled on the event loop every HEARTBEAT_MS; how late
+    it runs is the loop's lag. A monitor thread watches for heartbeats that
+    are more than STALL_MS overdue and captures the main thread's Python
+    stack at that moment, which shows what was blocking the UI.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.main_thread_id = threading.main_thread().ident
+        self.lock = threading.Lock()
+
+        self.samples = deque(maxlen=LAG_SAMPLES)
+        self.stalls = deque(maxlen=STALLS_KEPT)
+        self.stall_count = 0
+        self.current_stall = None
+
+        self.expected = None
+        self.last_log = time.monotonic()
+        self.running = False
+        self.monitor = None
+
+    def start(self):
+        self.running = True
+        self.expected = time.monotonic() + HEARTBEAT_MS / 1000
+        self.app.root.after(HEARTBEAT_MS, self.beat)
+        self.monitor = threading.Thread(target=self.watch, daemon=True)
+        self.monitor.start()
+
+    def stop(self):
+        self.running = False
+
+    def beat(self):
+        """Heartbeat on the UI thread"""
+        if not self.running:
+            return
+        now = time.monotonic()
+        lag_ms = max(0.0, (now - self.expected) * 1000)
+        with self.lock:
+            self.samples.append(lag_ms)
+            stall = self.current_stall
+            self.current_stall = None
+            self.expected = now + HEARTBEAT_MS / 1000
+        if stall is not None:
+            stall.duration_ms = (now - stall.started) * 1000
+            self.app.notifications.write_log(
+                f"UI stalled for {stall.duration_ms:.0f} ms in {stall.culprit()}\n"
+                + "".join(traceback.format_list(stall.stack)).rstrip(),
+                "warning"
+            )
+
+        if now - self.last_log >= LOG_INTERVAL_S:
+            self.last_log = now
+            self.app.notifications.write_log(f"Event loop lag: {self.summary()}")
+
+        self.app.root.after(HEARTBEAT_MS, self.beat)
+
+    def watch(self):
+        """Monitor thread: capture the main thread's stack when a heartbeat is overdue"""
+        while self.running:
+            time.sleep(HEARTBEAT_MS / 2000)
+            with self.lock:
+                due = self.expected
+                overdue = due is not None and time.monotonic() - due > STALL_MS / 1000
+                if not overdue or self.current_stall is not None:
+                    continue
+            frame = sys._current_frames().get(self.main_thread_id)
+            stack = traceback.extract_stack(frame) if frame is not None else []
+            stall = Stall(due, stack)
+            with self.lock:
+                # The heartbeat may have run while the stack was captured
+                if self.expected != due or self.current_stall is not None:
+                    continue
+                self.current_stall = stall
+                self.stalls.append(stall)
+                self.stall_count += 1
+
+    def percentiles(self):
+        """Return (p50, p90, p99, max) of recent lag in milliseconds"""
+        with self.lock:
+            values = sorted(self.samples)
+        if not values:
+            return 0.0, 0.0, 0.0, 0.0
+        return percentile(values, 0.5), percentile(values, 0.9), percentile(values, 0.99), values[-1]
+
+    def summary(self):
+        p50, p90, p99, worst = self.percentiles()
+        return f"p50 {p50:.0f} ms, p90 {p90:.0f} ms, p99 {p99:.0f} ms, max {worst:.0f} ms, {self.stall_count} stalls"
+
+    def report(self):
+        """Text for the diagnostics panel"""
+        lines = [f"Event loop lag (last minute): {self.summary()}", ""]
+        with self.lock:
+            stalls = list(self.stalls)
+        if not stalls:
+            lines.append("No stalls recorded")
+        for stall in reversed(stalls):
+            duration = f"{stall.duration_ms:.0f} ms" if stall.duration_ms is not None else "ongoing"
+            lines.append(f"[{stall.wall_time}] {duration} in {stall.culprit()}")
+        return "\n".join(lines)
@@ -1,16 +1,26 @@
 import os
 import sys
-from app import RushesTransferApp
-import customtkinter as ctk
-
-# Set appearance mode and default color theme
-ctk.set_appearance_mode("dark")  # Options: "Dark", "Light", "System"
-ctk.set_default_color_theme("blue")  # Options: "blue", "green", "dark-blue"
+import multiprocessing
 
 def main():
+    # --profile / --profile-memory (or RUSHES_PROFILE=1) turn on the profiling
+    # hooks, which are applied as the app's modules are imported
+    import profiling
+    profiling.configure(sys.argv)
+
+    from app import RushesTransferApp
+    import customtkinter as ctk
+
+    # Set appearance mode and default color theme
+    ctk.set_appearance_mode("dark")  # Options: "Dark", "Light", "System"
+    ctk.set_default_color_theme("blue")  # Options: "blue", "green", "dark-blue"
+
     root = ctk.CTk()
     app = RushesTransferApp(root)
     root.mainloop()
 
 if __name__ == "__main__":
+    # Thumbnail workers are spawned processes, which re-run this module as
+    # __mp_main__; the GUI is only imported in main() so they never load it
+    multiprocessing.freeze_support()
     main()
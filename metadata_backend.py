@@ -0,0 +1,254 @@
+import os
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+from file_record import FileRecord
+from persistence import write_json_atomic
+
+# Columns stored for every file, in table order
+METADATA_FIELDS = FileRecord.FIELDS
+
+# Rows read per query by iter_identities()
+IDENTITY_CHUNK = 2000
+
+
+class MetadataBackend:
+    """Base class for file metadata cache storage backends
+
+    Backends store FileRecord objects keyed by their absolute file path.
+    """
+
+    def load_source(self, source_dir):
+        """Return {file_path: FileRecord} for every cached file from a source directory"""
+        raise NotImplementedError
+
+    def get(self, file_path):
+        """Return the cached FileRecord for a single file, or None"""
+        raise NotImplementedError
+
+    def upsert(self, records):
+        """Insert or update the given FileRecords"""
+        raise NotImplementedError
+
+    def delete(self, file_paths):
+        """Remove the given file paths from the cache"""
+        raise NotImplementedError
+
+    def count(self):
+        """Return the number of cached files"""
+        raise NotImplementedError
+
+    def iter_identities(self, chunk_size=IDENTITY_CHUNK):
+        """Yield (file_path, file_size, mod_time) for every cached file, without building records"""
+        raise NotImplementedError
+
+    def close(self):
+        """Release any resources held by the backend"""
+        pass
+
+
+class JsonMetadataBackend(MetadataBackend):
+    """Legacy backend that keeps the whole cache in a single JSON file"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.records = self._read_file()
+
+    def _read_file(self):
+        """Read and convert every record in the JSON file"""
+        records = {}
+        if not os.path.exists(self.path):
+            return records
+        try:
+            with open(self.path, 'r') as f:
+                cached_data = json.load(f)
+            for file_path, data in cached_data.items():
+                records[file_path] = FileRecord.from_dict(file_path, data)
+        except Exception as e:
+            print(f"Error reading metadata cache {self.path}: {str(e)}")
+        return records
+
+    def _write_file(self):
+        """Rewrite the whole JSON file"""
+        serializable_cache = {path: record.to_dict() for path, record in self.records.items()}
+        write_json_atomic(self.path, serializable_cache)
+
+    def load_source(self, source_dir):
+        with self.lock:
+            return {path: record.copy() for path, record in self.records.items()
+                    if record.source_dir == source_dir}
+
+    def get(self, file_path):
+        with self.lock:
+            record = self.records.get(file_path)
+            return record.copy() if record else None
+
+    def upsert(self, records):
+        with self.lock:
+            for record in records:
+                self.records[record.file_path] = record.copy()
+            self._write_file()
+
+    def delete(self, file_paths):
+        with self.lock:
+            for file_path in file_paths:
+                self.records.pop(file_path, None)
+            self._write_file()
+
+    def count(self):
+        with self.lock:
+            return len(self.records)
+
+    def iter_identities(self, chunk_size=IDENTITY_CHUNK):
+        # The records are in memory already; only the tuples are new
+        with self.lock:
+            identities = [(record.file_path, record.file_size, record.mod_time)
+                          for record in self.records.values()]
+        return iter(identities)
+
+
+class SQLiteMetadataBackend(MetadataBackend):
+    """SQLite (WAL mode) backend with per-record upserts and deletes"""
+
+    SCHEMA_VERSION = 2
+
+    # Columns added after the first schema version, with their types
+    ADDED_COLUMNS = (
+        ('duration', 'REAL'),
+        ('fps', 'REAL'),
+        ('width', 'INTEGER'),
+        ('height', 'INTEGER'),
+        ('codec', 'TEXT'),
+    )
+
+    def __init__(self, path, legacy_json_path=None):
+        self.path = path
+        self.lock = threading.Lock()
+
+        # The connection is shared between the UI thread and the scan/thumbnail
+        # threads, so access is serialised through self.lock
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+
+        if legacy_json_path:
+            self.migrate_from_json(legacy_json_path)
+
+    def _create_schema(self):
+        """Create the tables and indexes if they don't exist yet"""
+        with self.lock, self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS files (
+                    file_path TEXT PRIMARY KEY,
+                    rel_path TEXT NOT NULL,
+                    source_dir TEXT,
+                    card_id TEXT,
+                    mod_time INTEGER,
+                    file_size INTEGER,
+                    last_checked INTEGER,
+                    has_thumbnail INTEGER NOT NULL DEFAULT 0,
+                    duration REAL,
+                    fps REAL,
+                    width INTEGER,
+                    height INTEGER,
+                    codec TEXT
+                )
+            """)
+            # Bring databases created by older versions up to date
+            existing = {row[1] for row in self.conn.execute("PRAGMA table_info(files)")}
+            for column, column_type in self.ADDED_COLUMNS:
+                if column not in existing:
+                    self.conn.execute(f"ALTER TABLE files ADD COLUMN {column} {column_type}")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_files_source_dir ON files(source_dir)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_files_card ON files(card_id, rel_path)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('schema_version', ?)",
+                (str(self.SCHEMA_VERSION),)
+            )
+
+    def _get_meta(self, key):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def migrate_from_json(self, json_path):
+        """Import a legacy JSON cache once; later calls are no-ops"""
+        with self.lock:
+            if self._get_meta('json_migrated') or not os.path.exists(json_path):
+                return
+
+        print(f"Migrating metadata cache from {json_path}")
+        legacy = JsonMetadataBackend(json_path)
+        self.upsert(legacy.records.values())
+
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('json_migrated', ?)",
+                (datetime.now().isoformat(),)
+            )
+        print(f"Migrated metadata for {len(legacy.records)} files")
+
+    def load_source(self, source_dir):
+        columns = ", ".join(METADATA_FIELDS)
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT {columns} FROM files WHERE source_dir = ?", (source_dir,)
+            ).fetchall()
+        return {row[0]: FileRecord.from_row(row) for row in rows}
+
+    def get(self, file_path):
+        columns = ", ".join(METADATA_FIELDS)
+        with self.lock:
+            row = self.conn.execute(
+                f"SELECT {columns} FROM files WHERE file_path = ?", (file_path,)
+            ).fetchone()
+        return FileRecord.from_row(row) if row else None
+
+    def upsert(self, records):
+        rows = [record.to_row() for record in records]
+        if not rows:
+            return
+        columns = ", ".join(METADATA_FIELDS)
+        placeholders = ", ".join("?" for _ in METADATA_FIELDS)
+        updates = ", ".join(f"{field} = excluded.{field}" for field in METADATA_FIELDS[1:])
+        with self.lock, self.conn:
+            self.conn.executemany(
+                f"INSERT INTO files ({columns}) VALUES ({placeholders}) "
+                f"ON CONFLICT(file_path) DO UPDATE SET {updates}",
+                rows
+            )
+
+    def delete(self, file_paths):
+        file_paths = list(file_paths)
+        if not file_paths:
+            return
+        with self.lock, self.conn:
+            self.conn.executemany("DELETE FROM files WHERE file_path = ?", [(p,) for p in file_paths])
+
+    def count(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def iter_identities(self, chunk_size=IDENTITY_CHUNK):
+        # Page through the primary key so the lock is only held for one chunk at a time
+        last_path = ""
+        while True:
+            with self.lock:
+                rows = self.conn.execute(
+                    "SELECT file_path, file_size, mod_time FROM files "
+                    "WHERE file_path > ? ORDER BY file_path LIMIT ?",
+                    (last_path, chunk_size)
+                ).fetchall()
+            if not rows:
+                return
+            for file_path, file_size, mod_time in rows:
+                yield file_path, file_size or 0, int(mod_time or 0)
+            last_path = rows[-1][0]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,156 @@
+import threading
+from contextlib import contextmanager
+
+
+class MetadataStore:
+    """Thread-safe in-memory store of FileRecords keyed by file path
+
+    Writers (the scan thread, thumbnail workers, the UI thread) take a single
+    lock, and can group several changes with batch() so they become visible
+    together. Stored records are never changed in place: update() stores a
+    changed copy, so a record handed out by get() stays as it was while other
+    threads read it. Readers that need several records use the per-source
+    helpers, which copy them out under the lock, so iteration never races a
+    writer.
+
+    The store also tracks which paths have changed or been removed since they
+    were last written, so the cache manager can persist only those. Tracking
+    is only reset by mark_saved() once a write has succeeded.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._records = {}
+        self._by_source = {}
+
+        # Changes not yet written to the backend
+        self._dirty = set()
+        self._deleted = set()
+
+    # ----- reads -----
+
+    def get(self, file_path):
+        """Return the record for a path, or None"""
+        with self._lock:
+            return self._records.get(file_path)
+
+    def __contains__(self, file_path):
+        with self._lock:
+            return file_path in self._records
+
+    def __len__(self):
+        with self._lock:
+            return len(self._records)
+
+    def paths_for_source(self, source_dir):
+        """Return the set of cached paths that were found in a source directory"""
+        with self._lock:
+            return set(self._by_source.get(source_dir, ()))
+
+    def records_for_source(self, source_dir):
+        """Return the cached records that were found in a source directory"""
+        with self._lock:
+            return [self._records[path] for path in self._by_source.get(source_dir, ())]
+
+    def unsaved_changes(self):
+        """Return (changed records, removed paths) not yet written, without resetting tracking"""
+        with self._lock:
+            dirty = [self._records[path] for path in self._dirty if path in self._records]
+            return dirty, set(self._deleted)
+
+    # ----- writes -----
+
+    @contextmanager
+    def batch(self):
+        """Group several writes under one lock acquisition"""
+        with self._lock:
+            yield self
+
+    def _index(self, record):
+        self._by_source.setdefault(record.source_dir, set()).add(record.file_path)
+
+    def _unindex(self, record):
+        paths = self._by_source.get(record.source_dir)
+        if paths is not None:
+            paths.discard(record.file_path)
+            if not paths:
+                del self._by_source[record.source_dir]
+
+    def put(self, record, dirty=True):
+        """Insert or replace a record"""
+        with self._lock:
+            old = self._records.get(record.file_path)
+            if old is not None:
+                self._unindex(old)
+            self._records[record.file_path] = record
+            self._index(record)
+            if dirty:
+                self._dirty.add(record.file_path)
+                self._deleted.discard(record.file_path)
+
+    def put_many(self, records, dirty=True):
+        """Insert or replace several records at once"""
+        with self.batch():
+            for record in records:
+                self.put(record, dirty)
+
+    def load(self, records):
+        """Add records read from the backend without overwriting unsaved changes"""
+        with self.batch():
+            for record in records:
+                if record.file_path not in self._dirty and record.file_path not in self._deleted:
+                    self.put(record, dirty=False)
+
+    def update(self, file_path, **fields):
+        """Store a copy of a record with some fields changed; returns False if the path isn't stored"""
+        with self._lock:
+            record = self._records.get(file_path)
+            if record is None:
+                return False
+            updated = record.copy()
+            for name, value in fields.items():
+                setattr(updated, name, value)
+            if updated.source_dir != record.source_dir:
+                self._unindex(record)
+                self._index(updated)
+            self._records[file_path] = updated
+            self._dirty.add(file_path)
+            return True
+
+    def remove(self, file_path):
+        """Remove a record, remembering the removal for the backend"""
+        with self._lock:
+            record = self._records.pop(file_path, None)
+            if record is None:
+                return
+            self._unindex(record)
+            self._dirty.discard(file_path)
+            self._deleted.add(file_path)
+
+    def remove_many(self, file_paths):
+        """Remove several records at once"""
+        with self.batch():
+            for file_path in file_paths:
+                self.remove(file_path)
+
+    def mark_saved(self, records, deleted):
+        """Stop tracking changes that have been written, unless they have changed again since"""
+        with self._lock:
+            # Records are replaced, never changed, so the same object means no newer change
+            for record in records:
+                if self._records.get(record.file_path) is record:
+                    self._dirty.discard(record.file_path)
+            for file_path in deleted:
+                if file_path not in self._records:
+                    self._deleted.discard(file_path)
+
+    def clear(self):
+        """Forget all in-memory records (unsaved changes are kept for the backend)"""
+        with self._lock:
+            # Keep records that still need writing so the next save doesn't lose them
+            pending = [self._records[path] for path in self._dirty if path in self._records]
+            self._records = {}
+            self._by_source = {}
+            for record in pending:
+                self._records[record.file_path] = record
+                self._index(record)
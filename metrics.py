@@ -0,0 +1,149 @@
+import threading
+import time
+
+# Every exported metric: name -> (type, help). Counters and gauges the app
+# updates as it works are set with inc()/set(); the rest are read from the
+# app when /metrics is scraped (see RushesTransferApp.setup_metrics).
+METRICS = {
+    "rushes_start_time_seconds": ("gauge", "When the app was started (Unix time)"),
+    "rushes_transfer_in_progress": ("gauge", "1 while a transfer is running"),
+    "rushes_transfer_speed_bytes_per_second": ("gauge", "Copy speed of the current file"),
+    "rushes_transfer_current_file_bytes": ("gauge", "Bytes copied of the current file"),
+    "rushes_transfer_files_pending": ("gauge", "Files left in the running transfer"),
+    "rushes_transfer_bytes_pending": ("gauge", "Bytes left in the running transfer"),
+    "rushes_transfer_files_total": ("counter", "Files processed by transfers, by result"),
+    "rushes_transfer_bytes_total": ("counter", "Bytes copied by transfers"),
+    "rushes_transfers_total": ("counter", "Transfers finished, by status"),
+    "rushes_verification_failures_total": ("counter", "Copies whose size did not match the source"),
+    "rushes_scanning": ("gauge", "1 while a source folder is being scanned"),
+    "rushes_scans_total": ("counter", "Source folder scans and cached list loads"),
+    "rushes_files_listed": ("gauge", "Clips in the file list"),
+    "rushes_files_selected": ("gauge", "Clips selected for transfer"),
+    "rushes_metadata_cache_hits_total": ("counter", "Listed clips taken from the metadata cache"),
+    "rushes_metadata_cache_misses_total": ("counter", "Listed clips read from the card (new clips or a forced rescan)"),
+    "rushes_thumbnail_cache_hits_total": ("counter", "Thumbnails found in a cache, by cache"),
+    "rushes_thumbnail_cache_misses_total": ("counter", "Thumbnails missing from a cache, by cache"),
+    "rushes_thumbnail_backlog": ("gauge", "Thumbnail jobs queued, set aside or being decoded"),
+    "rushes_ui_queue_depth": ("gauge", "Jobs waiting for the UI thread"),
+}
+
+# The label values each labelled counter is exported with from the start.
+# Every counter starts at 0, so rate() and increase() see its first increment.
+COUNTER_LABELS = {
+    "rushes_transfer_files_total": [{"result": result} for result in ("copied", "skipped", "failed")],
+    "rushes_transfers_total": [{"status": status} for status in ("complete", "cancelled", "failed")],
+    "rushes_thumbnail_cache_hits_total": [{"cache": cache} for cache in ("memory", "disk")],
+    "rushes_thumbnail_cache_misses_total": [{"cache": cache} for cache in ("memory", "disk")],
+}
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_sample(name, labels, value):
+    """One line of the exposition format, e.g. rushes_transfer_files_total{result="copied"} 12"""
+    if labels:
+        name += "{" + ",".join(f'{label}="{escape(text)}"' for label, text in labels) + "}"
+    number = repr(value) if isinstance(value, float) else str(int(value))
+    return f"{name} {number}"
+
+
+class Metrics:
+    """Counters and gauges in the Prometheus text format
+
+    Updates are a dict operation under a lock, made per file, per scan or
+    per throttled progress update - never per copied chunk. Values that
+    the app already keeps (backlogs, queue depths, flags) are read by
+    callbacks only when the metrics are scraped.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # (name, sorted label items) -> value
+        self.values = {}
+        # name -> function returning the current value
+        self.callbacks = {}
+        for name, (kind, _) in METRICS.items():
+            if kind == "counter":
+                for labels in COUNTER_LABELS.get(name, [{}]):
+                    self.set(name, 0, **labels)
+        self.set("rushes_start_time_seconds", time.time())
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.values[key] = value
+
+    def register(self, name, fn):
+        """Read a gauge from fn() each time the metrics are scraped"""
+        self.callbacks[name] = fn
+
+    def render(self):
+        with self.lock:
+            values = dict(self.values)
+        for name, fn in self.callbacks.items():
+            try:
+                values[(name, ())] = fn()
+            except Exception as e:
+                print(f"Error reading metric {name}: {str(e)}")
+
+        lines = []
+        for name, (kind, help_text) in METRICS.items():
+            samples = sorted((labels, value) for (metric, labels), value in values.items() if metric == name)
+            if not samples:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(format_sample(name, labels, value) for labels, value in samples)
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Serves /metrics over HTTP on a background thread"""
+
+    def __init__(self, metrics, host, port):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self.server = None
+
+    def start(self):
+        # Only imported when the exporter is turned on
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404, "Metrics are at /metrics")
+                    return
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # Scrapes every few seconds would flood the console
+                pass
+
+        self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        print(f"Serving metrics on http://{self.host}:{self.server.server_port}/metrics")
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
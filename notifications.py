@@ -0,0 +1,147 @@
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+# Notification levels, least to most severe
+LEVELS = {"info": logging.INFO, "success": logging.INFO + 5, "warning": logging.WARNING, "error": logging.ERROR}
+logging.addLevelName(LEVELS["success"], "SUCCESS")
+
+# Level filter choices -> the least severe level shown
+LEVEL_FILTERS = {
+    "All": "info",
+    "Success and above": "success",
+    "Warnings and errors": "warning",
+    "Errors only": "error",
+}
+
+# Notifications kept in the text box (and in memory for re-filtering)
+MAX_LINES = 500
+
+# Rotating log file: size of each file and how many old files are kept
+LOG_FILE_BYTES = 2 * 1024 * 1024
+LOG_FILE_BACKUPS = 5
+
+
+class NotificationLog:
+    """Notifications shown in the UI and written to a log file
+
+    post() can be called from any thread. Messages are queued and added to
+    the text box in one batch per UI tick, which only ever holds the last
+    MAX_LINES of them. The full history goes to a rotating log file, written
+    on a background thread so posting never waits for the disk.
+    """
+
+    def __init__(self, app, log_path=None):
+        self.app = app
+        self.text = None
+        self.min_level = "info"
+
+        # Recent notifications as (timestamp, level, message); the newest MAX_LINES
+        self.history = deque(maxlen=MAX_LINES)
+
+        # Notifications waiting for the next UI tick
+        self.pending = []
+        self.lock = threading.Lock()
+
+        self.logger = logging.getLogger("rushes_transfer.notifications")
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self.listener = None
+        if log_path:
+            self.start_log_file(log_path)
+
+    def start_log_file(self, log_path):
+        """Write every notification to log_path on a background thread"""
+        try:
+            file_handler = RotatingFileHandler(
+                log_path, maxBytes=LOG_FILE_BYTES, backupCount=LOG_FILE_BACKUPS, encoding="utf-8"
+            )
+        except OSError as e:
+            print(f"Error opening notification log {log_path}: {str(e)}")
+            return
+        file_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+        log_queue = queue.SimpleQueue()
+        self.logger.addHandler(QueueHandler(log_queue))
+        self.listener = QueueListener(log_queue, file_handler)
+        self.listener.start()
+
+    def attach(self, text_widget, colors):
+        """Show notifications in a text box; colors maps level -> text color"""
+        self.text = text_widget
+
+        # Tags are configured once here rather than on every message
+        self.text.tag_config("timestamp", foreground="#aaaaaa")
+        for level in LEVELS:
+            self.text.tag_config(level, foreground=colors.get(level, "white"))
+        self._schedule_flush()
+
+    def post(self, message, level="info"):
+        """Queue a notification (safe to call from any thread)"""
+        if level not in LEVELS:
+            level = "info"
+        entry = (time.strftime("%H:%M:%S"), level, message)
+        with self.lock:
+            self.pending.append(entry)
+        self._schedule_flush()
+
+        self.logger.log(LEVELS[level], message)
+        print(f"{level.upper()}: {message}")
+
+    def write_log(self, message, level="info"):
+        """Write a message to the log file only (e.g. diagnostics)"""
+        self.logger.log(LEVELS.get(level, logging.INFO), message)
+
+    def _schedule_flush(self):
+        # One queued flush picks up every message posted before it runs
+        self.app.scheduler.post(self.flush, key="notifications")
+
+    def flush(self):
+        """Add queued notifications to the text box (UI thread)"""
+        with self.lock:
+            entries = self.pending
+            self.pending = []
+        if not entries:
+            return
+        self.history.extend(entries)
+        if self.text is None:
+            return
+
+        shown = [entry for entry in entries[-MAX_LINES:] if self.is_shown(entry[1])]
+        if shown:
+            self._insert(shown)
+
+    def is_shown(self, level):
+        return LEVELS[level] >= LEVELS[self.min_level]
+
+    def set_level_filter(self, level):
+        """Show only notifications at least as severe as level"""
+        self.min_level = level
+        if self.text is None:
+            return
+        self.text.configure(state="normal")
+        self.text.delete("1.0", "end")
+        self.text.configure(state="disabled")
+        self._insert([entry for entry in self.history if self.is_shown(entry[1])])
+
+    def _insert(self, entries):
+        """Append entries to the text box, dropping the oldest lines beyond MAX_LINES"""
+        self.text.configure(state="normal")
+        for timestamp, level, message in entries:
+            self.text.insert("end", f"[{timestamp}] ", "timestamp")
+            self.text.insert("end", f"{message}\n", level)
+
+        lines = int(self.text.index("end-1c").split(".")[0]) - 1
+        if lines > MAX_LINES:
+            self.text.delete("1.0", f"{lines - MAX_LINES + 1}.0")
+
+        self.text.see("end")
+        self.text.configure(state="disabled")
+
+    def close(self):
+        """Write out any queued log lines"""
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
@@ -0,0 +1,6 @@
+def percentile(sorted_values, fraction):
+    """Return the value at a fraction (0-1) of a sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
@@ -0,0 +1,111 @@
+import os
+import json
+import tempfile
+import threading
+import time
+
+
+def write_json_atomic(path, data, indent=4):
+    """Write JSON to a temp file next to path and rename it into place"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except Exception:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+class PersistenceService:
+    """Debounced background writer for config and cache files
+
+    Writes are scheduled under a key. Scheduling the same key again before it
+    has been written replaces the pending write, so bursts of changes (e.g.
+    switching between projects) end up as a single write on the background
+    thread. A write is never held back for longer than max_delay.
+    """
+
+    def __init__(self, debounce=0.5, max_delay=2.0):
+        self.debounce = debounce
+        self.max_delay = max_delay
+
+        # key -> (write function, due time, first scheduled time)
+        self.pending = {}
+        self.condition = threading.Condition()
+        self.writing = False
+        self.running = True
+
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def schedule(self, key, write_fn):
+        """Schedule write_fn to run on the writer thread after the debounce window"""
+        now = time.monotonic()
+        with self.condition:
+            if key in self.pending:
+                first_scheduled = self.pending[key][2]
+            else:
+                first_scheduled = now
+            due = min(now + self.debounce, first_scheduled + self.max_delay)
+            self.pending[key] = (write_fn, due, first_scheduled)
+            self.condition.notify()
+
+    def _take_due(self, flush_all=False):
+        """Remove and return the writes that are due (caller holds the lock)"""
+        now = time.monotonic()
+        due_keys = [key for key, (_, due, _) in self.pending.items() if flush_all or due <= now]
+        return [self.pending.pop(key)[0] for key in due_keys]
+
+    def _run(self):
+        """Writer thread loop"""
+        while True:
+            with self.condition:
+                while self.running and not self.pending:
+                    self.condition.wait()
+                if not self.running and not self.pending:
+                    return
+
+                writes = self._take_due(flush_all=not self.running)
+                if not writes:
+                    next_due = min(due for _, due, _ in self.pending.values())
+                    self.condition.wait(max(0.0, next_due - time.monotonic()))
+                    continue
+                self.writing = True
+
+            self._perform(writes)
+
+            with self.condition:
+                self.writing = False
+                self.condition.notify_all()
+
+    def _perform(self, writes):
+        """Run write functions, reporting rather than raising errors"""
+        for write_fn in writes:
+            try:
+                write_fn()
+            except Exception as e:
+                print(f"Error writing to disk: {str(e)}")
+
+    def flush(self):
+        """Write everything that is pending now and wait for it to finish"""
+        with self.condition:
+            # Let an in-progress write on the background thread finish first
+            while self.writing:
+                self.condition.wait()
+            writes = self._take_due(flush_all=True)
+        self._perform(writes)
+
+    def stop(self):
+        """Flush pending writes and stop the writer thread"""
+        self.flush()
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        self.thread.join(timeout=5)
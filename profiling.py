@@ -0,0 +1,282 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from percentiles import percentile
+
+# "1" turns profiling on, "memory" also tracks allocations (main.py sets it for --profile)
+ENV_VAR = "RUSHES_PROFILE"
+
+# Output folder of the session and the pid of the app's own process, set by the
+# main process and inherited by the thumbnail workers
+DIR_ENV_VAR = "RUSHES_PROFILE_DIR"
+PID_ENV_VAR = "RUSHES_PROFILE_PID"
+DIAGNOSTICS_DIR = "diagnostics"
+
+# Spans kept for the trace (the oldest are dropped in very long sessions)
+MAX_SPANS = 200000
+
+# Lines in the text summaries of each profile and of the memory snapshot
+SUMMARY_LINES = 40
+MEMORY_LINES = 30
+
+MODE = ""
+ENABLED = False
+TRACE_MEMORY = False
+
+profiler = None
+
+
+def read_mode():
+    global MODE, ENABLED, TRACE_MEMORY
+    MODE = os.environ.get(ENV_VAR, "").strip().lower()
+    ENABLED = MODE not in ("", "0", "false", "no", "off")
+    TRACE_MEMORY = ENABLED and MODE == "memory"
+
+
+def configure(argv):
+    """Turn profiling on for --profile or --profile-memory
+
+    Must run before the app's modules are imported: the hooks are applied
+    when they are, and with profiling off the functions are left unwrapped.
+    """
+    if "--profile-memory" in argv:
+        os.environ[ENV_VAR] = "memory"
+    elif "--profile" in argv:
+        os.environ[ENV_VAR] = "1"
+    read_mode()
+    start()
+
+
+def start():
+    """Create this process's profiler if profiling is on
+
+    The profilers themselves are only imported here, so the hooks add
+    nothing to startup when profiling is off.
+    """
+    global profiler
+    if not ENABLED or profiler is not None:
+        return
+    import atexit
+
+    # Workers import the app's modules before multiprocessing has told them
+    # they are children, so they recognise themselves by the inherited pid
+    owner = os.environ.get(PID_ENV_VAR)
+    worker = owner is not None and owner != str(os.getpid())
+    if not worker:
+        os.environ[PID_ENV_VAR] = str(os.getpid())
+        if not os.environ.get(DIR_ENV_VAR):
+            os.environ[DIR_ENV_VAR] = os.path.abspath(
+                os.path.join(DIAGNOSTICS_DIR, f"profile_{time.strftime('%Y%m%d_%H%M%S')}")
+            )
+    profiler = Profiler(os.environ[DIR_ENV_VAR], worker=worker)
+    if not profiler.worker:
+        if TRACE_MEMORY:
+            import tracemalloc
+            tracemalloc.start()
+        atexit.register(profiler.dump)
+        print(f"Profiling enabled; results will be written to {profiler.directory}")
+
+
+def profiled(name):
+    """Decorator: run each call under cProfile (section name) and record it as a span
+
+    Only one cProfile section runs at a time across threads; a call that
+    overlaps another (or nests inside one) is recorded as a span only. With
+    profiling off the function is returned as it is.
+    """
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            return profiler.call(name, fn, args, kwargs, cpu=True)
+        return wrapper
+    return decorate
+
+
+def timed(name):
+    """Decorator: record each call as a span, without cProfile"""
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            return profiler.call(name, fn, args, kwargs, cpu=False)
+        return wrapper
+    return decorate
+
+
+class Profiler:
+    """Span timings and cProfile sections for one process
+
+    The main process writes everything to its session folder at exit:
+    trace.json (Chrome trace format, which chrome://tracing, Perfetto and
+    speedscope show as a flame chart), spans.txt (per-stage timing
+    summary), one merged <section>.prof per profiled section with a
+    <section>.txt summary, and memory.txt in memory mode. Worker processes
+    are ended without running atexit, so they append their spans and
+    rewrite their profiles after every call instead.
+    """
+
+    def __init__(self, directory, worker=False):
+        self.directory = directory
+        self.worker = worker
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+        # Held while a cProfile section runs
+        self.cpu_lock = threading.Lock()
+
+        self.spans = deque(maxlen=MAX_SPANS)
+        self.thread_names = {}
+        self.profiles = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def call(self, name, fn, args, kwargs, cpu):
+        import tracemalloc
+        profile = self.begin_profile(name) if cpu else None
+        allocated = tracemalloc.get_traced_memory()[0] if TRACE_MEMORY else None
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            ended = time.perf_counter()
+            if profile is not None:
+                profile.disable()
+                self.cpu_lock.release()
+            details = {}
+            if allocated is not None:
+                details["allocated_kb"] = round((tracemalloc.get_traced_memory()[0] - allocated) / 1024, 1)
+            if cpu and profile is None:
+                details["profiled"] = False
+            self.record(name, started, ended, details)
+            if self.worker and profile is not None:
+                profile.dump_stats(os.path.join(self.directory, f"{name}-{self.pid}.prof"))
+
+    def begin_profile(self, name):
+        """Start this section's profiler, or return None if another section is running"""
+        import cProfile
+        if not self.cpu_lock.acquire(blocking=False):
+            return None
+        profile = self.profiles.setdefault(name, cProfile.Profile())
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiling tool (e.g. a debugger) is active
+            self.cpu_lock.release()
+            return None
+        return profile
+
+    def record(self, name, started, ended, details=None):
+        thread = threading.current_thread()
+        event = {
+            "name": name,
+            "ph": "X",
+            "ts": round(started * 1e6),
+            "dur": round((ended - started) * 1e6),
+            "pid": self.pid,
+            "tid": thread.ident,
+        }
+        if details:
+            event["args"] = details
+        with self.lock:
+            self.spans.append(event)
+            self.thread_names[thread.ident] = thread.name
+        if self.worker:
+            with open(os.path.join(self.directory, f"spans-{self.pid}.jsonl"), "a") as f:
+                f.write(json.dumps(event) + "\n")
+
+    def dump(self):
+        """Write the session's trace, span summary, profiles and memory snapshot"""
+        import glob
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with self.lock:
+                events = list(self.spans)
+                thread_names = dict(self.thread_names)
+            for name, profile in list(self.profiles.items()):
+                profile.dump_stats(os.path.join(self.directory, f"{name}-{self.pid}.prof"))
+
+            worker_pids = set()
+            for path in glob.glob(os.path.join(self.directory, "spans-*.jsonl")):
+                with open(path) as f:
+                    for line in f:
+                        event = json.loads(line)
+                        worker_pids.add(event["pid"])
+                        events.append(event)
+
+            self.write_trace(events, thread_names, worker_pids)
+            self.write_span_summary(events)
+            self.write_profiles()
+            if TRACE_MEMORY:
+                self.write_memory()
+            print(f"Profile written to {self.directory}")
+        except Exception as e:
+            print(f"Error writing profile: {str(e)}")
+
+    def write_trace(self, events, thread_names, worker_pids):
+        metadata = [{"name": "process_name", "ph": "M", "pid": self.pid, "args": {"name": "Rushes Transfer"}}]
+        metadata += [
+            {"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid, "args": {"name": name}}
+            for tid, name in thread_names.items()
+        ]
+        metadata += [
+            {"name": "process_name", "ph": "M", "pid": pid, "args": {"name": f"Thumbnail worker {pid}"}}
+            for pid in sorted(worker_pids)
+        ]
+        with open(os.path.join(self.directory, "trace.json"), "w") as f:
+            json.dump({"traceEvents": metadata + events, "displayTimeUnit": "ms"}, f)
+
+    def write_span_summary(self, events):
+        durations = {}
+        for event in events:
+            durations.setdefault(event["name"], []).append(event["dur"] / 1000)
+        lines = [f"{'span':<32}{'count':>8}{'total ms':>12}{'mean':>10}{'p50':>10}{'p90':>10}{'max':>10}"]
+        for name, values in sorted(durations.items(), key=lambda item: -sum(item[1])):
+            values.sort()
+            lines.append(
+                f"{name:<32}{len(values):>8}{sum(values):>12.1f}{sum(values) / len(values):>10.1f}"
+                f"{percentile(values, 0.5):>10.1f}{percentile(values, 0.9):>10.1f}{values[-1]:>10.1f}"
+            )
+        with open(os.path.join(self.directory, "spans.txt"), "w") as f:
+            f.write("\n".join(lines) + "\n")
+
+    def write_profiles(self):
+        """Merge each section's per-process profiles into <section>.prof and <section>.txt"""
+        import glob
+        import io
+        import pstats
+        sections = {}
+        for path in glob.glob(os.path.join(self.directory, "*-*.prof")):
+            sections.setdefault(os.path.basename(path).rsplit("-", 1)[0], []).append(path)
+        for name, paths in sections.items():
+            try:
+                stats = pstats.Stats(*paths)
+            except Exception as e:
+                print(f"Error reading profile {name}: {str(e)}")
+                continue
+            stats.dump_stats(os.path.join(self.directory, f"{name}.prof"))
+            text = io.StringIO()
+            stats.stream = text
+            stats.sort_stats("cumulative").print_stats(SUMMARY_LINES)
+            with open(os.path.join(self.directory, f"{name}.txt"), "w") as f:
+                f.write(text.getvalue())
+
+    def write_memory(self):
+        import tracemalloc
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"Traced memory: {current / 1024 / 1024:.1f} MB now, {peak / 1024 / 1024:.1f} MB peak", ""]
+        for stat in tracemalloc.take_snapshot().statistics("lineno")[:MEMORY_LINES]:
+            lines.append(str(stat))
+        with open(os.path.join(self.directory, "memory.txt"), "w") as f:
+            f.write("\n".join(lines) + "\n")
+
+
+# Worker processes and RUSHES_PROFILE set in the environment turn profiling on at import
+read_mode()
+start()
@@ -0,0 +1,170 @@
+import os
+import threading
+import time
+
+import profiling
+
+# Files counted as clips in a project's rushes folder
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.avi', '.mxf', '.m4v')
+
+# How often the projects root is checked for added or removed projects
+POLL_INTERVAL_MS = 30000
+
+
+@profiling.timed("list_project_dirs")
+def list_project_dirs(base_path):
+    """Return the sorted names of the folders in base_path
+
+    os.scandir reports whether each entry is a folder from the listing
+    itself, so this costs one directory read rather than a stat per entry
+    (which is what makes listing a network share slow).
+    """
+    with os.scandir(base_path) as entries:
+        projects = [entry.name for entry in entries if entry.is_dir()]
+    return sorted(projects, key=str.lower)
+
+
+@profiling.timed("rushes_stats")
+def rushes_stats(path):
+    """Return (clip count, total bytes) of the video files under path"""
+    clips = 0
+    size = 0
+    pending = [path]
+    while pending:
+        try:
+            with os.scandir(pending.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif os.path.splitext(entry.name)[1].lower() in VIDEO_EXTENSIONS:
+                        clips += 1
+                        size += entry.stat().st_size
+        except OSError:
+            continue
+    return clips, size
+
+
+class ProjectIndex:
+    """Lists the projects root in the background and keeps it up to date
+
+    The last listing (kept in the config) is shown straight away. The root
+    is then listed on a background thread and polled every
+    POLL_INTERVAL_MS; a poll only re-lists it when the root's modification
+    time has changed, which is a single stat. Per-project rushes stats (clip
+    count and size) are computed on demand, cached, and shown immediately
+    the next time while a fresh count runs.
+    """
+
+    def __init__(self, app, on_projects, on_stats):
+        self.app = app
+        self.on_projects = on_projects
+        self.on_stats = on_stats
+        self.lock = threading.Lock()
+
+        self.base_path = None
+        self.root_mtime = None
+        self.request_id = 0
+        self.poll_id = None
+
+        # project name -> [clips, bytes, time counted]; written by the counting
+        # threads and read by the UI thread, always under self.lock
+        self.stats = {}
+        self.stats_running = set()
+        # project -> rushes path, for projects asked for again while being counted
+        self.stats_rerun = {}
+
+    def refresh(self, base_path, force=True):
+        """List base_path in the background; unless forced, only if it changed since the last listing"""
+        with self.lock:
+            if base_path != self.base_path:
+                self.base_path = base_path
+                self.root_mtime = None
+                force = True
+            self.request_id += 1
+            request_id = self.request_id
+
+        def list_projects():
+            try:
+                if not os.path.exists(base_path):
+                    return
+                mtime = os.stat(base_path).st_mtime
+                if not force and mtime == self.root_mtime:
+                    return
+                projects = list_project_dirs(base_path)
+                with self.lock:
+                    if request_id != self.request_id:
+                        # A newer listing has been started
+                        return
+                    self.root_mtime = mtime
+                self.app.scheduler.post(lambda: self.on_projects(projects))
+            except Exception as e:
+                error = str(e)
+                self.app.ui.show_notification(f"Failed to load projects: {error}", "error")
+
+        threading.Thread(target=list_projects, daemon=True).start()
+        self.schedule_poll()
+
+    def schedule_poll(self):
+        if self.poll_id is not None:
+            self.app.root.after_cancel(self.poll_id)
+        self.poll_id = self.app.root.after(POLL_INTERVAL_MS, self.poll)
+
+    def poll(self):
+        self.poll_id = None
+        if self.base_path:
+            self.refresh(self.base_path, force=False)
+
+    def cached_stats(self, project):
+        """Return the last known (clips, bytes) for a project, or None"""
+        with self.lock:
+            stats = self.stats.get(project)
+        return (stats[0], stats[1]) if stats else None
+
+    def load_stats(self, stats):
+        """Restore the counts saved in the config"""
+        with self.lock:
+            self.stats = {project: list(entry) for project, entry in stats.items()}
+
+    def stats_snapshot(self):
+        """Return a copy of every project's counts, for saving in the config"""
+        with self.lock:
+            return {project: list(entry) for project, entry in self.stats.items()}
+
+    def request_stats(self, project, rushes_path):
+        """Count a project's clips in the background and report them through on_stats"""
+        with self.lock:
+            if project in self.stats_running:
+                # The clips may have changed since the running count started
+                # (e.g. a transfer just finished), so count again after it
+                self.stats_rerun[project] = rushes_path
+                return
+            self.stats_running.add(project)
+
+        def count(rushes_path):
+            counted = False
+            finished = False
+            released = False
+            try:
+                while not released:
+                    clips, size = rushes_stats(rushes_path) if os.path.isdir(rushes_path) else (0, 0)
+                    with self.lock:
+                        self.stats[project] = [clips, size, int(time.time())]
+                    counted = True
+                    self.app.scheduler.post(lambda clips=clips, size=size: self.on_stats(project, (clips, size)))
+                    with self.lock:
+                        rushes_path = self.stats_rerun.pop(project, None)
+                        if rushes_path is None:
+                            released = True
+                            self.stats_running.discard(project)
+                            finished = not self.stats_running
+            finally:
+                if not released:
+                    with self.lock:
+                        self.stats_rerun.pop(project, None)
+                        self.stats_running.discard(project)
+                        finished = not self.stats_running
+                # Keep the counts for next time, once per pass rather than per project
+                if counted and finished:
+                    self.app.scheduler.post(self.app.cache_manager.save_config, key="save_project_stats")
+
+        threading.Thread(target=count, args=(rushes_path,), daemon=True).start()
@@ -0,0 +1,156 @@
+from collections import Counter
+
+
+class SelectionModel:
+    """Which clips in the file list are selected for transfer
+
+    The selection is a set of file paths, so toggling, membership tests and
+    counting are O(1) however many clips the card holds. The model also knows
+    the order of the clips being shown (for shift-click ranges) and keeps
+    named saved selections. Bulk changes apply to the shown clips; clips
+    hidden by a filter stay selected, and restoring a saved selection picks
+    up hidden clips too.
+
+    Every change made through the model calls on_change() once, so the UI
+    can resync its visible rows and post a single status update.
+    """
+
+    def __init__(self, on_change=None):
+        self.on_change = on_change
+        self.records = []
+        self.positions = {}
+        # Every clip in the list, including those a filter hides
+        self.listed = {}
+        self.selected = set()
+        # How many of the shown clips are selected, kept up to date by single
+        # clicks and recounted after bulk changes
+        self.shown_selected = 0
+
+        # The last row clicked, where a shift-click range starts
+        self.anchor = None
+
+        # name -> list of file paths
+        self.saved = {}
+
+    def _recount(self):
+        self.shown_selected = len(self.positions.keys() & self.selected)
+
+    def _changed(self):
+        if self.on_change:
+            self.on_change()
+
+    # ----- the list -----
+
+    def set_records(self, records, keep=False, listed=None):
+        """Follow the clips being shown, optionally keeping the selection (e.g. after a re-sort)
+
+        listed holds the paths of every clip in the list when a filter hides
+        some of them; it defaults to the shown clips.
+        """
+        self.records = records
+        self.positions = {record.file_path: index for index, record in enumerate(records)}
+        self.listed = self.positions if listed is None else listed
+        if not keep:
+            self.selected = set()
+            self.anchor = None
+        self._recount()
+
+    # ----- queries -----
+
+    def __contains__(self, file_path):
+        return file_path in self.selected
+
+    def __len__(self):
+        return len(self.selected)
+
+    def all_selected(self):
+        """Return True if every shown clip is selected"""
+        return bool(self.records) and self.shown_selected == len(self.records)
+
+    def days(self):
+        """Return (date, clip count) for every shooting day in the list, newest first"""
+        counts = Counter(record.mod_datetime.date() for record in self.records)
+        return sorted(counts.items(), reverse=True)
+
+    # ----- changes -----
+
+    def set(self, file_path, selected):
+        """Select or deselect one clip and make it the range anchor"""
+        if file_path not in self.positions:
+            return
+        if selected != (file_path in self.selected):
+            if selected:
+                self.selected.add(file_path)
+                self.shown_selected += 1
+            else:
+                self.selected.discard(file_path)
+                self.shown_selected -= 1
+        self.anchor = file_path
+        self._changed()
+
+    def extend_to(self, file_path):
+        """Shift-click: give every clip from the anchor to file_path the anchor's state"""
+        end = self.positions.get(file_path)
+        if end is None:
+            return
+        start = self.positions.get(self.anchor)
+        if start is None:
+            self.set(file_path, True)
+            return
+        first, last = sorted((start, end))
+        paths = [record.file_path for record in self.records[first:last + 1]]
+        if self.anchor in self.selected:
+            self.shown_selected += sum(1 for path in paths if path not in self.selected)
+            self.selected.update(paths)
+        else:
+            self.shown_selected -= sum(1 for path in paths if path in self.selected)
+            self.selected.difference_update(paths)
+        self._changed()
+
+    def select_all(self):
+        self.selected |= self.positions.keys()
+        self.shown_selected = len(self.positions)
+        self._changed()
+
+    def clear(self):
+        self.selected -= self.positions.keys()
+        self.shown_selected = 0
+        self._changed()
+
+    def invert(self):
+        self.selected ^= self.positions.keys()
+        self.shown_selected = len(self.positions) - self.shown_selected
+        self._changed()
+
+    def select_where(self, predicate, add=False):
+        """Select the shown clips a predicate accepts, deselecting the other shown clips unless add is set
+
+        Returns the number of matching clips.
+        """
+        matches = {record.file_path for record in self.records if predicate(record)}
+        if add:
+            self.selected |= matches
+        else:
+            self.selected = (self.selected - self.positions.keys()) | matches
+        self._recount()
+        self._changed()
+        return len(matches)
+
+    def select_day(self, day, add=False):
+        """Select every clip shot on a date"""
+        return self.select_where(lambda record: record.mod_datetime.date() == day, add)
+
+    # ----- saved selections -----
+
+    def save(self, name):
+        self.saved[name] = sorted(self.selected)
+
+    def restore(self, name):
+        """Select the clips of a saved selection that are in the list, shown or not; returns how many"""
+        self.selected = {path for path in self.saved.get(name, ()) if path in self.listed}
+        self._recount()
+        self._changed()
+        return len(self.selected)
+
+    def delete_saved(self, name):
+        self.saved.pop(name, None)
@@ -0,0 +1,460 @@
+import os
+import time
+import heapq
+import itertools
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import profiling
+
+THUMBNAIL_SIZE = (70, 40)
+
+# Fraction of the way into a clip to take the thumbnail frame from
+SEEK_FRACTION = 0.2
+
+
+def find_sidecar_thumbnail(file_path):
+    """Return the path of a camera-written thumbnail for a clip, or None
+
+    Sony cards keep a JPEG per clip in M4ROOT/THMBNL/<clip>T01.JPG next to
+    M4ROOT/CLIP/<clip>.MP4; Canon and others write a <clip>.THM beside the clip.
+    """
+    clip_dir, filename = os.path.split(file_path)
+    stem = os.path.splitext(filename)[0]
+
+    candidates = [os.path.join(clip_dir, stem + ext) for ext in (".THM", ".thm")]
+    if os.path.basename(clip_dir).upper() == "CLIP":
+        card_root = os.path.dirname(clip_dir)
+        for folder in ("THMBNL", "thmbnl"):
+            for suffix in ("T01.JPG", "T01.jpg"):
+                candidates.append(os.path.join(card_root, folder, stem + suffix))
+
+    for candidate in candidates:
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def read_sidecar_frame(cv2, path):
+    """Decode a sidecar JPEG (works with non-ASCII paths on Windows too)"""
+    import numpy as np
+
+    data = np.fromfile(path, dtype=np.uint8)
+    if data.size == 0:
+        return None
+    return cv2.imdecode(data, cv2.IMREAD_COLOR)
+
+
+# OpenCV FOURCCs mapped to the names editors know them by
+CODEC_NAMES = {
+    "avc1": "H.264", "h264": "H.264", "x264": "H.264",
+    "hev1": "H.265", "hvc1": "H.265", "hevc": "H.265", "h265": "H.265",
+    "apcn": "ProRes 422", "apch": "ProRes 422 HQ", "apcs": "ProRes 422 LT",
+    "apco": "ProRes 422 Proxy", "ap4h": "ProRes 4444", "mp4v": "MPEG-4", "fmp4": "MPEG-4",
+    "xdvb": "XDCAM", "mjpg": "MJPEG",
+}
+
+
+def probe_capture(cv2, cap):
+    """Read a clip's technical metadata from an open capture's headers (no decoding)
+
+    Returns a dict with duration (seconds), fps, width, height and codec;
+    empty if the clip couldn't be opened.
+    """
+    if not cap.isOpened():
+        return {}
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    total_frames = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+    fourcc = int(cap.get(cv2.CAP_PROP_FOURCC))
+    fourcc = "".join(chr((fourcc >> (8 * i)) & 0xFF) for i in range(4)).strip("\0 ").lower()
+    return {
+        'duration': round(total_frames / fps, 3) if fps > 0 and total_frames > 0 else None,
+        'fps': round(fps, 3) if fps > 0 else None,
+        'width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)) or None,
+        'height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) or None,
+        'codec': CODEC_NAMES.get(fourcc, fourcc.upper()),
+    }
+
+
+def read_video_frame(cv2, cap, clip_info):
+    """Decode a single frame SEEK_FRACTION of the way into an open clip
+
+    Seeking by time lets the demuxer jump to the nearest keyframe, and
+    grab()/retrieve() decodes just the one frame we keep, instead of
+    stepping frame by frame through a long-GOP stream.
+    """
+    if not cap.isOpened():
+        return None
+
+    if clip_info.get('duration'):
+        cap.set(cv2.CAP_PROP_POS_MSEC, clip_info['duration'] * SEEK_FRACTION * 1000)
+
+    if not cap.grab():
+        return None
+    success, frame = cap.retrieve()
+    return frame if success else None
+
+
+def probe_clip(file_path):
+    """Read just a clip's technical metadata (for clips whose thumbnail is already stored)"""
+    import cv2
+
+    cap = cv2.VideoCapture(file_path)
+    try:
+        return probe_capture(cv2, cap)
+    finally:
+        cap.release()
+
+
+@profiling.profiled("generate_thumbnail")
+def extract_thumbnail(file_path, size=THUMBNAIL_SIZE):
+    """Get one frame of a clip and shrink it to a thumbnail, probing the clip on the way
+
+    Runs in a worker process. The clip is opened once: its headers give the
+    technical metadata, then the camera's own sidecar thumbnail is used when
+    there is one, otherwise a frame is decoded from the same capture.
+    Returns (width, height, rgb_bytes, clip_info); width and height are 0 and
+    rgb_bytes empty if no frame could be read. Only plain data crosses the
+    process boundary.
+    """
+    import cv2
+
+    start = time.perf_counter()
+    frame = None
+    source = "sidecar"
+
+    cap = cv2.VideoCapture(file_path)
+    try:
+        clip_info = probe_capture(cv2, cap)
+
+        sidecar = find_sidecar_thumbnail(file_path)
+        if sidecar is not None:
+            try:
+                frame = read_sidecar_frame(cv2, sidecar)
+            except Exception as e:
+                print(f"Error reading sidecar thumbnail {sidecar}: {str(e)}")
+
+        if frame is None:
+            source = "decoded"
+            frame = read_video_frame(cv2, cap, clip_info)
+    finally:
+        cap.release()
+
+    if frame is None:
+        print(f"Thumbnail for {os.path.basename(file_path)}: no frame "
+              f"({(time.perf_counter() - start) * 1000:.1f} ms)")
+        return 0, 0, b"", clip_info
+
+    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+    print(f"Thumbnail for {os.path.basename(file_path)}: {source} "
+          f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+    return size[0], size[1], frame.tobytes(), clip_info
+
+
+@profiling.profiled("generate_filmstrip")
+def extract_filmstrip(file_path, frames=8, size=THUMBNAIL_SIZE):
+    """Decode frames evenly spaced through a clip into one horizontal strip
+
+    Runs in a worker process. The clip is opened once and read front to back:
+    each position is reached with a forward time seek (which lands on the
+    nearest keyframe) and a single grab()/retrieve(). Returns
+    (width * frames, height, rgb_bytes), or None if the clip can't be read.
+    """
+    import cv2
+    import numpy as np
+
+    start = time.perf_counter()
+    cap = cv2.VideoCapture(file_path)
+    try:
+        if not cap.isOpened():
+            return None
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        total_frames = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+        if fps <= 0 or total_frames <= 0:
+            return None
+        duration_ms = total_frames / fps * 1000
+
+        tiles = []
+        for i in range(frames):
+            # Centre of each of the N equal slices of the clip
+            cap.set(cv2.CAP_PROP_POS_MSEC, duration_ms * (i + 0.5) / frames)
+            success = cap.grab()
+            if success:
+                success, frame = cap.retrieve()
+            if not success:
+                # Repeat the previous frame rather than leave a gap
+                if not tiles:
+                    return None
+                tiles.append(tiles[-1])
+                continue
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            tiles.append(cv2.resize(frame, size, interpolation=cv2.INTER_AREA))
+    finally:
+        cap.release()
+
+    strip = np.hstack(tiles)
+    print(f"Filmstrip for {os.path.basename(file_path)}: {frames} frames "
+          f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+    return strip.shape[1], strip.shape[0], strip.tobytes()
+
+
+# Work the pool can do, by job kind
+TASKS = {
+    "thumbnail": extract_thumbnail,
+    "filmstrip": extract_filmstrip,
+    "probe": probe_clip,
+}
+
+
+def default_worker_count():
+    """Leave one core for the UI and the copy loop"""
+    return max(1, (os.cpu_count() or 2) - 1)
+
+
+class ThumbnailEngine:
+    """Generates thumbnails on a pool of worker processes
+
+    Decoding happens in separate processes so it never competes with the UI
+    thread or the copy loop for the GIL. A single dispatcher thread feeds the
+    pool; it sleeps on a condition variable while there is nothing to do and
+    shuts the pool down after idle_timeout seconds without work.
+
+    Each job is a clip plus a kind from TASKS ("thumbnail" unless given);
+    a clip can have one queued job of each kind. Queued jobs are started
+    lowest priority value first, so the caller can rank them by how close
+    their row is to the viewport, rank them again when the view scrolls
+    (reprioritize) and drop the ones that are no longer wanted (cancel).
+    Jobs already handed to a worker always finish.
+
+    A clip may be decoded from another copy of the same file (decode_path),
+    e.g. one just written to the destination. Directories can be paused so
+    nothing is decoded from them: clips that would need to be are set aside
+    until resume(), while clips found by lookup are still served.
+
+    lookup(file_path, kind) is called on the dispatcher thread before
+    decoding and may return a result from cache. is_busy() is polled to throttle: while it
+    returns True (a transfer is running) only one clip is decoded at a time.
+    """
+
+    def __init__(self, lookup=None, is_busy=None, max_workers=None, idle_timeout=30.0):
+        self.lookup = lookup
+        self.is_busy = is_busy
+        self.max_workers = max_workers or default_worker_count()
+        self.idle_timeout = idle_timeout
+
+        self.condition = threading.Condition()
+        # (kind, file_path) -> (priority, sequence, on_done, decode_path, args);
+        # the heap holds (priority, sequence, job key) and may contain stale entries
+        self.pending = {}
+        self.heap = []
+        self.sequence = itertools.count()
+
+        # Clips set aside because their decode path is in a paused directory
+        self.paused_dirs = set()
+        self.deferred = {}
+        self.in_flight = 0
+        self.pool = None
+        self.running = True
+
+        self.dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+        self.dispatcher.start()
+
+    def submit(self, file_path, on_done, priority=0, decode_path=None, kind="thumbnail", args=()):
+        """Queue a job; on_done(file_path, result) is called from a background thread
+
+        The clip is read from decode_path if given, otherwise from file_path,
+        and extra args are passed on to the task. Submitting a job that is
+        already queued replaces the earlier request.
+        """
+        with self.condition:
+            job = (kind, file_path)
+            entry = (priority, next(self.sequence), on_done, decode_path or file_path, tuple(args))
+            self.deferred.pop(job, None)
+            self.pending[job] = entry
+            heapq.heappush(self.heap, (entry[0], entry[1], job))
+            self.condition.notify()
+
+    def reprioritize(self, priority_for):
+        """Re-rank queued jobs with priority_for(file_path, kind); None keeps a job's priority"""
+        with self.condition:
+            for queue in (self.pending, self.deferred):
+                for job, entry in list(queue.items()):
+                    priority = priority_for(job[1], job[0])
+                    if priority is not None:
+                        queue[job] = (priority,) + entry[1:]
+            self.heap = [(entry[0], entry[1], job) for job, entry in self.pending.items()]
+            heapq.heapify(self.heap)
+
+    def cancel(self, file_path, on_done=None, kind="thumbnail"):
+        """Drop a queued job (only if its callback is on_done, when given)"""
+        with self.condition:
+            job = (kind, file_path)
+            for queue in (self.pending, self.deferred):
+                entry = queue.get(job)
+                if entry is not None and (on_done is None or entry[2] is on_done):
+                    # A cancelled job's heap entry is skipped when it comes up
+                    del queue[job]
+
+    def clear(self):
+        """Drop all clips that haven't been sent to a worker yet"""
+        with self.condition:
+            self.pending.clear()
+            self.deferred.clear()
+            self.heap = []
+
+    def pause(self, directory):
+        """Stop decoding clips stored under a directory (e.g. a card being copied)"""
+        with self.condition:
+            self.paused_dirs.add(self._normalize(directory))
+
+    def resume(self, directory):
+        """Allow decoding under a directory again and requeue the clips set aside"""
+        with self.condition:
+            self.paused_dirs.discard(self._normalize(directory))
+            for job, entry in list(self.deferred.items()):
+                if not self._is_paused(entry[3]):
+                    del self.deferred[job]
+                    self.pending[job] = entry
+                    heapq.heappush(self.heap, (entry[0], entry[1], job))
+            self.condition.notify()
+
+    def _normalize(self, path):
+        return os.path.normcase(os.path.abspath(path))
+
+    def _is_paused(self, path):
+        """Whether a path lies in a paused directory (caller holds the lock)"""
+        if not self.paused_dirs:
+            return False
+        path = self._normalize(path)
+        return any(path == d or path.startswith(d.rstrip(os.sep) + os.sep) for d in self.paused_dirs)
+
+    def wake(self):
+        """Re-evaluate throttling (e.g. after a transfer starts or stops)"""
+        with self.condition:
+            self.condition.notify()
+
+    def backlog(self):
+        """Number of jobs queued, set aside or being decoded"""
+        with self.condition:
+            return len(self.pending) + len(self.deferred) + self.in_flight
+
+    def _limit(self):
+        """How many clips may be decoded at once right now"""
+        if self.is_busy is not None and self.is_busy():
+            return 1
+        return self.max_workers
+
+    def _next_job(self):
+        """Wait for a job that may be started now; returns None when stopping"""
+        with self.condition:
+            while self.running:
+                if self.pending and self.in_flight < self._limit():
+                    job = self._pop_pending()
+                    if job is not None:
+                        return job
+                    continue
+
+                if not self.pending and self.in_flight == 0 and self.pool is not None:
+                    # Idle - give the workers back to the OS if nothing arrives
+                    if not self.condition.wait(self.idle_timeout):
+                        if not self.pending and self.in_flight == 0:
+                            self._shutdown_pool()
+                    continue
+
+                # Blocked by the throttle: re-check periodically in case it lifted
+                self.condition.wait(0.5 if self.pending else None)
+            return None
+
+    def _pop_pending(self):
+        """Take the most urgent queued job, skipping stale heap entries (caller holds the lock)"""
+        while self.heap:
+            priority, sequence, job = heapq.heappop(self.heap)
+            entry = self.pending.get(job)
+            if entry is not None and entry[1] == sequence:
+                del self.pending[job]
+                return job, entry
+        return None
+
+    def _dispatch(self):
+        """Dispatcher thread loop"""
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            (kind, file_path), entry = job
+            on_done, decode_path, args = entry[2], entry[3], entry[4]
+
+            try:
+                if self.lookup is not None:
+                    cached = self.lookup(file_path, kind)
+                    if cached is not None:
+                        on_done(file_path, cached)
+                        continue
+
+                with self.condition:
+                    if self._is_paused(decode_path):
+                        # Keep it for resume() unless a newer request arrived meanwhile
+                        if (kind, file_path) not in self.pending:
+                            self.deferred[(kind, file_path)] = entry
+                        continue
+                    if self.pool is None:
+                        self.pool = ProcessPoolExecutor(
+                            max_workers=self.max_workers,
+                            mp_context=multiprocessing.get_context("spawn")
+                        )
+                    future = self.pool.submit(TASKS[kind], decode_path, *args)
+                    self.in_flight += 1
+                future.add_done_callback(lambda f, p=file_path, cb=on_done: self._finished(f, p, cb))
+            except BrokenProcessPool as e:
+                print(f"Thumbnail workers unavailable: {str(e)}")
+                with self.condition:
+                    self._shutdown_pool()
+                on_done(file_path, None)
+            except Exception as e:
+                print(f"Error dispatching thumbnail for {file_path}: {str(e)}")
+                on_done(file_path, None)
+
+    def _finished(self, future, file_path, on_done):
+        """Called when a worker process returns"""
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify()
+        try:
+            result = future.result()
+        except BrokenProcessPool as e:
+            # A worker died (e.g. a decoder crash) - start a fresh pool for the next clip
+            print(f"Thumbnail worker failed on {file_path}: {str(e)}")
+            with self.condition:
+                self._shutdown_pool()
+            result = None
+        except Exception as e:
+            print(f"Error creating thumbnail: {str(e)}")
+            result = None
+        on_done(file_path, result)
+
+    def _shutdown_pool(self):
+        """Stop the worker processes (caller holds the lock)"""
+        if self.pool is not None:
+            self.pool.shutdown(wait=False)
+            self.pool = None
+
+    def shutdown(self, wait=False):
+        """Stop the dispatcher and worker processes
+
+        With wait, return only once the clips being decoded have been
+        delivered and the workers have exited.
+        """
+        with self.condition:
+            self.running = False
+            self.pending.clear()
+            self.deferred.clear()
+            self.heap = []
+            pool, self.pool = self.pool, None
+            self.condition.notify_all()
+        if pool is not None:
+            pool.shutdown(wait=wait)
+        if wait and threading.current_thread() is not self.dispatcher:
+            self.dispatcher.join()
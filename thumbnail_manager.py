@@ -0,0 +1,523 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+
+import profiling
+from thumbnail_store import ThumbnailStore
+from thumbnail_engine import ThumbnailEngine, THUMBNAIL_SIZE
+
+# Image codecs are imported on first use so that startup (and headless use of
+# the metadata cache) never pays for them. OpenCV is only ever imported by the
+# thumbnail worker processes (see thumbnail_engine).
+Image = None
+ctk = None
+_codec_lock = threading.Lock()
+
+
+def load_image_codecs():
+    """Import PIL and CustomTkinter's image support if not already imported"""
+    global Image, ctk
+    with _codec_lock:
+        if Image is None:
+            from PIL import Image as _Image
+            import customtkinter as _ctk
+            Image = _Image
+            ctk = _ctk
+
+
+# Size limits for the in-memory thumbnail images and the on-disk store
+MEMORY_CACHE_BYTES = 32 * 1024 * 1024
+DISK_CACHE_BYTES = 256 * 1024 * 1024
+
+# Probes for clips whose thumbnail was already stored run after visible
+# thumbnails; filmstrips queue behind everything else
+PROBE_PRIORITY = (float('inf'), 0)
+FILMSTRIP_PRIORITY = (float('inf'), float('inf'))
+
+# Queued thumbnails this many rows away from the screen are dropped
+STALE_ROWS = 100
+
+
+class ThumbnailMemoryCache:
+    """Least recently used cache of thumbnail images, bounded by their pixel size"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.images = OrderedDict()  # key -> (image, size in bytes)
+        self.total_bytes = 0
+
+    def get(self, key):
+        """Return the image for a key, or None"""
+        with self.lock:
+            entry = self.images.get(key)
+            if entry is None:
+                return None
+            self.images.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, image, size):
+        """Add an image, dropping the least recently used ones to stay under the limit"""
+        with self.lock:
+            old = self.images.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old[1]
+            self.images[key] = (image, size)
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes and len(self.images) > 1:
+                _, (_, dropped) = self.images.popitem(last=False)
+                self.total_bytes -= dropped
+
+    def __contains__(self, key):
+        with self.lock:
+            return key in self.images
+
+    def clear(self):
+        with self.lock:
+            self.images = OrderedDict()
+            self.total_bytes = 0
+
+
+class ThumbnailManager:
+    def __init__(self, app):
+        self.app = app
+
+        # In-memory thumbnails keyed like the store, so a changed clip never
+        # matches an old image
+        self.thumbnail_cache = ThumbnailMemoryCache(MEMORY_CACHE_BYTES)
+
+        # Packed on-disk store of all generated thumbnails
+        self.store = ThumbnailStore(app.thumbnails_dir, max_bytes=DISK_CACHE_BYTES)
+
+        # Frames are decoded on a process pool; only one at a time while a
+        # transfer is running so the copy keeps the disk and CPU
+        self.engine = ThumbnailEngine(
+            lookup=self.read_stored_tile,
+            is_busy=lambda: self.app.transfer_in_progress
+        )
+
+        # Outstanding requests: file_path -> [row index, on_image callback or None],
+        # and the range of rows currently on screen. Requests are made on the UI
+        # thread and completed on the engine's threads, so they are only touched
+        # under requests_lock, which is never held while calling into the engine.
+        self.requests = {}
+        self.requests_lock = threading.Lock()
+        self.viewport = (0, 20)
+
+        # Filmstrip being scrubbed: [file_path, label widget, pointer fraction, key]
+        self.hover = None
+
+        # Placeholder and error images are created on first use
+        self._placeholder_img = None
+        self._error_img = None
+
+    @property
+    def placeholder_img(self):
+        """Thumbnail shown while the real one is loading"""
+        if self._placeholder_img is None:
+            self._placeholder_img = self.create_placeholder_thumbnail()
+        return self._placeholder_img
+
+    @property
+    def error_img(self):
+        """Thumbnail shown when a frame couldn't be extracted"""
+        if self._error_img is None:
+            self._error_img = self.create_error_thumbnail()
+        return self._error_img
+
+    def create_placeholder_thumbnail(self):
+        """Create a placeholder thumbnail"""
+        load_image_codecs()
+
+        # Create a blank image with a "Loading..." text
+        img = Image.new('RGB', (70, 40), color=(50, 50, 50))
+
+        # Convert to CTkImage for proper scaling
+        return ctk.CTkImage(light_image=img, dark_image=img, size=(70, 40))
+
+    def create_error_thumbnail(self):
+        """Create an error thumbnail"""
+        load_image_codecs()
+
+        # Create a red blank image
+        img = Image.new('RGB', (70, 40), color=(100, 30, 30))
+
+        # Convert to CTkImage for proper scaling
+        return ctk.CTkImage(light_image=img, dark_image=img, size=(70, 40))
+
+    def preload_codecs(self):
+        """Import the image codecs ahead of the first thumbnail"""
+        load_image_codecs()
+
+    def request_thumbnail(self, file_path, on_image, row=0):
+        """Get a clip's thumbnail, generating it in the background if needed
+
+        on_image(thumbnail) is called on the UI thread - straight away if the
+        thumbnail is in memory. Requests are served nearest-to-the-viewport
+        first; there is at most one job per clip, so asking again just
+        updates its row and callback.
+        """
+        key = self.get_thumbnail_key(file_path)
+        thumbnail = self.thumbnail_cache.get(key) if key is not None else self.error_img
+        if thumbnail is not None:
+            self.app.metrics.inc("rushes_thumbnail_cache_hits_total", cache="memory")
+            on_image(thumbnail)
+            return
+        self.app.metrics.inc("rushes_thumbnail_cache_misses_total", cache="memory")
+
+        with self.requests_lock:
+            request = self.requests.get(file_path)
+            if request is not None:
+                request[0] = row
+                request[1] = on_image
+                return
+            # The tile may have been finished since the cache was checked
+            thumbnail = self.thumbnail_cache.get(key)
+            if thumbnail is None:
+                self.requests[file_path] = [row, on_image]
+        if thumbnail is not None:
+            on_image(thumbnail)
+            return
+        self.engine.submit(file_path, self.on_thumbnail_ready, self.row_priority(row))
+
+    def prefetch(self, file_path, row):
+        """Generate a thumbnail ahead of its row being shown"""
+        with self.requests_lock:
+            request = self.requests.get(file_path)
+            if request is not None:
+                request[0] = row
+                return
+        key = self.get_thumbnail_key(file_path)
+        if key is None or key in self.thumbnail_cache:
+            return
+        with self.requests_lock:
+            if file_path in self.requests:
+                return
+            self.requests[file_path] = [row, None]
+        self.engine.submit(file_path, self.on_thumbnail_ready, self.row_priority(row))
+
+    def detach_request(self, file_path):
+        """Keep generating a clip's thumbnail, but stop delivering it to its row"""
+        with self.requests_lock:
+            request = self.requests.get(file_path)
+            if request is not None:
+                request[1] = None
+
+    def generate_from_copy(self, file_path, copy_path):
+        """Make a clip's thumbnail from a transferred copy instead of reading the card again"""
+        key = self.get_thumbnail_key(file_path)
+        if key is None or key in self.thumbnail_cache or key in self.store:
+            return
+
+        with self.requests_lock:
+            request = self.requests.get(file_path)
+            row = request[0] if request is not None else None
+        if row is not None:
+            priority = self.row_priority(row)
+        else:
+            # No row is waiting for it - just fill the store for next time
+            priority = (float('inf'), 0)
+        self.engine.submit(file_path, self.on_thumbnail_ready, priority, decode_path=copy_path)
+
+    def cancel_request(self, file_path):
+        """Forget a pending request (e.g. because its row was scrolled far away)"""
+        with self.requests_lock:
+            request = self.requests.pop(file_path, None)
+        if request is not None:
+            self.engine.cancel(file_path)
+
+    def cancel_all_requests(self):
+        """Forget every pending request"""
+        with self.requests_lock:
+            self.requests = {}
+        self.engine.clear()
+
+    def row_priority(self, row):
+        """Rank a row by its distance from the visible rows (on-screen rows first, top down)"""
+        first, last = self.viewport
+        if row < first:
+            return (first - row, row)
+        if row > last:
+            return (row - last, row)
+        return (0, row)
+
+    def set_viewport(self, first, last):
+        """Record which rows are visible and re-rank the queued requests"""
+        if (first, last) == self.viewport:
+            return
+        self.viewport = (first, last)
+
+        # Drop work for rows that have been scrolled far out of view
+        with self.requests_lock:
+            stale = [file_path for file_path, (row, on_image) in self.requests.items()
+                     if on_image is None and self.row_priority(row)[0] > STALE_ROWS]
+            for file_path in stale:
+                del self.requests[file_path]
+            rows = {file_path: request[0] for file_path, request in self.requests.items()}
+        for file_path in stale:
+            self.engine.cancel(file_path)
+
+        def priority_for(path, kind):
+            if kind != "thumbnail":
+                return None
+            row = rows.get(path)
+            return self.row_priority(row) if row is not None else (float('inf'), 0)
+
+        self.engine.reprioritize(priority_for)
+
+    @profiling.timed("on_thumbnail_ready")
+    def on_thumbnail_ready(self, file_path, tile):
+        """Store a finished tile and deliver it to its row, if any (called from a background thread)"""
+        key = None
+        thumbnail = None
+        size = 0
+        try:
+            key = self.get_thumbnail_key(file_path)
+            thumbnail = self.error_img
+            if tile is not None:
+                width, height, rgb_bytes = tile[:3]
+                if len(tile) > 3:
+                    # Straight from a worker, which probed the clip on the same open
+                    self.app.cache_manager.set_clip_info(file_path, tile[3])
+                else:
+                    self.request_probe(file_path)
+
+            if tile is not None and rgb_bytes:
+                if key is not None and key not in self.store:
+                    # Freshly decoded - save it for next time
+                    self.store.put(key, width, height, rgb_bytes)
+                    self.app.cache_manager.set_has_thumbnail(file_path)
+
+                load_image_codecs()
+                image = Image.frombytes('RGB', (width, height), rgb_bytes)
+                thumbnail = ctk.CTkImage(light_image=image, dark_image=image, size=(70, 40))
+                # The PIL image plus Tk's scaled copy of it
+                size = len(rgb_bytes) * 2
+        except Exception as e:
+            print(f"Error creating thumbnail: {str(e)}")
+
+        if key is not None and thumbnail is not None:
+            self.thumbnail_cache.put(key, thumbnail, size)
+
+        # Taken only now, so a row that asks again while the tile is being made
+        # either updates this request or finds the image in the cache. The
+        # request is always answered (with no image if none could be made), so
+        # nothing waits on it forever
+        with self.requests_lock:
+            request = self.requests.pop(file_path, None)
+        on_image = request[1] if request is not None else None
+        if on_image is not None:
+            self.app.scheduler.post(lambda t=thumbnail: on_image(t))
+
+    def request_probe(self, file_path):
+        """Read clip metadata for a clip that has a stored thumbnail but was never probed"""
+        record = self.app.cache_manager.metadata_store.get(file_path)
+        if record is not None and not record.probed:
+            self.engine.submit(file_path, self.on_probe_ready, PROBE_PRIORITY, kind="probe")
+
+    def on_probe_ready(self, file_path, clip_info):
+        """Save a probe result (called from a background thread)"""
+        self.app.cache_manager.set_clip_info(file_path, clip_info or {})
+
+    def start_filmstrip(self, file_path, label_widget):
+        """Start scrubbing a clip's filmstrip on the label under the pointer"""
+        if self.app.filmstrip_frames <= 0:
+            return
+        key = self.get_thumbnail_key(file_path, "filmstrip")
+        if key is None:
+            return
+        self.hover = [file_path, label_widget, 0.0, key]
+
+        if self.thumbnail_cache.get(key) is not None:
+            self.show_filmstrip_frame()
+            return
+        self.engine.submit(
+            file_path, self.on_filmstrip_ready, FILMSTRIP_PRIORITY,
+            kind="filmstrip", args=(self.app.filmstrip_frames,)
+        )
+
+    def scrub_filmstrip(self, label_widget, fraction):
+        """Show the filmstrip frame under the pointer (fraction of the label's width)"""
+        if self.hover is not None and self.hover[1] is label_widget:
+            self.hover[2] = fraction
+            self.show_filmstrip_frame()
+
+    def stop_filmstrip(self, file_path, label_widget):
+        """Put the normal thumbnail back and drop the filmstrip if it hasn't started"""
+        if self.hover is None or self.hover[1] is not label_widget:
+            return
+        self.hover = None
+        self.engine.cancel(file_path, kind="filmstrip")
+
+        key = self.get_thumbnail_key(file_path)
+        thumbnail = self.thumbnail_cache.get(key) if key is not None else None
+        self.set_label_image(label_widget, thumbnail or self.placeholder_img)
+
+    def show_filmstrip_frame(self):
+        """Put the hovered filmstrip frame on its label (UI thread)"""
+        if self.hover is None:
+            return
+        _, label_widget, fraction, key = self.hover
+        frames = self.thumbnail_cache.get(key)
+        if frames:
+            index = min(len(frames) - 1, max(0, int(fraction * len(frames))))
+            self.set_label_image(label_widget, frames[index])
+
+    def on_filmstrip_ready(self, file_path, tile):
+        """Store a finished filmstrip and split it into frames (called from a background thread)"""
+        key = self.get_thumbnail_key(file_path, "filmstrip")
+        if tile is None or key is None:
+            return
+        try:
+            width, height, rgb_bytes = tile
+            if key not in self.store:
+                self.store.put(key, width, height, rgb_bytes)
+
+            load_image_codecs()
+            strip = Image.frombytes('RGB', (width, height), rgb_bytes)
+            frame_width = THUMBNAIL_SIZE[0]
+            frames = []
+            for left in range(0, width - frame_width + 1, frame_width):
+                image = strip.crop((left, 0, left + frame_width, height))
+                frames.append(ctk.CTkImage(light_image=image, dark_image=image, size=THUMBNAIL_SIZE))
+            self.thumbnail_cache.put(key, frames, len(rgb_bytes) * 2)
+        except Exception as e:
+            print(f"Error creating filmstrip: {str(e)}")
+            return
+
+        self.app.scheduler.post(self.show_filmstrip_frame, key="filmstrip")
+
+    def set_label_image(self, label_widget, thumbnail):
+        """Configure a label's image unless the row has been destroyed meanwhile"""
+        try:
+            if label_widget.winfo_exists():
+                label_widget.configure(image=thumbnail)
+        except Exception:
+            pass
+
+    def make_thumbnail_key(self, file_path, file_size, mod_time, kind="thumbnail"):
+        """Key for a thumbnail (or filmstrip): changes whenever the clip is replaced or modified"""
+        identity = f"{file_path}\0{file_size}\0{int(mod_time)}"
+        if kind != "thumbnail":
+            identity += f"\0{kind}"
+        return hashlib.md5(identity.encode()).digest()
+
+    def get_file_identity(self, file_path):
+        """(file_size, mod_time) of a file, from the metadata cache if possible, or None if it can't be found"""
+        record = self.app.cache_manager.metadata_store.get(file_path)
+        if record is not None:
+            return record.file_size, record.mod_time
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime
+
+    def get_thumbnail_key(self, file_path, kind="thumbnail"):
+        """Key for a file's current thumbnail, or None if the file can't be found"""
+        identity = self.get_file_identity(file_path)
+        if identity is None:
+            return None
+        file_size, mod_time = identity
+        return self.make_thumbnail_key(file_path, file_size, mod_time, kind)
+
+    def get_thumbnail_path(self, file_path):
+        """Path of a legacy per-clip PNG thumbnail (imported into the store on first use)"""
+        # Create a hash of the file path to use as the filename
+        file_hash = hashlib.md5(file_path.encode()).hexdigest()
+        return os.path.join(self.app.thumbnails_dir, f"{file_hash}.png")
+
+    def get_legacy_thumbnail(self, file_path, mod_time):
+        """Path of a legacy PNG thumbnail made from this version of the file, or None
+
+        Legacy PNGs are named after the path alone, so one older than the clip
+        was made from a file since replaced; it is deleted.
+        """
+        legacy_path = self.get_thumbnail_path(file_path)
+        try:
+            if os.path.getmtime(legacy_path) > mod_time:
+                return legacy_path
+            os.remove(legacy_path)
+        except OSError:
+            pass
+        return None
+
+    def has_disk_thumbnail(self, file_path, file_size, mod_time):
+        """Check whether a thumbnail for this version of the file has been saved to disk"""
+        return (self.make_thumbnail_key(file_path, file_size, mod_time) in self.store
+                or self.get_legacy_thumbnail(file_path, mod_time) is not None)
+
+    def read_stored_tile(self, file_path, kind="thumbnail"):
+        """Return the stored (width, height, rgb_bytes) tile for a clip, or None"""
+        if kind == "probe":
+            # Probe results live in the metadata cache; the job only runs when missing
+            return None
+        identity = self.get_file_identity(file_path)
+        if identity is None:
+            return None
+        file_size, mod_time = identity
+        key = self.make_thumbnail_key(file_path, file_size, mod_time, kind)
+        tile = self.store.get(key)
+        if kind == "thumbnail":
+            hit = "hits" if tile is not None else "misses"
+            self.app.metrics.inc(f"rushes_thumbnail_cache_{hit}_total", cache="disk")
+        if tile is not None or kind != "thumbnail":
+            return tile
+
+        # Move thumbnails saved by older versions into the store
+        legacy_path = self.get_legacy_thumbnail(file_path, mod_time)
+        if legacy_path is not None:
+            try:
+                load_image_codecs()
+                with Image.open(legacy_path) as png:
+                    image = png.convert('RGB')
+                self.store.put(key, image.width, image.height, image.tobytes())
+                os.remove(legacy_path)
+                return image.width, image.height, image.tobytes()
+            except Exception as e:
+                print(f"Error importing legacy thumbnail {legacy_path}: {str(e)}")
+        return None
+
+    def collect_garbage(self, identities):
+        """Drop stored thumbnails for clips no longer in the metadata cache (or since changed)
+
+        identities yields (file_path, file_size, mod_time) for every cached
+        clip. It is read as a stream, so only the store's own keys are held
+        in memory, however many clips the cache remembers.
+        """
+        try:
+            orphans = set(self.store.keys())
+            for file_path, file_size, mod_time in identities:
+                if not orphans:
+                    break
+                for kind in ("thumbnail", "filmstrip"):
+                    orphans.discard(self.make_thumbnail_key(file_path, file_size, mod_time, kind))
+            if orphans or self.store.garbage_ratio() > 0.3:
+                removed = self.store.compact(orphans)
+                print(f"Compacted thumbnail store ({removed} orphaned thumbnails removed)")
+        except Exception as e:
+            print(f"Error compacting thumbnail store: {str(e)}")
+
+    def close(self, wait=False):
+        """Stop the thumbnail workers (with wait, until they have exited) and release the store"""
+        self.engine.shutdown(wait=wait)
+        self.store.close()
+
+    def clear_memory_cache(self):
+        """Drop all in-memory thumbnails and any queued requests"""
+        self.cancel_all_requests()
+        self.thumbnail_cache.clear()
+
+    def clear_thumbnails(self):
+        """Clear all thumbnails from disk"""
+        try:
+            self.store.clear()
+            # Also remove any per-clip PNGs left by older versions
+            for file in os.listdir(self.app.thumbnails_dir):
+                file_path = os.path.join(self.app.thumbnails_dir, file)
+                if os.path.isfile(file_path) and file.endswith('.png'):
+                    os.remove(file_path)
+            self.app.ui.show_notification("All thumbnails cleared from disk", "info")
+        except Exception as e:
+            self.app.ui.show_notification(f"Error clearing thumbnails: {str(e)}", "error")
@@ -0,0 +1,299 @@
+import os
+import mmap
+import struct
+import threading
+import time
+import zlib
+
+# Index file layout: a header followed by fixed-size entries. Entries are only
+# ever appended; a later entry for the same key replaces an earlier one and an
+# entry with length 0 marks the key as deleted.
+INDEX_MAGIC = b"RTTHIDX1"
+INDEX_ENTRY = struct.Struct("<16sQIHH")  # key, offset, length, width, height
+
+# Last-access file: a header followed by one entry per live key, rewritten whole
+ACCESS_MAGIC = b"RTTHACC1"
+ACCESS_ENTRY = struct.Struct("<16sI")  # key, last access (epoch seconds)
+
+
+class ThumbnailStore:
+    """Packed, append-only store for thumbnail tiles
+
+    All thumbnails live in a single data file of zlib-compressed RGB tiles plus
+    a compact index, instead of one PNG per clip. Reads go through a single
+    mmap of the data file, so loading the thumbnails for a whole card costs one
+    file open. Replaced and deleted tiles leave dead space behind, which
+    compact() reclaims.
+
+    If max_bytes is set, the least recently read tiles are evicted once the
+    live tiles outgrow it. Last-access times are kept in memory and saved in
+    a small side file on close() and compact().
+
+    Keys are 16-byte digests (see ThumbnailManager.get_thumbnail_key).
+    """
+
+    def __init__(self, directory, name="thumbnails", max_bytes=None):
+        self.directory = directory
+        self.data_path = os.path.join(directory, f"{name}.pack")
+        self.index_path = os.path.join(directory, f"{name}.idx")
+        self.access_path = os.path.join(directory, f"{name}.atime")
+        self.max_bytes = max_bytes
+        self.lock = threading.RLock()
+
+        # key -> (offset, length, width, height)
+        self.index = {}
+        self.live_bytes = 0
+        self.dead_bytes = 0
+
+        # key -> last access time; saved lazily
+        self.last_access = {}
+        self.access_dirty = False
+
+        self._map = None
+        self._map_size = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+        self._load_access_times()
+
+    # ----- index -----
+
+    def _load_index(self):
+        """Read the index file into memory"""
+        self.index = {}
+        self.live_bytes = 0
+        self.dead_bytes = 0
+        if not os.path.exists(self.index_path):
+            self._write_index_header()
+            return
+
+        data_size = os.path.getsize(self.data_path) if os.path.exists(self.data_path) else 0
+        with open(self.index_path, 'rb') as f:
+            if f.read(len(INDEX_MAGIC)) != INDEX_MAGIC:
+                print(f"Thumbnail index {self.index_path} is not valid, starting a new store")
+                self._reset_files()
+                return
+            while True:
+                raw = f.read(INDEX_ENTRY.size)
+                if len(raw) < INDEX_ENTRY.size:
+                    break
+                key, offset, length, width, height = INDEX_ENTRY.unpack(raw)
+                old = self.index.pop(key, None)
+                if old is not None:
+                    self.dead_bytes += old[1]
+                # Ignore deletions and entries beyond the data actually written
+                if length and offset + length <= data_size:
+                    self.index[key] = (offset, length, width, height)
+        self.live_bytes = sum(entry[1] for entry in self.index.values())
+
+    def _write_index_header(self):
+        with open(self.index_path, 'wb') as f:
+            f.write(INDEX_MAGIC)
+
+    def _append_index_entry(self, key, offset, length, width, height):
+        with open(self.index_path, 'ab') as f:
+            f.write(INDEX_ENTRY.pack(key, offset, length, width, height))
+
+    def _reset_files(self):
+        """Start an empty store"""
+        self._close_map()
+        open(self.data_path, 'wb').close()
+        self._write_index_header()
+        self.index = {}
+        self.live_bytes = 0
+        self.dead_bytes = 0
+        self.last_access = {}
+        self.access_dirty = True
+
+    # ----- last access times -----
+
+    def _load_access_times(self):
+        """Read saved access times; tiles without one count as used when the index was written"""
+        self.last_access = {}
+        if os.path.exists(self.access_path):
+            try:
+                with open(self.access_path, 'rb') as f:
+                    if f.read(len(ACCESS_MAGIC)) == ACCESS_MAGIC:
+                        for key, accessed in ACCESS_ENTRY.iter_unpack(f.read()):
+                            if key in self.index:
+                                self.last_access[key] = accessed
+            except (OSError, struct.error) as e:
+                print(f"Error reading thumbnail access times: {str(e)}")
+
+        default = int(os.path.getmtime(self.index_path)) if os.path.exists(self.index_path) else int(time.time())
+        for key in self.index:
+            self.last_access.setdefault(key, default)
+
+    def _save_access_times(self):
+        """Write access times for the live tiles (caller holds the lock)"""
+        if not self.access_dirty:
+            return
+        temp_path = self.access_path + ".tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(ACCESS_MAGIC)
+                f.write(b"".join(ACCESS_ENTRY.pack(key, self.last_access.get(key, 0)) for key in self.index))
+            os.replace(temp_path, self.access_path)
+            self.access_dirty = False
+        except OSError as e:
+            print(f"Error saving thumbnail access times: {str(e)}")
+
+    def _touch(self, key):
+        """Record a read or write of a tile (caller holds the lock)"""
+        self.last_access[key] = int(time.time())
+        self.access_dirty = True
+
+    def _evict(self):
+        """Drop least recently used tiles until the store is back under its cap (caller holds the lock)"""
+        if not self.max_bytes or self.live_bytes <= self.max_bytes:
+            return
+        # Evict down to 90% so the next few puts don't trigger another pass
+        target = self.max_bytes * 0.9
+        evicted = 0
+        for key in sorted(self.index, key=lambda k: self.last_access.get(k, 0)):
+            if self.live_bytes <= target:
+                break
+            self.delete(key)
+            evicted += 1
+        print(f"Evicted {evicted} least recently used thumbnails")
+
+        # Don't let the data file grow without bound while the app stays open
+        if self.dead_bytes > self.max_bytes / 2:
+            self.compact()
+
+    # ----- data file mapping -----
+
+    def _close_map(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+            self._map_size = 0
+
+    def _get_map(self, needed_size):
+        """Return an mmap covering at least needed_size bytes of the data file"""
+        if self._map is None or self._map_size < needed_size:
+            self._close_map()
+            size = os.path.getsize(self.data_path)
+            if size == 0:
+                return None
+            with open(self.data_path, 'rb') as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._map_size = size
+        return self._map
+
+    # ----- public API -----
+
+    def __contains__(self, key):
+        with self.lock:
+            return key in self.index
+
+    def __len__(self):
+        with self.lock:
+            return len(self.index)
+
+    def keys(self):
+        with self.lock:
+            return list(self.index)
+
+    def get(self, key):
+        """Return (width, height, rgb_bytes) for a key, or None"""
+        with self.lock:
+            entry = self.index.get(key)
+            if entry is None:
+                return None
+            offset, length, width, height = entry
+            try:
+                data_map = self._get_map(offset + length)
+                if data_map is None:
+                    return None
+                compressed = data_map[offset:offset + length]
+            except (OSError, ValueError) as e:
+                print(f"Error reading thumbnail store: {str(e)}")
+                return None
+            self._touch(key)
+        return width, height, zlib.decompress(compressed)
+
+    def put(self, key, width, height, rgb_bytes):
+        """Append a tile for key, replacing any previous one"""
+        compressed = zlib.compress(rgb_bytes, 1)
+        with self.lock:
+            with open(self.data_path, 'ab') as f:
+                offset = f.tell()
+                f.write(compressed)
+            self._append_index_entry(key, offset, len(compressed), width, height)
+            old = self.index.get(key)
+            if old is not None:
+                self.dead_bytes += old[1]
+                self.live_bytes -= old[1]
+            self.index[key] = (offset, len(compressed), width, height)
+            self.live_bytes += len(compressed)
+            self._touch(key)
+            self._evict()
+
+    def delete(self, key):
+        """Remove a key (its space is reclaimed by compact)"""
+        with self.lock:
+            old = self.index.pop(key, None)
+            if old is not None:
+                self.dead_bytes += old[1]
+                self.live_bytes -= old[1]
+                self.last_access.pop(key, None)
+                self.access_dirty = True
+                self._append_index_entry(key, 0, 0, 0, 0)
+
+    def clear(self):
+        """Remove every tile"""
+        with self.lock:
+            self._reset_files()
+            self._save_access_times()
+
+    def garbage_ratio(self):
+        """Fraction of the data file taken up by replaced or deleted tiles"""
+        with self.lock:
+            total = self.live_bytes + self.dead_bytes
+            return self.dead_bytes / total if total else 0.0
+
+    def compact(self, dead_keys=None):
+        """Rewrite the store without dead space, also dropping dead_keys if given
+
+        Returns the number of entries dropped as orphans.
+        """
+        with self.lock:
+            keep = [key for key in self.index if dead_keys is None or key not in dead_keys]
+            orphans = len(self.index) - len(keep)
+
+            temp_data = self.data_path + ".tmp"
+            temp_index = self.index_path + ".tmp"
+            new_index = {}
+
+            with open(temp_data, 'wb') as data_out, open(temp_index, 'wb') as index_out:
+                index_out.write(INDEX_MAGIC)
+                for key in keep:
+                    offset, length, width, height = self.index[key]
+                    data_map = self._get_map(offset + length)
+                    new_offset = data_out.tell()
+                    data_out.write(data_map[offset:offset + length])
+                    index_out.write(INDEX_ENTRY.pack(key, new_offset, length, width, height))
+                    new_index[key] = (new_offset, length, width, height)
+                data_out.flush()
+                os.fsync(data_out.fileno())
+                index_out.flush()
+                os.fsync(index_out.fileno())
+
+            # The mapping must be closed before the data file can be replaced on Windows
+            self._close_map()
+            os.replace(temp_data, self.data_path)
+            os.replace(temp_index, self.index_path)
+
+            self.index = new_index
+            self.live_bytes = sum(entry[1] for entry in new_index.values())
+            self.dead_bytes = 0
+            self.last_access = {key: self.last_access.get(key, 0) for key in new_index}
+            self.access_dirty = True
+            self._save_access_times()
+            return orphans
+
+    def close(self):
+        with self.lock:
+            self._save_access_times()
+            self._close_map()
@@ -0,0 +1,209 @@
+import csv
+import json
+import os
+import time
+from array import array
+
+from percentiles import percentile
+
+MB = 1024 * 1024
+
+# Per-file columns of the CSV report, in order
+CSV_COLUMNS = (
+    "file", "status", "bytes", "chunks", "wall_s", "open_s", "read_s", "write_s", "close_s",
+    "other_s", "mb_per_s", "read_mb_per_s_p50", "read_mb_per_s_min", "write_mb_per_s_p50",
+    "write_mb_per_s_min", "destination",
+)
+
+
+def rate(size, seconds):
+    """MB/s, or 0 for an interval too short to time"""
+    return size / MB / seconds if seconds > 0 else 0.0
+
+
+class FileTiming:
+    """Where the time went while copying one file
+
+    read_s is time spent in the source's read() calls (the card reader),
+    write_s and close_s time in the destination's write() calls and in
+    closing it (flushing the last data to the NAS), and other_s everything
+    else inside the copy loop: progress updates and the app's own work.
+    """
+
+    def __init__(self, src, dst, size):
+        self.src = src
+        self.dst = dst
+        self.size = size
+        self.status = "copying"
+        self.bytes = 0
+        self.chunks = 0
+        self.open_s = 0.0
+        self.read_s = 0.0
+        self.write_s = 0.0
+        self.close_s = 0.0
+        self.wall_s = 0.0
+        # Per-chunk throughput, in MB/s, of the chunks long enough to time
+        self.chunk_read = array("d")
+        self.chunk_write = array("d")
+        self.started = time.perf_counter()
+
+    def add_chunk(self, size, read_s, write_s):
+        self.bytes += size
+        self.chunks += 1
+        self.read_s += read_s
+        self.write_s += write_s
+        # A chunk faster than the clock can time has no rate; counting it as
+        # 0 MB/s would drag down the low percentiles and the minimum
+        if read_s > 0:
+            self.chunk_read.append(rate(size, read_s))
+        if write_s > 0:
+            self.chunk_write.append(rate(size, write_s))
+
+    def finish(self, status):
+        self.status = status
+        self.wall_s = time.perf_counter() - self.started
+
+    def other_s(self):
+        return max(0.0, self.wall_s - self.open_s - self.read_s - self.write_s - self.close_s)
+
+    def row(self):
+        reads = sorted(self.chunk_read)
+        writes = sorted(self.chunk_write)
+        return {
+            "file": os.path.basename(self.src),
+            "status": self.status,
+            "bytes": self.bytes,
+            "chunks": self.chunks,
+            "wall_s": round(self.wall_s, 4),
+            "open_s": round(self.open_s, 4),
+            "read_s": round(self.read_s, 4),
+            "write_s": round(self.write_s, 4),
+            "close_s": round(self.close_s, 4),
+            "other_s": round(self.other_s(), 4),
+            "mb_per_s": round(rate(self.bytes, self.wall_s), 2),
+            "read_mb_per_s_p50": round(percentile(reads, 0.5), 2),
+            "read_mb_per_s_min": round(reads[0], 2) if reads else 0.0,
+            "write_mb_per_s_p50": round(percentile(writes, 0.5), 2),
+            "write_mb_per_s_min": round(writes[0], 2) if writes else 0.0,
+            "destination": self.dst,
+        }
+
+
+class TransferTelemetry:
+    """Timings for one transfer, saved as a JSON and a CSV report beside the copied clips
+
+    Each copied chunk adds two clock reads and two array appends, which is
+    nothing next to reading a megabyte from a card. The report splits the
+    transfer's time into source reads, destination writes, time inside the
+    copy loop doing neither (CPU and UI work) and the gaps between files
+    (stat calls, queueing thumbnails), so a slow offload can be put down to
+    the card reader, the NAS or the machine.
+    """
+
+    def __init__(self, source, destination):
+        self.source = source
+        self.destination = destination
+        self.started_at = time.strftime("%Y-%m-%d %H:%M:%S")
+        self.started = time.perf_counter()
+        self.wall_s = 0.0
+        self.status = "running"
+        self.files = []
+
+    def start_file(self, src, dst, size):
+        timing = FileTiming(src, dst, size)
+        self.files.append(timing)
+        return timing
+
+    def finish(self, status):
+        self.status = status
+        self.wall_s = time.perf_counter() - self.started
+
+    def summary(self):
+        copied = [timing for timing in self.files if timing.status == "copied"]
+        total_bytes = sum(timing.bytes for timing in self.files)
+        read_s = sum(timing.read_s for timing in self.files)
+        write_s = sum(timing.write_s + timing.close_s for timing in self.files)
+        other_s = sum(timing.open_s + timing.other_s() for timing in self.files)
+        between_s = max(0.0, self.wall_s - sum(timing.wall_s for timing in self.files))
+
+        reads = sorted(value for timing in self.files for value in timing.chunk_read)
+        writes = sorted(value for timing in self.files for value in timing.chunk_write)
+        file_rates = sorted(rate(timing.bytes, timing.wall_s) for timing in copied if timing.wall_s > 0)
+
+        shares = {
+            "source read": read_s,
+            "destination write": write_s,
+            "app overhead": other_s + between_s,
+        }
+        bottleneck = max(shares, key=shares.get) if total_bytes else None
+
+        return {
+            "status": self.status,
+            "files": len(self.files),
+            "copied": len(copied),
+            "skipped": sum(1 for timing in self.files if timing.status == "skipped"),
+            "failed": sum(1 for timing in self.files if timing.status == "failed"),
+            "bytes": total_bytes,
+            "wall_s": round(self.wall_s, 3),
+            "read_s": round(read_s, 3),
+            "write_s": round(write_s, 3),
+            "other_s": round(other_s, 3),
+            "between_files_s": round(between_s, 3),
+            "mb_per_s": round(rate(total_bytes, self.wall_s), 2),
+            "read_mb_per_s": round(rate(total_bytes, read_s), 2),
+            "write_mb_per_s": round(rate(total_bytes, write_s), 2),
+            "chunk_read_mb_per_s": self.percentiles(reads),
+            "chunk_write_mb_per_s": self.percentiles(writes),
+            "file_mb_per_s": self.percentiles(file_rates),
+            "bottleneck": bottleneck,
+        }
+
+    def percentiles(self, sorted_values):
+        """Throughput percentiles; the low ones are the slow chunks or files"""
+        return {
+            name: round(percentile(sorted_values, fraction), 2)
+            for name, fraction in (("p1", 0.01), ("p10", 0.1), ("p50", 0.5), ("p90", 0.9))
+        }
+
+    def describe(self):
+        """One line for the notifications panel"""
+        summary = self.summary()
+        if not summary["bytes"]:
+            return "Transfer timings: nothing was copied"
+        wall = summary["wall_s"] or 1
+        return (
+            f"Transfer timings: {summary['mb_per_s']:.1f} MB/s overall; "
+            f"source read {summary['read_s'] / wall:.0%} ({summary['read_mb_per_s']:.1f} MB/s), "
+            f"destination write {summary['write_s'] / wall:.0%} ({summary['write_mb_per_s']:.1f} MB/s), "
+            f"app {(summary['other_s'] + summary['between_files_s']) / wall:.0%}; "
+            f"limited by {summary['bottleneck']}"
+        )
+
+    def save(self, directory):
+        """Write transfer_report_<time>.json and .csv to directory and return their paths"""
+        os.makedirs(directory, exist_ok=True)
+        stem = os.path.join(directory, f"transfer_report_{time.strftime('%Y%m%d_%H%M%S')}")
+        # Two transfers within a second (e.g. a rerun that skips everything) keep both reports
+        base, number = stem, 1
+        while os.path.exists(stem + ".json"):
+            number += 1
+            stem = f"{base}_{number}"
+        rows = [timing.row() for timing in self.files]
+
+        json_path = stem + ".json"
+        with open(json_path, "w") as f:
+            json.dump({
+                "source": self.source,
+                "destination": self.destination,
+                "started": self.started_at,
+                "summary": self.summary(),
+                "files": rows,
+            }, f, indent=2)
+
+        csv_path = stem + ".csv"
+        with open(csv_path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS)
+            writer.writeheader()
+            writer.writerows(rows)
+
+        return json_path, csv_path
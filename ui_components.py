@@ -1,13 +1,24 @@
 import tkinter as tk
 import customtkinter as ctk
-import time
 import os
 
+import profiling
+from file_list_view import FileListView
+from notifications import LEVEL_FILTERS
+
 class UIComponents:
     def __init__(self, app):
         self.app = app
         self.tab_switching = False
         
+        # Sortable file list column headers
+        self.sort_headers = {}
+        
+        # Selection menu entries -> their actions, and day menu entries -> dates
+        self.selection_actions = {}
+        self.day_choices = {}
+        self.search_update_id = None
+        
     def setup_main_ui(self):
         """Set up the main UI structure"""
         # Main frame that fills the window
@@ -29,6 +40,7 @@ class UIComponents:
         # Create tabs
         self.app.tab_view.add("Transfer")
         self.app.tab_view.add("File Selection")
+        self.app.tab_view.add("Diagnostics")
         
         # Track tab switching to optimize performance
         def on_tab_change(*args):
@@ -221,6 +233,15 @@ class UIComponents:
         )
         self.app.refresh_button.pack(side=tk.LEFT)
         
+        # Clip count and size of the selected project's rushes
+        self.app.project_stats_label = ctk.CTkLabel(
+            self.app.project_frame,
+            text="",
+            anchor="w",
+            text_color="#aaaaaa"
+        )
+        self.app.project_stats_label.pack(fill=tk.X, padx=8)
+        
         # New project creation
         self.app.new_project_frame = ctk.CTkFrame(self.app.project_frame, fg_color="transparent")
         self.app.new_project_frame.pack(fill=tk.X, padx=8, pady=2)
@@ -357,12 +378,25 @@ class UIComponents:
         self.app.notification_frame = ctk.CTkFrame(self.app.right_panel)
         self.app.notification_frame.pack(fill=tk.BOTH, expand=True, pady=5)
         
+        self.app.notification_header = ctk.CTkFrame(self.app.notification_frame, fg_color="transparent")
+        self.app.notification_header.pack(fill=tk.X, padx=8, pady=(8, 2))
+        
         self.app.notification_label = ctk.CTkLabel(
-            self.app.notification_frame,
+            self.app.notification_header,
             text="Notifications",
             font=ctk.CTkFont(size=14, weight="bold")
         )
-        self.app.notification_label.pack(anchor=tk.W, padx=8, pady=(8, 2))
+        self.app.notification_label.pack(side=tk.LEFT)
+        
+        # Hide less severe notifications (the log file keeps everything)
+        self.app.notification_filter = ctk.CTkOptionMenu(
+            self.app.notification_header,
+            values=list(LEVEL_FILTERS),
+            command=lambda choice: self.app.notifications.set_level_filter(LEVEL_FILTERS[choice]),
+            width=160,
+            height=24
+        )
+        self.app.notification_filter.pack(side=tk.RIGHT)
         
         self.app.notification_text = ctk.CTkTextbox(
             self.app.notification_frame,
@@ -373,6 +407,13 @@ class UIComponents:
         self.app.notification_text.pack(fill=tk.BOTH, expand=True, padx=8, pady=2)
         self.app.notification_text.insert("1.0", "Welcome to Rushes Transfer Tool\n")
         self.app.notification_text.configure(state="disabled")
+        
+        self.app.notifications.attach(self.app.notification_text, {
+            "info": "white",
+            "success": self.app.success_color,
+            "warning": self.app.warning_color,
+            "error": self.app.error_color
+        })
     
     def setup_file_selection_tab(self):
         """Set up the file selection tab UI"""
@@ -401,32 +442,76 @@ class UIComponents:
         )
         self.app.select_all_cb.pack(side=tk.RIGHT)
         
+        # Bulk selection: invert, by day, by name, saved selections
+        self.app.selection_menu_var = tk.StringVar(value="Selection")
+        self.app.selection_menu = ctk.CTkOptionMenu(
+            self.app.files_header_frame,
+            variable=self.app.selection_menu_var,
+            values=[],
+            command=self.on_selection_menu,
+            dynamic_resizing=False,
+            width=140,
+            height=30
+        )
+        self.app.selection_menu.pack(side=tk.RIGHT, padx=10)
+        self.update_selection_menu()
+        
         # Add thumbnail management - keep only the clear thumbnails button
         self.app.clear_thumbs_button = ctk.CTkButton(
             self.app.files_header_frame,
             text="Clear Thumbnails",
-            command=self.app.cache_manager.clear_thumbnails,
+            command=self.app.thumbnail_manager.clear_thumbnails,
             width=120,
             height=30
         )
         self.app.clear_thumbs_button.pack(side=tk.RIGHT, padx=10)
         
-        # Add file list with scrollbar
-        self.app.files_list_frame = ctk.CTkScrollableFrame(self.app.files_frame)
-        self.app.files_list_frame.pack(fill=tk.BOTH, expand=True)
+        # Name search and shooting day filters
+        self.app.filter_frame = ctk.CTkFrame(self.app.files_frame, fg_color="transparent")
+        self.app.filter_frame.pack(fill=tk.X, pady=(0, 4))
         
-        # Column headers
-        self.app.list_headers = ctk.CTkFrame(self.app.files_list_frame, fg_color="transparent")
-        self.app.list_headers.pack(fill=tk.X, pady=(0, 8))
+        self.app.search_entry = ctk.CTkEntry(
+            self.app.filter_frame,
+            placeholder_text="Search file names",
+            width=240
+        )
+        self.app.search_entry.pack(side=tk.LEFT)
+        self.app.search_entry.bind("<KeyRelease>", lambda e: self.schedule_search())
+        
+        self.app.day_menu_var = tk.StringVar(value="All days")
+        self.app.day_menu = ctk.CTkOptionMenu(
+            self.app.filter_frame,
+            variable=self.app.day_menu_var,
+            values=["All days"],
+            command=self.on_day_menu,
+            width=170
+        )
+        self.app.day_menu.pack(side=tk.LEFT, padx=10)
+        
+        # Column headers (they stay put while the list scrolls)
+        self.app.list_headers = ctk.CTkFrame(self.app.files_frame, fg_color="transparent")
+        self.app.list_headers.pack(fill=tk.X, pady=(0, 4))
         
         ctk.CTkLabel(self.app.list_headers, text="", width=30).pack(side=tk.LEFT)  # Checkbox column
         ctk.CTkLabel(self.app.list_headers, text="", width=80).pack(side=tk.LEFT, padx=4)  # Thumbnail column
-        ctk.CTkLabel(self.app.list_headers, text="Filename", width=200, anchor="w").pack(side=tk.LEFT, padx=4)
-        ctk.CTkLabel(self.app.list_headers, text="Date Modified", width=150, anchor="w").pack(side=tk.LEFT, padx=4)
-        ctk.CTkLabel(self.app.list_headers, text="Size", width=80, anchor="w").pack(side=tk.LEFT, padx=4)
         
-        # File entries will be dynamically created
-        self.app.file_entries = []
+        # Clicking a column header sorts the list by it
+        for column, title, width in (
+            ("name", "Filename", 200),
+            ("date", "Date Modified", 150),
+            ("size", "Size", 80),
+            ("duration", "Duration", 70),
+            ("format", "Format", 170),
+        ):
+            header = ctk.CTkLabel(self.app.list_headers, text=title, width=width, anchor="w", cursor="hand2")
+            header.pack(side=tk.LEFT, padx=4)
+            header.bind("<Button-1>", lambda e, c=column: self.app.file_manager.sort_file_list(c))
+            self.sort_headers[column] = (header, title)
+        self.update_sort_headers()
+        
+        # Virtualized file list - rows are pooled and rebound as it scrolls
+        self.app.file_list = FileListView(self.app, self.app.files_frame)
+        self.app.file_list.pack(fill=tk.BOTH, expand=True)
         
         # Add scan button at the bottom
         self.app.scan_button = ctk.CTkButton(
@@ -437,89 +522,131 @@ class UIComponents:
         )
         self.app.scan_button.pack(pady=(8, 0))
     
-    def add_file_entry(self, index, file_path, rel_path, mod_time, file_size):
-        """Add a file entry to the list"""
-        # Skip if we're in the middle of a tab switch to avoid UI glitches
-        if self.tab_switching:
-            return
-            
-        # Batch UI updates - create and configure widgets before adding to the UI
-        entry_frame = ctk.CTkFrame(self.app.files_list_frame)
-        
-        # Checkbox for selection
-        var = tk.BooleanVar(value=False)  # Not selected by default
-        checkbox = ctk.CTkCheckBox(
-            entry_frame, 
-            text="", 
-            variable=var,
-            onvalue=True,
-            offvalue=False,
-            width=30,
-            command=lambda p=file_path, v=var: self.app.toggle_file_selection(p, v)
-        )
-        
-        # Add thumbnail placeholder initially, then queue up for real thumbnail
-        thumb_label = ctk.CTkLabel(entry_frame, text="", image=self.app.cache_manager.placeholder_img)
-        
-        # Check if thumbnail is already in cache
-        if file_path in self.app.cache_manager.thumbnail_cache:
-            # Use cached thumbnail directly
-            thumbnail = self.app.cache_manager.thumbnail_cache[file_path]
-            thumb_label.configure(image=thumbnail)
-        else:
-            # Queue this file for thumbnail generation - no need to check for dragging now
-            self.app.cache_manager.thumbnail_queue.put((file_path, thumb_label))
-            
-            # Start the thumbnail worker if not already running
-            if not self.app.cache_manager.thumbnail_processing:
-                self.app.cache_manager.start_thumbnail_worker()
-        
-        # Filename (just the base name, not the full path)
-        filename = os.path.basename(file_path)
-        file_label = ctk.CTkLabel(
-            entry_frame, 
-            text=filename, 
-            width=200,
-            anchor="w",
-            justify="left"
+    def schedule_search(self):
+        """Filter the list by name once typing pauses"""
+        if self.search_update_id is not None:
+            self.app.root.after_cancel(self.search_update_id)
+        self.search_update_id = self.app.root.after(150, self.apply_search)
+    
+    def apply_search(self):
+        self.search_update_id = None
+        text = self.app.search_entry.get()
+        if text.strip() != self.app.file_manager.name_filter:
+            self.app.file_manager.set_name_filter(text)
+    
+    def update_day_menu(self):
+        """List the shooting days of the current files"""
+        self.day_choices = {"All days": None}
+        for day, count in self.app.file_manager.index.days():
+            self.day_choices[f"{day:%Y-%m-%d} ({count})"] = day
+        self.app.day_menu.configure(values=list(self.day_choices))
+        
+        current = self.app.file_manager.day_filter
+        for label, day in self.day_choices.items():
+            if day == current:
+                self.app.day_menu_var.set(label)
+    
+    def on_day_menu(self, choice):
+        self.app.file_manager.set_day_filter(self.day_choices.get(choice))
+    
+    def setup_diagnostics_tab(self):
+        """Set up the diagnostics tab UI"""
+        self.app.diagnostics_frame = ctk.CTkFrame(self.app.tab_view.tab("Diagnostics"))
+        self.app.diagnostics_frame.pack(fill=tk.BOTH, expand=True, padx=8, pady=8)
+        
+        self.app.diagnostics_title = ctk.CTkLabel(
+            self.app.diagnostics_frame,
+            text="Responsiveness",
+            font=ctk.CTkFont(size=16, weight="bold")
         )
+        self.app.diagnostics_title.pack(anchor=tk.W, padx=8, pady=(8, 2))
         
-        # Date modified
-        date_str = mod_time.strftime("%Y-%m-%d %H:%M")
-        date_label = ctk.CTkLabel(
-            entry_frame, 
-            text=date_str, 
-            width=150,
-            anchor="w"
+        self.app.diagnostics_text = ctk.CTkTextbox(
+            self.app.diagnostics_frame,
+            wrap="none",
+            font=ctk.CTkFont(family="Courier", size=12)
         )
+        self.app.diagnostics_text.pack(fill=tk.BOTH, expand=True, padx=8, pady=(2, 8))
+        self.app.diagnostics_text.configure(state="disabled")
         
-        # File size
-        size_str = self.format_size(file_size)
-        size_label = ctk.CTkLabel(
-            entry_frame, 
-            text=size_str, 
-            width=80,
-            anchor="w"
-        )
-        
-        # Now pack everything - reduces layout recalculations
-        checkbox.pack(side=tk.LEFT)
-        thumb_label.pack(side=tk.LEFT, padx=4)
-        file_label.pack(side=tk.LEFT, padx=4)
-        date_label.pack(side=tk.LEFT, padx=4)
-        size_label.pack(side=tk.LEFT, padx=4)
-        
-        # Add the frame to the UI last
-        entry_frame.pack(fill=tk.X, pady=2)
-        
-        # Store entry data
-        self.app.file_entries.append({
-            "frame": entry_frame,
-            "checkbox": checkbox,
-            "var": var,
-            "file_path": file_path,
-            "rel_path": rel_path
-        })
+        self.refresh_diagnostics()
+    
+    def refresh_diagnostics(self):
+        """Redraw the diagnostics tab once a second while it is showing"""
+        if self.app.tab_view.get() == "Diagnostics":
+            report = "\n".join([
+                self.app.watchdog.report(),
+                "",
+                f"Queued UI jobs: {self.app.scheduler.pending()}",
+                f"Thumbnail backlog: {self.app.thumbnail_manager.engine.backlog()}",
+            ])
+            if profiling.ENABLED:
+                report += f"\n\nProfiling: results are written to {profiling.profiler.directory} on exit"
+            last_transfer = self.app.file_manager.last_transfer
+            if last_transfer is not None:
+                report += f"\n\nLast transfer ({last_transfer.started_at}): {last_transfer.describe()}"
+            self.app.diagnostics_text.configure(state="normal")
+            self.app.diagnostics_text.delete("1.0", "end")
+            self.app.diagnostics_text.insert("1.0", report)
+            self.app.diagnostics_text.configure(state="disabled")
+        self.app.root.after(1000, self.refresh_diagnostics)
+    
+    def update_selection_menu(self):
+        """Rebuild the selection menu for the current list and saved selections"""
+        selection = self.app.selection
+        actions = {
+            "Invert selection": self.app.invert_selection,
+            "Select matching name...": self.app.select_matching_name,
+        }
+        for day, count in selection.days():
+            actions[f"Select {day:%Y-%m-%d} ({count})"] = lambda d=day: self.app.select_day(d)
+        actions["Save selection..."] = self.app.save_selection
+        for name in sorted(selection.saved):
+            actions[f"Restore '{name}'"] = lambda n=name: self.app.restore_selection(n)
+        for name in sorted(selection.saved):
+            actions[f"Delete '{name}'"] = lambda n=name: self.app.delete_saved_selection(n)
+        
+        self.selection_actions = actions
+        self.app.selection_menu.configure(values=list(actions))
+        self.app.selection_menu_var.set("Selection")
+    
+    def on_selection_menu(self, choice):
+        # The menu is a list of actions, so it always shows its title
+        self.app.selection_menu_var.set("Selection")
+        action = self.selection_actions.get(choice)
+        if action:
+            action()
+    
+    def update_sort_headers(self):
+        """Mark the column the list is sorted by"""
+        file_manager = self.app.file_manager
+        for column, (header, title) in self.sort_headers.items():
+            if column == file_manager.sort_column:
+                title += " \u25BC" if file_manager.sort_reverse else " \u25B2"
+            header.configure(text=title)
+    
+    def format_duration(self, record):
+        """Clip duration as m:ss (or h:mm:ss)"""
+        if not record.duration:
+            return "--"
+        minutes, seconds = divmod(int(round(record.duration)), 60)
+        hours, minutes = divmod(minutes, 60)
+        if hours:
+            return f"{hours}:{minutes:02d}:{seconds:02d}"
+        return f"{minutes}:{seconds:02d}"
+    
+    def format_clip_format(self, record):
+        """Resolution, frame rate and codec, e.g. 3840x2160 25p H.264"""
+        if not record.probed:
+            return "--"
+        parts = []
+        if record.width and record.height:
+            parts.append(f"{record.width}x{record.height}")
+        if record.fps:
+            parts.append(f"{record.fps:g}p")
+        if record.codec:
+            parts.append(record.codec)
+        return " ".join(parts) or "Unknown"
     
     def format_size(self, size_bytes):
         """Convert bytes to a human-readable format"""
@@ -529,36 +656,9 @@ class UIComponents:
             size_bytes /= 1024.0 
     
     def show_notification(self, message, message_type="info"):
-        """Display a notification in the notification text box"""
-        # No need to skip notifications during window drag anymore
-            
-        # Set color based on message type
-        color_map = {
-            "info": "white",
-            "success": self.app.success_color,
-            "warning": self.app.warning_color,
-            "error": self.app.error_color
-        }
-        color = color_map.get(message_type, "white")
-        
-        # Get current time for timestamp
-        timestamp = time.strftime("%H:%M:%S")
-        
-        # Enable the text box, insert message, and scroll to the end
-        self.app.notification_text.configure(state="normal")
-        self.app.notification_text.insert("end", f"[{timestamp}] ", "timestamp")
-        self.app.notification_text.insert("end", f"{message}\n", message_type)
-        
-        # Configure tags with colors
-        self.app.notification_text.tag_config("timestamp", foreground="#aaaaaa")
-        self.app.notification_text.tag_config(message_type, foreground=color)
-        
-        # Autoscroll to the end
-        self.app.notification_text.see("end")
-        self.app.notification_text.configure(state="disabled")
-        
-        # Print to console as well
-        print(f"{message_type.upper()}: {message}")
+        """Display a notification in the notification text box (safe from any thread)"""
+        # Notifications are batched into the text box on the next UI tick
+        self.app.notifications.post(message, message_type)
     
     def update_ui(self, progress_percentage, total_files, completed_files, status_text, time_text):
         """Update the UI with progress information"""
@@ -570,4 +670,4 @@ class UIComponents:
             self.app.time_label.configure(text=time_text)
             self.app.files_label.configure(text=f"{completed_files}/{total_files}")
         
-        self.app.root.after(0, update) 
\ No newline at end of file
+        self.app.scheduler.post(update, key="progress") 
\ No newline at end of file
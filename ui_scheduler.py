@@ -0,0 +1,124 @@
+import threading
+import time
+import tkinter as tk
+from collections import OrderedDict
+
+# Time the queued jobs may take per frame, and while the window is being dragged or resized
+FRAME_BUDGET_MS = 8
+INTERACTIVE_BUDGET_MS = 2
+
+# How long after the last move/resize event the window counts as being dragged
+INTERACTION_HOLD_S = 0.15
+
+# How often the main thread looks for jobs posted by other threads: every frame
+# while they keep arriving, less often once none have come for a while
+POLL_MS = 16
+IDLE_POLL_MS = 100
+IDLE_AFTER_S = 1.0
+
+
+class UIScheduler:
+    """Runs queued UI jobs on the Tk main thread within a per-frame time budget
+
+    Any thread can post() a job. Other threads only add it to the queue and
+    never call into Tk; a poll on the main thread starts the pump for them.
+    Jobs run in order from a single pump callback that stops once the frame
+    budget is spent and reschedules itself through the event loop, so
+    mouse, keyboard and window events are handled between slices however
+    much work is queued. The budget shrinks while the window is being
+    moved or resized.
+
+    A job posted with a key replaces any queued job with the same key, so a
+    worker reporting progress many times a frame costs one UI update.
+    """
+
+    def __init__(self, root, budget_ms=FRAME_BUDGET_MS):
+        self.root = root
+        self.budget = budget_ms / 1000
+        self.lock = threading.Lock()
+
+        # key -> job; unkeyed jobs get a unique key
+        self.jobs = OrderedDict()
+        self.next_id = 0
+        self.pump_scheduled = False
+        self.interactive_until = 0.0
+
+        # Created on the Tk thread, which is the only one that schedules callbacks
+        self.main_thread = threading.current_thread()
+        self.last_post = 0.0
+        self._schedule_poll(POLL_MS)
+
+    def post(self, fn, key=None):
+        """Run fn on the UI thread soon (safe to call from any thread)"""
+        with self.lock:
+            if key is None:
+                key = self.next_id
+                self.next_id += 1
+            else:
+                # The latest update replaces the queued one
+                self.jobs.pop(key, None)
+            self.jobs[key] = fn
+            self.last_post = time.monotonic()
+            # Jobs from other threads wait for the main thread's poll
+            schedule = not self.pump_scheduled and threading.current_thread() is self.main_thread
+            if schedule:
+                self.pump_scheduled = True
+        if schedule:
+            self._schedule_pump(0)
+
+    def note_interaction(self):
+        """Keep slices short while the user drags or resizes the window"""
+        self.interactive_until = time.monotonic() + INTERACTION_HOLD_S
+
+    def pending(self):
+        with self.lock:
+            return len(self.jobs)
+
+    def _schedule_pump(self, delay_ms):
+        try:
+            self.root.after(delay_ms, self._pump)
+        except (RuntimeError, tk.TclError):
+            # The window has been closed; leave the queue for the poll to retry
+            with self.lock:
+                self.pump_scheduled = False
+
+    def _schedule_poll(self, delay_ms):
+        try:
+            self.root.after(delay_ms, self._poll)
+        except (RuntimeError, tk.TclError):
+            # The window has been closed
+            pass
+
+    def _poll(self):
+        """Start the pump for jobs posted by other threads"""
+        with self.lock:
+            start = bool(self.jobs) and not self.pump_scheduled
+            if start:
+                self.pump_scheduled = True
+            idle = time.monotonic() - self.last_post > IDLE_AFTER_S
+        if start:
+            self._pump()
+        self._schedule_poll(IDLE_POLL_MS if idle else POLL_MS)
+
+    def _pump(self):
+        """Run queued jobs until the frame budget is spent"""
+        start = time.perf_counter()
+        budget = self.budget
+        if time.monotonic() < self.interactive_until:
+            budget = min(budget, INTERACTIVE_BUDGET_MS / 1000)
+
+        while True:
+            with self.lock:
+                if not self.jobs:
+                    self.pump_scheduled = False
+                    return
+                _, fn = self.jobs.popitem(last=False)
+            try:
+                fn()
+            except Exception as e:
+                print(f"Error in UI job: {str(e)}")
+            if time.perf_counter() - start >= budget:
+                break
+
+        # Let the event loop handle input before the next slice
+        self._schedule_pump(1)